@@ -1,21 +1,142 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import format_html
+from import_export.admin import ImportExportModelAdmin
+from import_export.signals import post_export
+
+from backend import tasks
+from backend.pagination import EstimatedCountPaginator
+from backend.search import search_posts
+from backend.resources import STREAM_FORMATS, CommentResource, PostResource, UserResource, stream_export
 from .models import Comment, Post, User
 
-class UserAdmin(admin.ModelAdmin):
+
+class StreamingImportExportAdmin(ImportExportModelAdmin):
+    """ImportExportModelAdmin that streams CSV and JSON files instead of loading them whole.
+
+    Uploads up to IMPORT_PREVIEW_MAX_BYTES keep django-import-export's preview and confirm steps; bigger ones are
+    saved and imported by the tasks.import_file Celery task, chunk by chunk. CSV and JSON exports are written
+    while the rows are read. Other formats go through django-import-export unchanged.
+    """
+
+    def import_action(self, request, *args, **kwargs):
+        # Only the first step carries the file, the confirm step of a previewed import posts its saved name
+        if request.method == "POST" and "import_file" in request.FILES:
+            if not self.has_import_permission(request):
+                raise PermissionDenied
+            import_form = self.create_import_form(request)
+            if import_form.is_valid():
+                input_format = self.get_import_formats()[int(import_form.cleaned_data["input_format"])]()
+                upload = import_form.cleaned_data["import_file"]
+                if input_format.get_title() in STREAM_FORMATS and upload.size > settings.IMPORT_PREVIEW_MAX_BYTES:
+                    job_id:str = tasks.start_import(upload, self.model._meta.model_name, input_format.get_title())
+                    status_url:str = f"/api/imports/{job_id}/"
+                    self.message_user(request, format_html(
+                        'Import of {} queued without preview, follow it at <a href="{}">{}</a>',
+                        upload.name, status_url, status_url))
+                    opts = self.model._meta
+                    return HttpResponseRedirect(reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist"))
+        return super().import_action(request, *args, **kwargs)
+
+    def export_action(self, request, *args, **kwargs):
+        if request.method == "POST":
+            if not self.has_export_permission(request):
+                raise PermissionDenied
+            formats:list = self.get_export_formats()
+            export_form = self.get_export_form_class()(formats, request.POST,
+                                                       resources=self.get_export_resource_classes())
+            if export_form.is_valid():
+                file_format = formats[int(export_form.cleaned_data["file_format"])]()
+                if file_format.get_title() in STREAM_FORMATS:
+                    resource = self.choose_export_resource_class(export_form)(
+                        **self.get_export_resource_kwargs(request))
+                    queryset = self.get_export_queryset(request)
+                    response = StreamingHttpResponse(stream_export(resource, queryset, file_format.get_title()),
+                                                     content_type=file_format.get_content_type())
+                    response["Content-Disposition"] = (
+                        f'attachment; filename="{self.get_export_filename(request, queryset, file_format)}"')
+                    response["X-Accel-Buffering"] = "no"
+                    post_export.send(sender=None, model=self.model)
+                    return response
+        return super().export_action(request, *args, **kwargs)
+
+
+class ScalableChangeListMixin:
+    """Changelist settings for tables too big to count or to list in a ``<select>``.
+
+    Pages are counted by EstimatedCountPaginator and a filtered page doesn't count the whole table a second time.
+    Admins with autocomplete_fields pointing at these models rely on their (index friendly) get_search_results.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ("-id",)
+
+
+class UserAdmin(ScalableChangeListMixin, StreamingImportExportAdmin):
+    resource_classes = [UserResource]
     readonly_fields = ("id", "date_joined", "last_login", "is_superuser")
     fields = ["id", "username", "first_name", "last_name", "email",
               "is_superuser",  "date_joined", "last_login", "groups",
               "user_permissions", "can_post", "can_comment", "is_staff", "is_active",]
+    list_display = ("id", "username", "email", "post_count", "comment_count", "is_staff", "is_active", "created_at")
+    list_filter = ("is_staff", "is_active", "can_post", "can_comment")
+    search_fields = ("username",)
 
-class PostAdmin(admin.ModelAdmin):
+    def get_search_results(self, request, queryset, search_term):
+        """Usernames starting with the term, case-sensitive like usernames themselves, so the username index answers
+        it rather than an ``UPPER(...) LIKE`` scan. The author/commenter autocompletes call this on every keystroke.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(username__startswith=search_term), False
+
+class PostAdmin(ScalableChangeListMixin, StreamingImportExportAdmin):
+    resource_classes = [PostResource]
     readonly_fields = ("id", "created_at", "updated_at")
     fields = ["id", "title", "author", "created_at", "updated_at", "post_content"]
+    autocomplete_fields = ("author",)
+    list_display = ("id", "title", "author", "comment_count", "created_at")
+    list_select_related = ("author",)
+    list_filter = ("created_at",)
+    search_fields = ("title",)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Searches the full-text index (backend/search.py) instead of a ``LIKE`` scan, an id finds its post.
 
-class CommentAdmin(admin.ModelAdmin):
+        The Comment.post autocomplete calls this on every keystroke, so the last word is matched as a prefix.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(id=int(search_term)), False
+        ids:list = list(search_posts(search_term, prefix=True).order_by("-rank")
+                        .values_list("id", flat=True)[:settings.SEARCH_MAX_RESULTS])
+        return queryset.filter(id__in=ids), False
+
+class CommentAdmin(ScalableChangeListMixin, StreamingImportExportAdmin):
+    resource_classes = [CommentResource]
     readonly_fields = ("id", "created_at", "updated_at")
     fields = ["id", "commenter", "created_at", "updated_at", "post", "comment_content"]
+    autocomplete_fields = ("commenter", "post")
+    list_display = ("id", "short_content", "commenter", "post", "created_at")
+    list_select_related = ("commenter", "post")
+    list_filter = ("created_at",)
+
+    @admin.display(description="comment")
+    def short_content(self, comment:Comment) -> str:
+        return comment.comment_content[:80]
+
+    def get_queryset(self, request):
+        # The changelist only shows the title of each post, its content can be 20000 characters
+        return super().get_queryset(request).defer("post__post_content", "post__excerpt")
 
 
 admin.site.register(User, UserAdmin)
 admin.site.register(Post, PostAdmin)
-admin.site.register(Comment, CommentAdmin)
\ No newline at end of file
+admin.site.register(Comment, CommentAdmin)
@@ -1 +1,67 @@
-from django.apps import AppConfig
\ No newline at end of file
+# pylint: disable=missing-module-docstring
+from django.apps import AppConfig
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+
+class BackendConfig(AppConfig):
+    name = "backend"
+
+    def ready(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from rest_framework.authtoken.models import Token
+        from backend import cache, counters, feeds, metrics
+        from backend.authentication import invalidate_tokens, invalidate_user_tokens
+        from backend.models import Post, User
+
+        def token_deleted(sender, instance, **kwargs):
+            invalidate_tokens([instance.key])
+
+        def user_changed(sender, instance, **kwargs):
+            invalidate_user_tokens([instance.id])
+
+        # Every save or delete of a single post, whether from the API, the admin or a script, keeps the author's
+        # post_count, the object cache and the feeds in step. bulk_create / update() send no signal: their callers
+        # (bulk views, imports, seed_data) do the upkeep themselves.
+        def post_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+            if raw:
+                return
+            pk, author_id = instance.id, instance.author_id
+            previous_id = getattr(instance, "loaded_author_id", author_id)
+            moved:bool = (not created and previous_id != author_id
+                          and (update_fields is None or "author" in update_fields))
+            instance.loaded_author_id = author_id
+            if created:
+                counters.adjust(User, 'post_count', [author_id])
+            elif moved:
+                # A new author from the admin autocomplete or an import update
+                counters.adjust(User, 'post_count', [previous_id], sign=-1)
+                counters.adjust(User, 'post_count', [author_id])
+            def upkeep():
+                cache.invalidate("post", [pk])
+                if created:
+                    cache.invalidate("user", [author_id])
+                    feeds.add_posts([instance])
+                elif moved:
+                    cache.invalidate("user", [previous_id, author_id])
+                    feeds.remove_post(pk, previous_id)
+                    feeds.add_posts([instance])
+            transaction.on_commit(upkeep)
+
+        def post_deleted(sender, instance, **kwargs):
+            # The instance loses its pk once the delete is done, before the transaction commits
+            pk, author_id = instance.id, instance.author_id
+            counters.adjust(User, 'post_count', [author_id], sign=-1)
+            def upkeep():
+                cache.invalidate("post", [pk])
+                cache.invalidate("user", [author_id])
+                feeds.remove_post(pk, author_id)
+            transaction.on_commit(upkeep)
+
+        post_delete.connect(token_deleted, sender=Token, weak=False, dispatch_uid="backend_token_deleted")
+        post_save.connect(user_changed, sender=User, weak=False, dispatch_uid="backend_user_saved")
+        post_delete.connect(user_changed, sender=User, weak=False, dispatch_uid="backend_user_deleted")
+        post_save.connect(post_saved, sender=Post, weak=False, dispatch_uid="backend_post_saved")
+        post_delete.connect(post_deleted, sender=Post, weak=False, dispatch_uid="backend_post_deleted")
+        connection_created.connect(metrics.connection_created, dispatch_uid="backend_connection_created")
@@ -0,0 +1,31 @@
+from django.urls import path
+from .async_views import (get_all_comments,
+                          get_all_comments_by,
+                          get_all_comments_on,
+                          get_all_posts,
+                          get_all_posts_by,
+                          get_all_users,
+                          get_single_blogpost,
+                          get_single_comment,
+                          get_single_user,
+                          search_posts)
+
+
+# Read-only mirror of backend/urls.py served by backend/async_views.py, under /api/async/
+urlpatterns = [
+    path('users/', get_all_users),
+    path('users/<str:username>/posts/', get_all_posts_by),
+    path('users/<str:username>/comments/', get_all_comments_by),
+    path('users/<int:pk>/', get_single_user),
+
+    path('posts/', get_all_posts),
+    path('posts/search/', search_posts),
+    path('posts/usr=<str:username>/', get_all_posts_by),
+    path('posts/<int:pk>/comments/', get_all_comments_on),
+    path('posts/<int:pk>/', get_single_blogpost),
+
+    path('comments/', get_all_comments),
+    path('comments/usr=<str:username>/', get_all_comments_by),
+    path('comments/post=<int:pk>/', get_all_comments_on),
+    path('comments/<int:pk>/', get_single_comment),
+]
@@ -0,0 +1,191 @@
+# pylint: disable=missing-module-docstring
+import functools
+from typing import Callable
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse
+from rest_framework.exceptions import (APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated,
+                                       NotFound, ValidationError)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from backend import conditional, search
+from backend.authentication import aauthenticate
+from backend.models import User, Post, Comment
+from backend.pagination import KeysetPagination, RankedPagination
+from backend.serializers import (UserSerializer, PostSerializer, CommentSerializer, ExpandedPostSerializer,
+                                 SearchResultSerializer, values_serializer_for)
+from backend.views import (expanded_post_queryset, list_ordering, parse_expand, parse_sparse_fields,
+                           required_columns, sparse_queryset)
+
+
+# Native async versions of the read endpoints, mounted under /api/async/ and meant to be served by an ASGI server.
+# They use the async ORM (aget, async for) so a slow database or a slow client never pins a worker thread; the
+# JSON they return is the same as the synchronous views in backend/views.py.
+
+def async_api_view(view:Callable) -> Callable:
+    """Turns ``async def view(request:Request, ...)`` into an async Django view with the behaviour of
+    ``@api_view(['GET'])`` + ``@permission_classes([IsAuthenticated])``.
+
+    Authentication goes through aauthenticate, errors are answered by DRF's exception handler (a missing object is
+    a 404) and DRF Responses are rendered with the first of DEFAULT_RENDERER_CLASSES.
+    """
+    @functools.wraps(view)
+    async def wrapper(request:HttpRequest, *args, **kwargs) -> HttpResponse:
+        drf_request:Request = Request(request)
+        try:
+            if request.method != 'GET':
+                raise MethodNotAllowed(request.method)
+            user = await aauthenticate(request)
+            if user is None:
+                raise NotAuthenticated()
+            drf_request.user = user
+            response = await view(drf_request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            response = exception_handler(NotFound(), {})
+        except APIException as exc:
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                # Same as the sync views: SessionAuthentication comes first and sends no WWW-Authenticate
+                exc.status_code = 403
+            response = exception_handler(exc, {})
+            if isinstance(exc, MethodNotAllowed):
+                response['Allow'] = 'GET'
+        if isinstance(response, Response):
+            renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+            response.accepted_renderer = renderer
+            response.accepted_media_type = renderer.media_type
+            response.renderer_context = {"request": drf_request, "response": response, "view": None}
+            response.render()
+        return response
+    return wrapper
+
+
+async def paginated_response(request:Request, queryset:QuerySet, serializer_class:type,
+                             ordering:tuple = None) -> Response:
+    """Async counterpart of backend.views.paginated_response (conditional check, sparse fieldsets, FAST_READ_PATH,
+    keyset page).
+    """
+    label:str = queryset.model._meta.model_name + "s"
+    if conditional.is_conditional(request):
+        paginator:KeysetPagination = KeysetPagination(ordering)
+        columns:set = set(required_columns(queryset.model, paginator.ordering))
+        stamps:list = await paginator.apaginate_queryset(queryset.values(*columns), request)
+        not_modified = conditional.not_modified(
+            request, *conditional.validators(label, conditional.row_stamps(queryset.model, stamps)))
+        if not_modified is not None:
+            return not_modified
+    paginator = KeysetPagination(ordering)
+    selection:dict = parse_sparse_fields(request, serializer_class)
+    if settings.FAST_READ_PATH:
+        values_serializer = values_serializer_for(serializer_class, **selection)
+        page:list = await paginator.apaginate_queryset(
+            values_serializer.values(queryset, extra=required_columns(queryset.model, paginator.ordering)), request)
+        data:list = values_serializer.serialize(page)
+        stamps = conditional.row_stamps(queryset.model, page)
+    else:
+        page = await paginator.apaginate_queryset(
+            sparse_queryset(queryset, serializer_class, selection, paginator.ordering), request)
+        data = serializer_class(page, many=True, **selection).data
+        stamps = conditional.row_stamps(queryset.model, page)
+    return conditional.set_validators(paginator.get_paginated_response(data), *conditional.validators(label, stamps))
+
+
+def serialized_loader(queryset:QuerySet, serializer_class:type) -> Callable:
+    """Coroutine function building the cached single-object payload, as the sync views' ``load()`` does."""
+    async def load() -> list:
+        serializer = serializer_class([row async for row in queryset], many=True)
+        return [dict(item) for item in serializer.data]
+    return load
+
+
+# USER ########################################################################################################
+@async_api_view
+async def get_all_users(request:Request) -> Response:
+    """Async version of backend.views.get_all_users (one keyset page, ``?ordering=posts|comments``)."""
+    ordering:tuple = list_ordering(request, {"posts": ("-post_count", "-id"), "comments": ("-comment_count", "-id")})
+    return await paginated_response(request, User.objects.all(), UserSerializer, ordering)
+
+
+@async_api_view
+async def get_all_posts_by(request:Request, username:str) -> Response:
+    """Async version of backend.views.get_all_posts_by."""
+    user:User = await User.objects.aget(username=username)
+    return await paginated_response(request, Post.objects.filter(author=user.id), PostSerializer)
+
+
+@async_api_view
+async def get_all_comments_by(request:Request, username:str) -> Response:
+    """Async version of backend.views.get_all_comments_by."""
+    user:User = await User.objects.aget(username=username)
+    return await paginated_response(request, Comment.objects.filter(commenter=user.id), CommentSerializer)
+
+
+@async_api_view
+async def get_single_user(request:Request, pk:int) -> Response:
+    """Async version of the GET branch of backend.views.user_utils (cached, conditional)."""
+    return await conditional.aobject_response(request, User, "user", pk,
+                                              serialized_loader(User.objects.filter(id=pk), UserSerializer))
+###############################################################################################################
+
+
+
+# POST ########################################################################################################
+@async_api_view
+async def get_all_posts(request:Request) -> Response:
+    """Async version of backend.views.get_all_posts (``?ordering=popular``, ``?min_comments=N``)."""
+    ordering:tuple = list_ordering(request, {"popular": ("-comment_count", "-id")})
+    queryset:QuerySet = Post.objects.all()
+    if 'min_comments' in request.query_params:
+        try:
+            queryset = queryset.filter(comment_count__gte=int(request.query_params['min_comments']))
+        except ValueError:
+            raise ValidationError({"min_comments": "Expected an integer"})
+    return await paginated_response(request, queryset, PostSerializer, ordering)
+
+
+@async_api_view
+async def search_posts(request:Request) -> Response:
+    """Async version of backend.views.search_posts."""
+    queryset:QuerySet = search.search_posts(request.query_params.get('q', '')).order_by('-rank', '-id')
+    paginator:RankedPagination = RankedPagination()
+    page:list = await paginator.apaginate_queryset(queryset, request)
+    return paginator.get_paginated_response(SearchResultSerializer(page, many=True).data)
+
+
+@async_api_view
+async def get_all_comments_on(request:Request, pk:int) -> Response:
+    """Async version of backend.views.get_all_comments_on."""
+    post:Post = await Post.objects.aget(id=pk)
+    return await paginated_response(request, Comment.objects.filter(post=post.id), CommentSerializer)
+
+
+@async_api_view
+async def get_single_blogpost(request:Request, pk:int) -> Response:
+    """Async version of the GET branch of backend.views.post_utils, ``?expand=author,comments`` included."""
+    if 'expand' in request.query_params:
+        expand:frozenset = parse_expand(request)
+        posts:list = [post async for post in expanded_post_queryset(pk, expand)]
+        return Response(ExpandedPostSerializer(posts, many=True, expand=expand).data)
+    return await conditional.aobject_response(request, Post, "post", pk,
+                                              serialized_loader(Post.objects.filter(id=pk), PostSerializer))
+###############################################################################################################
+
+
+
+# COMMENT #####################################################################################################
+@async_api_view
+async def get_all_comments(request:Request) -> Response:
+    """Async version of backend.views.get_all_comments."""
+    return await paginated_response(request, Comment.objects.all(), CommentSerializer)
+
+
+@async_api_view
+async def get_single_comment(request:Request, pk:int) -> Response:
+    """Async version of the GET branch of backend.views.comment_utils (cached, conditional)."""
+    return await conditional.aobject_response(request, Comment, "comment", pk,
+                                              serialized_loader(Comment.objects.filter(id=pk), CommentSerializer))
+###############################################################################################################
@@ -0,0 +1,87 @@
+# pylint: disable=missing-module-docstring
+import hashlib
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def token_cache_key(key:str) -> str:
+    """Cache key of a resolved token; the token itself is hashed so it never appears in the cache's key space."""
+    return "blogapi:token:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def invalidate_tokens(keys:Iterable[str]) -> None:
+    """Forgets the cached resolution of the given token keys (revoked token, changed or deleted user)."""
+    cache_keys:list = [token_cache_key(key) for key in keys]
+    if cache_keys:
+        cache.delete_many(cache_keys)
+
+
+def invalidate_user_tokens(user_ids:Iterable[int]) -> None:
+    invalidate_tokens(Token.objects.filter(user_id__in=list(user_ids)).values_list("key", flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that remembers the token -> user lookup for ``TOKEN_CACHE_TIMEOUT`` seconds.
+
+    A cache hit costs no query at all. Entries are dropped by the signal handlers in backend/apps.py whenever the
+    token is deleted or its user saved or deleted (put_single_user, delete_single_user, the admin...), so a revoked
+    token or a deactivated user never outlives the write.
+    """
+
+    def authenticate_credentials(self, key:str) -> tuple:
+        cache_key:str = token_cache_key(key)
+        token:Token = cache.get(cache_key)
+        if token is None:
+            # Raises AuthenticationFailed for unknown tokens and inactive users, neither is cached
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, timeout=settings.TOKEN_CACHE_TIMEOUT)
+        return token.user, token
+
+
+async def aauthenticate(request:HttpRequest):
+    """Async equivalent of the default SessionAuthentication + TokenAuthentication pair.
+
+    The session user is loaded with ``request.auser()`` and the token from the cache or with ``aget``, so
+    authenticating never blocks the event loop. Like DRF, the session is tried first and an
+    ``Authorization: Token <key>`` header second.
+
+    Args:
+        request (django.http.HttpRequest): the request, after AuthenticationMiddleware
+
+    Return:
+        User: the authenticated active user, None when no credentials were sent
+
+    Raises:
+        AuthenticationFailed: malformed Authorization header, unknown token or inactive user
+    """
+    user = await request.auser()
+    if user.is_authenticated and user.is_active:
+        return user
+
+    auth:list = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b"token":
+        return None
+    if len(auth) != 2:
+        raise AuthenticationFailed("Invalid token header. Token string should not contain spaces."
+                                   if len(auth) > 2 else "Invalid token header. No credentials provided.")
+    try:
+        key:str = auth[1].decode()
+    except UnicodeError:
+        raise AuthenticationFailed("Invalid token.")
+    # Same cache entries as CachedTokenAuthentication
+    token:Token = await cache.aget(token_cache_key(key))
+    if token is None:
+        try:
+            token = await Token.objects.select_related("user").aget(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not token.user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        await cache.aset(token_cache_key(key), token, timeout=settings.TOKEN_CACHE_TIMEOUT)
+    return token.user
@@ -0,0 +1,68 @@
+# pylint: disable=missing-module-docstring
+from django.conf import settings
+from django.db import models, transaction
+from rest_framework import serializers
+
+from backend.counters import adjust
+
+
+def existing_ids(model:type[models.Model], ids:set) -> set:
+    """Which of ids exist in model's table, looked up with ``IN`` queries of at most BULK_BATCH_SIZE ids."""
+    batch_size:int = getattr(settings, "BULK_BATCH_SIZE", 1000)
+    ids = sorted(ids)
+    found:set = set()
+    for start in range(0, len(ids), batch_size):
+        found.update(model.objects.filter(id__in=ids[start:start + batch_size]).values_list('id', flat=True))
+    return found
+
+
+def bulk_create_items(items:list, item_serializer_class:type[serializers.Serializer], model:type[models.Model],
+                      relations:dict, counters:dict = None) -> tuple:
+    """Validates a batch of items together and inserts the valid ones with ``bulk_create`` in one transaction.
+
+    Args:
+        items (list): raw request items
+        item_serializer_class (type): serializer validating one item, foreign keys declared as plain integer ids
+        model (type): model to insert
+        relations (dict): foreign key field name -> related model, e.g. ``{"author": User}``
+        counters (dict): foreign key field name -> denormalized counter on the related model to increment in the
+            same transaction, e.g. ``{"author": "post_count"}``
+
+    Return:
+        tuple: ``(results, created)`` where results holds ``{"index", "id"}`` or ``{"index", "errors"}`` per item,
+        in request order, and created is the list of inserted instances
+    """
+    results:list = [None] * len(items)
+    valid:list = []
+    for index, item in enumerate(items):
+        serializer = item_serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"index": index, "errors": serializer.errors}
+
+    # One IN lookup per relation for the whole batch instead of a get() per item
+    found:dict = {
+        field: existing_ids(related_model, {data[field] for _, data in valid if data.get(field) is not None})
+        for field, related_model in relations.items()
+    }
+    instances:list = []
+    for index, data in valid:
+        errors:dict = {
+            field: [f'Invalid pk "{data[field]}" - object does not exist.']
+            for field in relations if data.get(field) is not None and data[field] not in found[field]
+        }
+        if errors:
+            results[index] = {"index": index, "errors": errors}
+            continue
+        fields:dict = {(f"{key}_id" if key in relations else key): value for key, value in data.items()}
+        instances.append((index, model(**fields)))
+
+    with transaction.atomic():
+        created:list = model.objects.bulk_create([instance for _, instance in instances],
+                                                 batch_size=getattr(settings, "BULK_BATCH_SIZE", 1000))
+        for field, counter in (counters or {}).items():
+            adjust(relations[field], counter, [getattr(instance, f"{field}_id") for instance in created])
+    for (index, _), instance in zip(instances, created):
+        results[index] = {"index": index, "id": instance.id}
+    return results, created
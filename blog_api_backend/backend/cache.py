@@ -0,0 +1,221 @@
+# pylint: disable=missing-module-docstring
+import threading
+import time
+from typing import Awaitable, Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend import routers
+
+
+# Bump whenever the serialized shape of a User, Post or Comment changes, so stale payloads are never served
+CACHE_KEY_VERSION = 4
+
+_stats_lock = threading.Lock()
+_stats:dict = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# Every object has a generation, moved on by each invalidate(). A payload is cached together with the generation
+# read before it was loaded and only served while that is still the object's generation: a read-through write that
+# lands after a concurrent invalidate() (its load read the row before the write) is never served. New generations
+# are nanosecond timestamps, like the list versions, so a generation that was evicted never comes back.
+
+
+def object_key(label:str, pk:int) -> str:
+    """Cache key of the serialized payload of one object, e.g. ``blogapi:post:42``."""
+    return f"blogapi:{label}:{pk}"
+
+
+def generation_key(label:str, pk:int) -> str:
+    return f"blogapi:{label}:{pk}:generation"
+
+
+def _count(name:str, amount:int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _timeout() -> int:
+    return getattr(settings, "OBJECT_CACHE_TIMEOUT", 300)
+
+
+def _current(label:str, pks:Iterable[int], found:dict) -> tuple:
+    """Splits a multi-get of the payload and generation keys of pks into the payloads still current and the
+    generation of each pk, starting the generations that are missing.
+
+    Return:
+        tuple: ``({id: payload}, {id: generation})``
+    """
+    payloads:dict = {}
+    generations:dict = {}
+    for pk in pks:
+        generation = found.get(generation_key(label, pk))
+        if generation is None:
+            cache.add(generation_key(label, pk), time.time_ns(), timeout=None, version=CACHE_KEY_VERSION)
+            generation = cache.get(generation_key(label, pk), version=CACHE_KEY_VERSION)
+        generations[pk] = generation
+        entry = found.get(object_key(label, pk))
+        if entry is not None and entry[0] == generation:
+            payloads[pk] = entry[1]
+    return payloads, generations
+
+
+async def _acurrent(label:str, pks:Iterable[int], found:dict) -> tuple:
+    payloads:dict = {}
+    generations:dict = {}
+    for pk in pks:
+        generation = found.get(generation_key(label, pk))
+        if generation is None:
+            await cache.aadd(generation_key(label, pk), time.time_ns(), timeout=None, version=CACHE_KEY_VERSION)
+            generation = await cache.aget(generation_key(label, pk), version=CACHE_KEY_VERSION)
+        generations[pk] = generation
+        entry = found.get(object_key(label, pk))
+        if entry is not None and entry[0] == generation:
+            payloads[pk] = entry[1]
+    return payloads, generations
+
+
+def get_or_load(label:str, pk:int, loader:Callable[[], list]) -> list:
+    """Read-through lookup of a serialized object payload.
+
+    Args:
+        label (str): short model label used in the key ("user", "post" or "comment")
+        pk (int): id of the object
+        loader (Callable): called on a miss, returns the payload to cache (``[]`` when the object doesn't exist)
+
+    Return:
+        list: the cached or freshly loaded payload
+    """
+    found:dict = cache.get_many([object_key(label, pk), generation_key(label, pk)], version=CACHE_KEY_VERSION)
+    payloads, generations = _current(label, [pk], found)
+    if pk in payloads:
+        _count("hits")
+        return payloads[pk]
+    _count("misses")
+    # Filled from the primary: a lagging replica would put a stale payload in the cache for OBJECT_CACHE_TIMEOUT
+    with routers.primary():
+        payload = loader()
+    cache.set(object_key(label, pk), (generations[pk], payload), timeout=_timeout(), version=CACHE_KEY_VERSION)
+    return payload
+
+
+async def aget_or_load(label:str, pk:int, loader:Callable[[], Awaitable[list]]) -> list:
+    """get_or_load for async views, ``loader`` being a coroutine function."""
+    found:dict = await cache.aget_many([object_key(label, pk), generation_key(label, pk)], version=CACHE_KEY_VERSION)
+    payloads, generations = await _acurrent(label, [pk], found)
+    if pk in payloads:
+        _count("hits")
+        return payloads[pk]
+    _count("misses")
+    with routers.primary():
+        payload = await loader()
+    await cache.aset(object_key(label, pk), (generations[pk], payload), timeout=_timeout(),
+                     version=CACHE_KEY_VERSION)
+    return payload
+
+
+def get_or_load_many(label:str, pks:Iterable[int], loader:Callable[[list], dict]) -> dict:
+    """get_or_load for several objects at once: one multi-get, then a single loader call for all the misses.
+
+    Args:
+        label (str): short model label used in the keys
+        pks (Iterable[int]): ids of the objects
+        loader (Callable): called with the list of missed ids, returns ``{id: payload}`` for every one of them
+
+    Return:
+        dict: ``{id: payload}`` for every id in pks
+    """
+    pks = list(dict.fromkeys(pks))
+    found:dict = cache.get_many([key for pk in pks for key in (object_key(label, pk), generation_key(label, pk))],
+                                version=CACHE_KEY_VERSION)
+    payloads, generations = _current(label, pks, found)
+    missing:list = [pk for pk in pks if pk not in payloads]
+    _count("hits", len(payloads))
+    if missing:
+        _count("misses", len(missing))
+        with routers.primary():
+            loaded:dict = loader(missing)
+        cache.set_many({object_key(label, pk): (generations[pk], payload) for pk, payload in loaded.items()},
+                       timeout=_timeout(), version=CACHE_KEY_VERSION)
+        payloads.update(loaded)
+    return payloads
+
+
+def payload_loader(model:type, serializer_class:type) -> Callable[[list], dict]:
+    """get_or_load_many loader reading the missed ids of model with one ``IN`` query. Payloads are the ones the
+    single-object views cache: ``[serialized object]``, ``[]`` for the ids that don't exist.
+    """
+    def load(pks:list) -> dict:
+        payloads:dict = dict.fromkeys(pks, [])
+        for item in serializer_class(model.objects.filter(id__in=pks), many=True).data:
+            payloads[item["id"]] = [dict(item)]
+        return payloads
+    return load
+
+
+def peek(label:str, pk:int) -> list:
+    """Returns the cached payload without loading it or touching the hit/miss counters (None when absent)."""
+    found:dict = cache.get_many([object_key(label, pk), generation_key(label, pk)], version=CACHE_KEY_VERSION)
+    entry = found.get(object_key(label, pk))
+    if entry is None or entry[0] != found.get(generation_key(label, pk)):
+        return None
+    return entry[1]
+
+
+async def apeek(label:str, pk:int) -> list:
+    found:dict = await cache.aget_many([object_key(label, pk), generation_key(label, pk)], version=CACHE_KEY_VERSION)
+    entry = found.get(object_key(label, pk))
+    if entry is None or entry[0] != found.get(generation_key(label, pk)):
+        return None
+    return entry[1]
+
+
+def invalidate(label:str, pks:Iterable[int]) -> None:
+    """Drops the cached payloads of the given objects after they were created, changed or deleted, and moves the
+    lists of label to a new version (see list_versions).
+    """
+    pks = [pk for pk in pks if pk is not None]
+    if pks:
+        # A new generation first: a load that read the row before this write can still store its payload, but
+        # under the old generation, where no lookup will take it
+        generation:int = time.time_ns()
+        cache.set_many({generation_key(label, pk): generation for pk in pks}, timeout=None, version=CACHE_KEY_VERSION)
+        cache.delete_many([object_key(label, pk) for pk in pks], version=CACHE_KEY_VERSION)
+        _count("invalidations", len(pks))
+    bump_list_version(label)
+
+
+def list_version_key(label:str) -> str:
+    return f"blogapi:list-version:{label}"
+
+
+def list_versions(labels:Iterable[str]) -> tuple:
+    """Current content version of the lists of each label, part of the key of cached list responses.
+
+    A missing counter starts from the current time in nanoseconds rather than 1, so one that was evicted never
+    comes back to a version already used.
+    """
+    keys:list = [list_version_key(label) for label in labels]
+    versions:dict = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_list_version(label:str) -> None:
+    key:str = list_version_key(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def cache_stats() -> dict:
+    """Hit/miss/invalidation counters of this worker process since it started."""
+    with _stats_lock:
+        stats:dict = dict(_stats)
+    lookups:int = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,128 @@
+# pylint: disable=missing-module-docstring
+import hashlib
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable
+
+from django.db.models import Model
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from backend import cache
+
+
+# Denormalized counters (see backend.counters) are serialized with their row but moved without touching updated_at,
+# so they are part of the ETag instead
+COUNTER_FIELDS:tuple = ("post_count", "comment_count")
+
+
+def is_conditional(request:Request) -> bool:
+    """True when the client sent a validator we could answer with a 304."""
+    return request.method in ("GET", "HEAD") and (
+        "HTTP_IF_NONE_MATCH" in request.META or "HTTP_IF_MODIFIED_SINCE" in request.META
+    )
+
+
+def stamp_columns(model:type[Model]) -> tuple:
+    """Columns the validators of model's rows are read from: ``id``, ``updated_at`` and its counters."""
+    return ("id", "updated_at", *(field for field in COUNTER_FIELDS if hasattr(model, field)))
+
+
+def row_stamps(model:type[Model], rows:Iterable) -> list:
+    """``(id, updated_at, *counters)`` tuples of model instances or ``values()`` dicts, as validators expects."""
+    columns:tuple = stamp_columns(model)
+    return [tuple(row[column] for column in columns) if isinstance(row, dict)
+            else tuple(getattr(row, column) for column in columns) for row in rows]
+
+
+def validators(label:str, rows:Iterable[tuple]) -> tuple:
+    """Derives a weak ETag and a Last-Modified datetime from ``(id, updated_at, *counters)`` rows.
+
+    A single row gives a readable tag like ``W/"post-42-1718000000123456-3"``, several rows are hashed together.
+    A counter change moves the ETag only: Last-Modified is the latest ``updated_at``.
+
+    Args:
+        label (str): model label prefixed to the tag so a post and a comment with the same id never collide
+        rows (Iterable[tuple]): ``(id, updated_at, *counters)`` for every object in the response
+
+    Return:
+        tuple: ``(etag, last_modified)``, both None when there are no rows
+    """
+    rows = [tuple(row) for row in rows]
+    if not rows:
+        return None, None
+    stamps:list = ["-".join(str(value) for value in (pk, int(updated_at.timestamp() * 1_000_000), *counters))
+                   for pk, updated_at, *counters in rows]
+    if len(stamps) == 1:
+        tag:str = stamps[0]
+    else:
+        tag = hashlib.md5(",".join(stamps).encode("ascii"), usedforsecurity=False).hexdigest()
+    return f'W/"{label}-{tag}"', max(row[1] for row in rows)
+
+
+def payload_rows(payload:list) -> list:
+    """``(id, updated_at, *counters)`` rows read back out of an already serialized payload."""
+    return [(item["id"], parse_datetime(item["updated_at"]),
+             *(item[field] for field in COUNTER_FIELDS if field in item)) for item in payload]
+
+
+def not_modified(request:Request, etag:str, last_modified:datetime) -> HttpResponse:
+    """Returns a 304 (or 412) response when the request's validators still match, otherwise None."""
+    if etag is None:
+        return None
+    response:HttpResponse = get_conditional_response(request, etag=etag,
+                                                     last_modified=int(last_modified.timestamp()))
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response:HttpResponse, etag:str, last_modified:datetime) -> HttpResponse:
+    if etag is not None:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def object_response(request:Request, model:type[Model], label:str, pk:int, load:Callable[[], list]) -> Response:
+    """Serves a single-object GET through the read-through cache, answering 304 before serializing anything.
+
+    When the client sends ``If-None-Match`` / ``If-Modified-Since`` the validators come from the cached payload
+    if there is one, otherwise from a single ``values_list()`` query of the stamp_columns.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request methods (GET)
+        model (type[Model]): User, Post or Comment
+        label (str): cache/ETag label of the model
+        pk (int): id of the object
+        load (Callable): builds the serialized payload on a cache miss
+
+    Return:
+        Response: the payload with ETag / Last-Modified set, or a 304 Not Modified
+    """
+    if is_conditional(request):
+        payload:list = cache.peek(label, pk)
+        rows:list = payload_rows(payload) if payload is not None else list(
+            model.objects.filter(id=pk).values_list(*stamp_columns(model)))
+        response:HttpResponse = not_modified(request, *validators(label, rows))
+        if response is not None:
+            return response
+    payload = cache.get_or_load(label, pk, load)
+    return set_validators(Response(payload), *validators(label, payload_rows(payload)))
+
+
+async def aobject_response(request:Request, model:type[Model], label:str, pk:int,
+                           load:Callable[[], Awaitable[list]]) -> Response:
+    """object_response for async views: cache and database are read without blocking, ``load`` is a coroutine."""
+    if is_conditional(request):
+        payload:list = await cache.apeek(label, pk)
+        rows:list = payload_rows(payload) if payload is not None else [
+            row async for row in model.objects.filter(id=pk).values_list(*stamp_columns(model))]
+        response:HttpResponse = not_modified(request, *validators(label, rows))
+        if response is not None:
+            return response
+    payload = await cache.aget_or_load(label, pk, load)
+    return set_validators(Response(payload), *validators(label, payload_rows(payload)))
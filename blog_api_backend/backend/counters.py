@@ -0,0 +1,32 @@
+# pylint: disable=missing-module-docstring
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+
+def adjust(model:type[models.Model], field:str, ids:Iterable[int], sign:int = 1) -> None:
+    """Atomically adds (sign=1) or removes (sign=-1) one to ``field`` per occurrence of an id in ids.
+
+    The update is done in the database with ``F()`` so concurrent writers never lose an increment, and ids
+    sharing the same delta share one ``UPDATE ... WHERE id IN (...)``. Decrements never go below zero.
+    ``updated_at`` is left alone, a comment isn't an edit of its post: the ETag covers the counters instead
+    (conditional.stamp_columns).
+
+    Args:
+        model (type): model holding the counter (Post or User)
+        field (str): counter field name, e.g. "comment_count"
+        ids (Iterable[int]): ids of the rows to adjust, one entry per created/deleted child, None is ignored
+        sign (int): 1 to increment, -1 to decrement
+    """
+    by_delta:dict = defaultdict(list)
+    for pk, count in Counter(pk for pk in ids if pk is not None).items():
+        by_delta[count].append(pk)
+    for delta, pks in by_delta.items():
+        if sign > 0:
+            value = F(field) + delta
+        else:
+            value = Greatest(F(field) - delta, Value(0))
+        model.objects.filter(id__in=pks).update(**{field: value})
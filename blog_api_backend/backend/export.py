@@ -0,0 +1,50 @@
+# pylint: disable=missing-module-docstring
+from typing import Iterator
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.serializers import Serializer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def iter_ndjson(queryset:QuerySet, serializer_class:type, chunk_size:int) -> Iterator[bytes]:
+    """Yields the rows of queryset as newline-delimited JSON, one encoded row per line.
+
+    A single serializer instance is reused for every row and the queryset is walked with ``iterator()``,
+    so memory stays bounded by ``chunk_size`` rows whatever the size of the table.
+
+    Args:
+        queryset (QuerySet): the rows to export, ordered by the caller
+        serializer_class (type): ModelSerializer whose representation is emitted for each row
+        chunk_size (int): number of rows fetched per round trip from the server-side cursor
+
+    Return:
+        Iterator[bytes]: one ``b'{...}\\n'`` per row
+    """
+    serializer:Serializer = serializer_class()
+    encoder:JSONEncoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield (encoder.encode(serializer.to_representation(instance)) + "\n").encode("utf-8")
+
+
+def ndjson_response(queryset:QuerySet, serializer_class:type, filename:str) -> StreamingHttpResponse:
+    """Wraps iter_ndjson in a StreamingHttpResponse so the first rows are sent as soon as they are read.
+
+    Args:
+        queryset (QuerySet): the rows to export
+        serializer_class (type): ModelSerializer used for each row
+        filename (str): suggested download name sent in Content-Disposition
+
+    Return:
+        StreamingHttpResponse: ``application/x-ndjson`` body streamed row by row
+    """
+    chunk_size:int = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    response = StreamingHttpResponse(iter_ndjson(queryset.order_by("id"), serializer_class, chunk_size),
+                                     content_type=NDJSON_CONTENT_TYPE)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
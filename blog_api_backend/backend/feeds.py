@@ -0,0 +1,215 @@
+# pylint: disable=missing-module-docstring
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+
+import redis
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.core.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from backend import cache, conditional, redis_clients
+from backend.models import Post, User
+from backend.pagination import KeysetPagination
+from backend.serializers import PostSerializer
+
+
+logger = logging.getLogger(__name__)
+
+
+# Fan-out-on-write feeds of post ids, newest first: one Redis sorted set for every post and one per author, each
+# trimmed to FEED_LENGTH. create_new_post / create_posts_bulk add to them, delete_single_blogpost removes from them
+# and the first pages of get_all_posts / get_all_posts_by are read from them instead of sorting in SQL; the payloads
+# come from the object cache in one multi-get. Feeds are only read once rebuild_feeds has marked them complete, and
+# any page they can't answer exactly (past the trimmed length, other orderings, filters) still goes to SQL.
+
+FEED_KEY:str = "blogapi:feed:posts"
+READY_KEY:str = "blogapi:feed:ready"
+# Feeds that lost their oldest entries to trimming: past their end there may be more posts in SQL
+TRUNCATED_KEY:str = "blogapi:feed:truncated"
+EPOCH:datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Posts sharing a microsecond are ordered by member; zero padded ids sort like the "-id" tie-break of the SQL path
+MEMBER_WIDTH:int = 12
+TIE_SLACK:int = 8
+
+
+def author_feed_key(author_id:int) -> str:
+    return f"blogapi:feed:author:{author_id}"
+
+
+def score(created_at:datetime) -> int:
+    """Sorted set score of a post: its creation time in whole microseconds, exact in a double until year 2255."""
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def created_at(score_value:float) -> datetime:
+    return EPOCH + timedelta(microseconds=int(score_value))
+
+
+def member(pk:int) -> str:
+    return f"{pk:0{MEMBER_WIDTH}d}"
+
+
+def client():
+    """The Redis client of ``FEEDS_REDIS_URL``, None when feeds are disabled."""
+    return redis_clients.client_for(settings.FEEDS_REDIS_URL)
+
+
+def add_posts(posts:Iterable[Post]) -> None:
+    """Fans newly created posts out to the global feed and their author's feed."""
+    redis_client = client()
+    if redis_client is None:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    keys:dict = {FEED_KEY: None}
+    for post in posts:
+        pipe.zadd(FEED_KEY, {member(post.id): score(post.created_at)})
+        if post.author_id is not None:
+            pipe.zadd(author_feed_key(post.author_id), {member(post.id): score(post.created_at)})
+            keys[author_feed_key(post.author_id)] = None
+    for key in keys:
+        pipe.zremrangebyrank(key, 0, -(settings.FEED_LENGTH + 1))
+    results:list = _execute(pipe)
+    trimmed:list = [key for key, removed in zip(keys, results[-len(keys):] if results else ()) if removed]
+    if trimmed:
+        pipe.sadd(TRUNCATED_KEY, *trimmed)
+        _execute(pipe)
+
+
+def remove_post(pk:int, author_id:int) -> None:
+    """Takes a deleted post out of the global feed and its author's feed."""
+    redis_client = client()
+    if redis_client is None:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrem(FEED_KEY, member(pk))
+    if author_id is not None:
+        pipe.zrem(author_feed_key(author_id), member(pk))
+    _execute(pipe)
+
+
+def remove_author(author_id:int, username:str) -> None:
+    """Drops the feed of a deleted user (their posts stay in the global feed) and its username lookup."""
+    forget_username(username)
+    redis_client = client()
+    if redis_client is not None:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(author_feed_key(author_id))
+        _execute(pipe)
+
+
+def mark_stale() -> None:
+    """Sends feed reads back to SQL until rebuild_feeds runs, after posts were inserted without their ids."""
+    redis_client = client()
+    if redis_client is not None:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(READY_KEY)
+        if _execute(pipe) is not None:
+            logger.warning("Post feeds marked stale, run rebuild_feeds")
+
+
+def _execute(pipe) -> list:
+    try:
+        return pipe.execute()
+    except redis.RedisError:
+        # The write itself succeeded; the feed is now missing it until the next rebuild
+        logger.error("Feed update failed, run rebuild_feeds once Redis is back", exc_info=True)
+        return None
+
+
+def username_key(username:str) -> str:
+    return f"blogapi:username:{username}"
+
+
+def author_id_for(username:str) -> int:
+    """Id of the user called username, from the cache when possible. Raises User.DoesNotExist like a get()."""
+    author_id:int = django_cache.get(username_key(username))
+    if author_id is None:
+        author_id = User.objects.values_list("id", flat=True).get(username=username)
+        django_cache.set(username_key(username), author_id, timeout=settings.OBJECT_CACHE_TIMEOUT)
+    return author_id
+
+
+def forget_username(username:str) -> None:
+    """Called when a user is renamed or deleted, so the old name stops resolving to their id."""
+    django_cache.delete(username_key(username))
+
+
+def latest_ids(key:str, position:list, count:int) -> list:
+    """Up to count ``(id, created_at)`` entries of a feed, after the cursor position when there is one.
+
+    Return:
+        list: the entries, or None when the feed can't answer (not rebuilt yet, Redis down, or the page reaches
+        past what a trimmed feed holds)
+    """
+    redis_client = client()
+    if redis_client is None:
+        return None
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(READY_KEY)
+        pipe.sismember(TRUNCATED_KEY, key)
+        if position is None:
+            pipe.zrevrange(key, 0, count - 1, withscores=True)
+        else:
+            boundary:tuple = (score(position[0]), member(position[1]))
+            pipe.zrevrangebyscore(key, boundary[0], "-inf", start=0, num=count + TIE_SLACK, withscores=True)
+        ready, truncated, entries = pipe.execute()
+    except redis.RedisError:
+        logger.warning("Feed read failed, falling back to SQL", exc_info=True)
+        return None
+    if not ready:
+        return None
+    fetched:int = len(entries)
+    if position is not None:
+        entries = [(name, value) for name, value in entries if (int(value), name) < boundary][:count]
+        if len(entries) < count and fetched == count + TIE_SLACK:
+            return None
+    if len(entries) < count and truncated:
+        return None
+    return [(int(name), created_at(value)) for name, value in entries]
+
+
+# Object cache loader: the payload of each post ([] for the ones that no longer exist)
+load_posts:Callable = cache.payload_loader(Post, PostSerializer)
+
+
+def feed_response(request:Request, author_id:int = None) -> Response:
+    """One page of the latest posts (of author_id when given) answered from its feed and the object cache.
+
+    Return:
+        Response: the same body, ETag and Last-Modified as paginated_response, or None when the request has to go
+        through SQL (other orderings, filters, sparse fieldsets, backward cursors, feed not usable)
+    """
+    if any(param not in ("cursor", "page_size") for param in request.query_params):
+        return None
+    paginator:KeysetPagination = KeysetPagination()
+    position, reverse = paginator.decode_cursor(request)
+    if reverse:
+        return None
+    if position is not None:
+        # Anything unexpected is left to the SQL path, which rejects a bad cursor with the usual 404
+        try:
+            position = [Post._meta.get_field("created_at").to_python(position[0]), int(position[1])]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        if position[0] is None or position[0].tzinfo is None:
+            return None
+    entries:list = latest_ids(FEED_KEY if author_id is None else author_feed_key(author_id), position,
+                              paginator.get_page_size(request) + 1)
+    if entries is None:
+        return None
+
+    payloads:dict = cache.get_or_load_many("post", [pk for pk, _ in entries], load_posts)
+    if not all(payloads.values()):
+        # A post deleted while its feed couldn't be updated
+        return None
+    page:list = paginator.paginate_rows([{"id": pk, "created_at": stamp} for pk, stamp in entries], request)
+    data:list = [payloads[row["id"]][0] for row in page]
+    etag, last_modified = conditional.validators("posts", conditional.payload_rows(data))
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return conditional.set_validators(paginator.get_paginated_response(data), etag, last_modified)
@@ -0,0 +1,95 @@
+# pylint: disable=missing-module-docstring
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Compares a WSGI and an ASGI deployment of the API under many concurrent slow clients.
+
+    Every client opens its own connection per request, trickles the request out in small pieces and reads the
+    response a chunk at a time, each step separated by a delay, the way clients on bad mobile links behave. A sync
+    worker stays busy for the whole exchange, an async one only while the view actually runs.
+
+    Example, with the docker-compose services up:
+        python manage.py bench_asgi --token <key> \\
+            --wsgi http://localhost:8000/api/posts/ --asgi http://localhost:8001/api/async/posts/
+    """
+    help = "Benchmark throughput and tail latency of the WSGI vs ASGI read endpoints with slow clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi", required=True, help="URL served by the WSGI deployment")
+        parser.add_argument("--asgi", required=True, help="same endpoint on the ASGI deployment (/api/async/...)")
+        parser.add_argument("--token", help="API token sent as 'Authorization: Token <key>'")
+        parser.add_argument("--clients", type=int, default=100, help="concurrent clients (default 100)")
+        parser.add_argument("--requests", type=int, default=5, help="requests per client (default 5)")
+        parser.add_argument("--send-delay", type=float, default=0.05,
+                            help="seconds between the pieces of a request (default 0.05)")
+        parser.add_argument("--read-delay", type=float, default=0.05,
+                            help="seconds between response chunks read (default 0.05)")
+        parser.add_argument("--chunk-size", type=int, default=1024, help="bytes read per chunk (default 1024)")
+        parser.add_argument("--timeout", type=float, default=60, help="seconds before a request counts as failed")
+
+    def handle(self, *args, **options):
+        for label in ("wsgi", "asgi"):
+            url:str = options[label]
+            if urlsplit(url).scheme != "http":
+                raise CommandError(f"--{label} must be a plain http:// URL")
+            latencies, errors, elapsed = asyncio.run(self.run(url, options))
+            self.report(label, latencies, errors, elapsed)
+
+    def report(self, label:str, latencies:list, errors:int, elapsed:float) -> None:
+        if not latencies:
+            self.stdout.write(f"{label}: all {errors} requests failed")
+            return
+        cuts:list = statistics.quantiles(latencies, n=100, method="inclusive")
+        self.stdout.write(f"{label}: {len(latencies) / elapsed:8.1f} req/s  p50 {cuts[49] * 1000:8.1f} ms  "
+                          f"p95 {cuts[94] * 1000:8.1f} ms  p99 {cuts[98] * 1000:8.1f} ms  "
+                          f"ok {len(latencies)}  failed {errors}")
+
+    async def run(self, url:str, options:dict) -> tuple:
+        """Runs every client against url, returns ``(latencies of successful requests, failures, elapsed)``."""
+        latencies:list = []
+        errors:list = []
+
+        async def client() -> None:
+            for _ in range(options["requests"]):
+                start:float = time.perf_counter()
+                try:
+                    status:int = await asyncio.wait_for(self.slow_request(url, options), options["timeout"])
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    status = 0
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors.append(status)
+
+        start:float = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options["clients"])))
+        return latencies, len(errors), time.perf_counter() - start
+
+    @staticmethod
+    async def slow_request(url:str, options:dict) -> int:
+        """One GET sent and read slowly over a fresh connection, returns the HTTP status code."""
+        parts = urlsplit(url)
+        target:str = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers:list = [f"GET {target or '/'} HTTP/1.1", f"Host: {parts.hostname}", "Connection: close",
+                        "Accept: application/json"]
+        if options["token"]:
+            headers.append(f"Authorization: Token {options['token']}")
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+        try:
+            for line in headers + [""]:
+                writer.write(f"{line}\r\n".encode("latin-1"))
+                await writer.drain()
+                await asyncio.sleep(options["send_delay"])
+            status_line:bytes = await reader.readline()
+            status:int = int(status_line.split()[1])
+            while await reader.read(options["chunk_size"]):
+                await asyncio.sleep(options["read_delay"])
+            return status
+        finally:
+            writer.close()
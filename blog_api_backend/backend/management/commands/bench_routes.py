@@ -0,0 +1,213 @@
+# pylint: disable=missing-module-docstring
+import json
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+from rest_framework.test import APIClient
+
+from backend.models import Comment, Post, User
+
+
+class Command(BaseCommand):
+    """Calls every route of backend/urls.py in-process with the test client and records, per route and method:
+    p50/p95/p99/mean latency, the number of SQL queries and the peak Python memory allocated by one request.
+
+    Routes are filled in with the busiest user and post of the current dataset (see seed_data), so the numbers
+    reflect the worst pages rather than an empty one. Writes run inside a transaction that is rolled back after
+    every call and the whole run is rolled back at the end, so the dataset is left as it was. Save the JSON with
+    ``--output`` and pass it as ``--compare`` on another commit to see the difference.
+    """
+    help = "Benchmark every API route in-process: latency percentiles, query count and peak memory, as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="timed calls per route (default 50)")
+        parser.add_argument("--warmup", type=int, default=3, help="untimed calls per route first (default 3)")
+        parser.add_argument("--routes", help="only routes matching this regular expression, e.g. '^posts/'")
+        parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+        parser.add_argument("--compare", help="results JSON of an earlier run to print the change against")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 2:
+            raise CommandError("--iterations must be at least 2")
+        if not Post.objects.exists():
+            raise CommandError("The database has no posts, run seed_data first")
+
+        with transaction.atomic():
+            self.context:dict = self.route_context()
+            client:APIClient = APIClient(HTTP_HOST="localhost")
+            client.force_authenticate(self.context["staff"])
+            results:dict = {}
+            for route in self.routes(options["routes"]):
+                for method in self.methods(route):
+                    results[f"{method} {route.pattern}"] = self.measure(client, method, route, options)
+            transaction.set_rollback(True)
+
+        report:dict = {"meta": self.meta(options), "routes": results}
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as baseline:
+                self.compare(json.load(baseline)["routes"], results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+            self.summary(results)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    @staticmethod
+    def route_context() -> dict:
+        """Ids and names the parameterized routes are called with: the busiest user and post, one of its comments."""
+        user:User = User.objects.order_by("-post_count", "-comment_count", "id").first()
+        post:Post = Post.objects.order_by("-comment_count", "id").first()
+        comment:Comment = Comment.objects.filter(post=post).order_by("id").first() or Comment.objects.first()
+        # A staff account so the IsAdminUser routes answer too, gone with the final rollback
+        staff:User = User.objects.create(username="bench-routes-staff", is_staff=True)
+        return {"user": user, "post": post, "comment": comment, "staff": staff}
+
+    @staticmethod
+    def routes(only:str) -> list:
+        patterns:list = [pattern for pattern in get_resolver("backend.urls").url_patterns
+                         if isinstance(pattern, URLPattern)]
+        if only:
+            patterns = [pattern for pattern in patterns if re.search(only, str(pattern.pattern))]
+        return patterns
+
+    @staticmethod
+    def methods(route:URLPattern) -> list:
+        """HTTP methods the @api_view behind route accepts (OPTIONS aside)."""
+        allowed:list = getattr(getattr(route.callback, "cls", None), "http_method_names", ["get"])
+        return [method.upper() for method in allowed if method != "options"]
+
+    def path(self, route:URLPattern) -> str:
+        """Concrete /api/ path for route, parameters replaced by the ids in self.context."""
+        pattern:str = str(route.pattern)
+
+        def argument(match:re.Match) -> str:
+            name:str = match.group("name")
+            if name == "username":
+                return self.context["user"].username
+            if name in ("tracking_id", "job_id"):
+                return "bench-routes"
+            if pattern.startswith("users/"):
+                return str(self.context["user"].id)
+            if pattern.startswith("posts/") or pattern.startswith("comments/post="):
+                return str(self.context["post"].id)
+            return str(self.context["comment"].id)
+        return "/api/" + re.sub(r"<(?:\w+:)?(?P<name>\w+)>", argument, pattern) + QUERY_STRINGS.get(pattern, "")
+
+    def body(self, method:str, route:URLPattern):
+        """Request body of a write, None for reads and deletes."""
+        if method in ("GET", "DELETE"):
+            return None
+        pattern:str = str(route.pattern)
+        user_id:int = self.context["user"].id
+        post_id:int = self.context["post"].id
+        post:dict = {"title": "Benchmark", "post_content": "benchmark " * 50, "author": user_id}
+        comment:dict = {"post": post_id, "commenter": user_id, "comment_content": "benchmark " * 10}
+        bodies:dict = {
+            "users/": {"username": "bench-routes-user", "first_name": "Bench", "last_name": "Routes",
+                       "email": "bench@example.com", "can_post": True, "can_comment": True},
+            "posts/bulk/": [post] * 100,
+            "posts/": post,
+            "comments/bulk/": [comment] * 100,
+            "comments/": comment,
+        }
+        return next(body for prefix, body in bodies.items() if pattern.startswith(prefix))
+
+    def call(self, client:APIClient, method:str, path:str, body) -> int:
+        """One request, streamed responses read to the end, writes rolled back. Returns the status code."""
+        with transaction.atomic():
+            response = getattr(client, method.lower())(path, body, format="json")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            if method != "GET":
+                transaction.set_rollback(True)
+        return response.status_code
+
+    def measure(self, client:APIClient, method:str, route:URLPattern, options:dict) -> dict:
+        path:str = self.path(route)
+        body = self.body(method, route)
+        for _ in range(options["warmup"]):
+            status:int = self.call(client, method, path, body)
+
+        timings:list = []
+        for _ in range(options["iterations"]):
+            start:float = time.perf_counter()
+            status = self.call(client, method, path, body)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.call(client, method, path, body)
+        # Counted now, the next request resets connection.queries; savepoints wrapped around the call aren't the route's
+        query_count:int = sum(not query["sql"].upper().startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO"))
+                              for query in queries.captured_queries)
+        tracemalloc.start()
+        try:
+            self.call(client, method, path, body)
+            peak:int = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        cuts:list = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "path": path,
+            "status": status,
+            "p50_ms": round(cuts[49], 3),
+            "p95_ms": round(cuts[94], 3),
+            "p99_ms": round(cuts[98], 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries": query_count,
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def meta(self, options:dict) -> dict:
+        try:
+            commit:str = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "users": User.objects.count(),
+            "posts": Post.objects.count(),
+            "comments": Comment.objects.count(),
+            "busiest_post_comments": self.context["post"].comment_count,
+        }
+
+    def summary(self, results:dict) -> None:
+        for name, result in results.items():
+            self.stdout.write(f"{name:<45} {result['status']:>3}  p50 {result['p50_ms']:9.2f} ms  "
+                              f"p99 {result['p99_ms']:9.2f} ms  {result['queries']:>4} queries  "
+                              f"{result['peak_kib']:>9.1f} KiB")
+
+    def compare(self, baseline:dict, results:dict) -> None:
+        """Prints p50 / p99 / query / memory changes for the routes present in both runs."""
+        for name, result in results.items():
+            before:dict = baseline.get(name)
+            if before is None:
+                self.stdout.write(f"{name:<45} new route")
+                continue
+            changes:list = [
+                f"{key} {before[key]} -> {result[key]} ({(result[key] - before[key]) / before[key] * 100:+.0f}%)"
+                if before[key] else f"{key} {before[key]} -> {result[key]}"
+                for key in ("p50_ms", "p99_ms", "queries", "peak_kib")
+            ]
+            self.stdout.write(f"{name:<45} " + "  ".join(changes))
+
+
+# Routes that do nothing interesting without a query string
+QUERY_STRINGS:dict = {
+    "posts/search/": "?q=lorem+ipsum",
+}
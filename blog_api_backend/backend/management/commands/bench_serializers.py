@@ -0,0 +1,70 @@
+# pylint: disable=missing-module-docstring
+import time
+from typing import Callable
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from backend.models import Comment, Post, User
+from backend.renderers import ORJSONRenderer
+from backend.serializers import CommentSerializer, PostSerializer, UserSerializer, values_serializer_for
+
+
+class Command(BaseCommand):
+    """Compares the ModelSerializer + JSONRenderer list path against the values() + orjson fast path.
+
+    Rows are seeded inside a transaction that is rolled back at the end, so it is safe to run against any db.
+    """
+    help = "Benchmark list serialization: ModelSerializer/JSONRenderer vs ValuesSerializer/ORJSONRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="rows seeded per model (default 1000)")
+        parser.add_argument("--repeat", type=int, default=20, help="runs per path, the best one is reported")
+
+    def handle(self, *args, **options):
+        rows:int = options["rows"]
+        repeat:int = options["repeat"]
+        with transaction.atomic():
+            self.seed(rows)
+            for label, queryset, serializer_class in (
+                ("users", User.objects.order_by("-created_at", "-id")[:rows], UserSerializer),
+                ("posts", Post.objects.order_by("-created_at", "-id")[:rows], PostSerializer),
+                ("comments", Comment.objects.order_by("-created_at", "-id")[:rows], CommentSerializer),
+            ):
+                values_serializer = values_serializer_for(serializer_class)
+
+                def regular():
+                    return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+                def fast():
+                    return ORJSONRenderer().render(values_serializer.serialize(list(values_serializer.values(queryset))))
+
+                if regular() != fast():
+                    raise CommandError(f"{label}: fast path output differs from {serializer_class.__name__}")
+                regular_time:float = self.best_of(regular, repeat)
+                fast_time:float = self.best_of(fast, repeat)
+                self.stdout.write(f"{label:>9}: {rows} rows  serializer {regular_time * 1000:8.2f} ms  "
+                                  f"fast path {fast_time * 1000:8.2f} ms  speedup x{regular_time / fast_time:.1f}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def best_of(run:Callable, repeat:int) -> float:
+        timings:list = []
+        for _ in range(repeat):
+            start:float = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    @staticmethod
+    def seed(rows:int) -> None:
+        users:list = User.objects.bulk_create(
+            User(username=f"bench-user-{index}", email=f"bench{index}@example.com", first_name="Bénch")
+            for index in range(rows))
+        posts:list = Post.objects.bulk_create(
+            Post(title=f"Post {index}", author=users[index], post_content="lorem ipsum   " * 200)
+            for index in range(rows))
+        Comment.objects.bulk_create(
+            Comment(commenter=users[index], post=posts[-index], comment_content="nice post " * 20)
+            for index in range(rows))
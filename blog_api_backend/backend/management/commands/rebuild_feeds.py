@@ -0,0 +1,68 @@
+# pylint: disable=missing-module-docstring
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from backend import feeds
+from backend.models import Post
+
+
+class Command(BaseCommand):
+    """Rebuilds the global and per-author post feeds (backend/feeds.py) from the database.
+
+    Needed on a cold start, after Redis lost its data, or after a feed update failed. Reads stay on SQL while it
+    runs; the feeds are marked usable again once every one of them has been written.
+    """
+    help = "Rebuild the Redis post feeds (latest posts, latest posts per author) from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="feed entries written per pipeline")
+
+    def handle(self, *args, **options):
+        redis_client = feeds.client()
+        if redis_client is None:
+            raise CommandError("Feeds are disabled, FEEDS_REDIS_URL is not set")
+        length:int = settings.FEED_LENGTH
+        batch_size:int = options["batch_size"]
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(feeds.READY_KEY, feeds.TRUNCATED_KEY, feeds.FEED_KEY,
+                    *redis_client.scan_iter(match=feeds.author_feed_key("*")))
+        pipe.execute()
+
+        latest = Post.objects.order_by("-created_at", "-id").values_list("id", "created_at")
+        written:int = self.write(redis_client, ((feeds.FEED_KEY, pk, created) for pk, created in latest[:length]),
+                                 batch_size)
+        # The newest FEED_LENGTH posts of every author in one pass, numbered by a window function
+        ranked = (Post.objects.filter(author__isnull=False)
+                  .annotate(rank=Window(RowNumber(), partition_by=F("author_id"),
+                                        order_by=[F("created_at").desc(), F("id").desc()]))
+                  .filter(rank__lte=length + 1).values_list("author_id", "id", "created_at", "rank"))
+        truncated:set = {feeds.FEED_KEY} if latest[length:length + 1].exists() else set()
+
+        def author_entries():
+            for author_id, pk, created, rank in ranked.iterator(chunk_size=batch_size):
+                if rank > length:
+                    truncated.add(feeds.author_feed_key(author_id))
+                else:
+                    yield feeds.author_feed_key(author_id), pk, created
+        written += self.write(redis_client, author_entries(), batch_size)
+
+        if truncated:
+            pipe.sadd(feeds.TRUNCATED_KEY, *truncated)
+        pipe.set(feeds.READY_KEY, 1)
+        pipe.execute()
+        self.stdout.write(f"Wrote {written} feed entries ({len(truncated)} feed(s) trimmed to {length})")
+
+    @staticmethod
+    def write(redis_client, entries, batch_size:int) -> int:
+        pipe = redis_client.pipeline(transaction=False)
+        written:int = 0
+        for key, pk, created in entries:
+            pipe.zadd(key, {feeds.member(pk): feeds.score(created)})
+            written += 1
+            if written % batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+        return written
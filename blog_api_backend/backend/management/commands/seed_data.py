@@ -0,0 +1,92 @@
+# pylint: disable=missing-module-docstring
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from backend import cache, feeds
+from backend.models import Comment, Post, User
+
+
+def zipf_weights(size:int, skew:float, rng:random.Random) -> list:
+    """Zipf-like weights ``1 / rank ** skew`` for size items, ranks shuffled so the hot items are spread over ids."""
+    ranks:list = list(range(1, size + 1))
+    rng.shuffle(ranks)
+    return [1 / rank ** skew for rank in ranks]
+
+
+class Command(BaseCommand):
+    """Bulk-seeds a reproducible dataset for load tests and bench_routes.
+
+    Authors and comments follow a Zipf-like distribution (``--skew``): a few users write most posts and a few
+    viral posts get most comments, which is what the listing, counter and cache paths see in production. The
+    denormalized post_count / comment_count counters are filled in consistently, and the same ``--seed`` always
+    produces the same dataset.
+    """
+    help = "Seed users, posts and skewed comment distributions with bulk_create"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="users to create (default 1000)")
+        parser.add_argument("--posts", type=int, default=10000, help="posts to create (default 10000)")
+        parser.add_argument("--comments", type=int, default=100000, help="comments to create (default 100000)")
+        parser.add_argument("--skew", type=float, default=1.1,
+                            help="Zipf exponent of authorship and comments per post, 0 for uniform (default 1.1)")
+        parser.add_argument("--seed", type=int, default=42, help="random seed (default 42)")
+        parser.add_argument("--prefix", default="seed", help="username prefix, must not be in use (default seed)")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or (options["comments"] and options["posts"] < 1):
+            raise CommandError("Need at least one user, and one post when seeding comments")
+        if User.objects.filter(username__startswith=f"{options['prefix']}-user-").exists():
+            raise CommandError(f"Users prefixed {options['prefix']}-user- already exist, pick another --prefix")
+        rng:random.Random = random.Random(options["seed"])
+        skew:float = options["skew"]
+        batch_size:int = getattr(settings, "BULK_BATCH_SIZE", 1000)
+        start:float = time.perf_counter()
+
+        # Every assignment is drawn up front so the counters can be written with the rows themselves
+        user_range:range = range(options["users"])
+        post_range:range = range(options["posts"])
+        authors:list = rng.choices(user_range, weights=zipf_weights(len(user_range), skew, rng), k=len(post_range))
+        comment_posts:list = rng.choices(post_range, weights=zipf_weights(len(post_range), skew, rng),
+                                         k=options["comments"]) if options["comments"] else []
+        commenters:list = rng.choices(user_range, weights=zipf_weights(len(user_range), skew, rng),
+                                      k=options["comments"]) if options["comments"] else []
+        posts_by:Counter = Counter(authors)
+        comments_by:Counter = Counter(commenters)
+        comments_on:Counter = Counter(comment_posts)
+
+        password:str = make_password(None)
+        with transaction.atomic():
+            users:list = User.objects.bulk_create(
+                (User(username=f"{options['prefix']}-user-{index}", email=f"{options['prefix']}{index}@example.com",
+                      first_name="Seed", last_name=str(index), password=password,
+                      post_count=posts_by[index], comment_count=comments_by[index]) for index in user_range),
+                batch_size=batch_size)
+            posts:list = Post.objects.bulk_create(
+                (Post(title=f"Seeded post {index}", author=users[authors[index]], comment_count=comments_on[index],
+                      post_content=" ".join(rng.choices(WORDS, k=rng.randint(20, 400)))) for index in post_range),
+                batch_size=batch_size)
+            Comment.objects.bulk_create(
+                (Comment(post=posts[post_index], commenter=users[user_index],
+                         comment_content=" ".join(rng.choices(WORDS, k=rng.randint(3, 60))))
+                 for post_index, user_index in zip(comment_posts, commenters)),
+                batch_size=batch_size)
+
+        # bulk_create sends no post_save: the feeds miss the seeded posts until rebuild_feeds, and the cached list
+        # pages have to move to a new version
+        feeds.mark_stale()
+        for label in ("user", "post", "comment"):
+            cache.bump_list_version(label)
+        hottest:int = comments_on.most_common(1)[0][1] if comments_on else 0
+        self.stdout.write(f"Seeded {len(users)} users, {len(posts)} posts and {len(comment_posts)} comments in "
+                          f"{time.perf_counter() - start:.1f} s (busiest post: {hottest} comments)")
+
+
+WORDS:list = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et "
+              "dolore magna aliqua django rest api blog post comment cache query index async queue worker latency "
+              "throughput database postgres redis celery python").split()
@@ -0,0 +1,330 @@
+# pylint: disable=missing-module-docstring
+import contextvars
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+
+
+logger = logging.getLogger(__name__)
+
+
+# Request instrumentation: TimingMiddleware (backend/middleware.py) opens a RequestTimings per request, the
+# database execute wrapper and serializer_timer() add to it, and the totals end up in a Server-Timing header and in
+# the histograms below, added up across the gunicorn workers through METRICS_DIR (see collect()).
+
+_current:contextvars.ContextVar = contextvars.ContextVar("blogapi_request_timings", default=None)
+
+DURATION_BUCKETS:tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS:tuple = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestTimings:
+    """What one request spent, in seconds: ``wall``, ``db`` (with ``queries`` and their SQL) and ``serializer``."""
+
+    def __init__(self, keep_sql:int = 0) -> None:
+        self.wall:float = 0.0
+        self.db:float = 0.0
+        self.queries:int = 0
+        self.serializer:float = 0.0
+        self.serializer_depth:int = 0
+        self.keep_sql:int = keep_sql
+        self.sql:list = []
+
+    def record_query(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook timing every query the request runs."""
+        start:float = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration:float = time.perf_counter() - start
+            self.db += duration
+            self.queries += 1
+            if len(self.sql) < self.keep_sql:
+                self.sql.append((duration, sql))
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, durations in milliseconds."""
+        return (f'app;dur={self.wall * 1000:.1f}, db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'serializer;dur={self.serializer * 1000:.1f}')
+
+
+def start_request(keep_sql:int) -> tuple:
+    """Makes a fresh RequestTimings current, returns ``(timings, token)`` for end_request."""
+    timings:RequestTimings = RequestTimings(keep_sql)
+    return timings, _current.set(timings)
+
+
+def end_request(token:contextvars.Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def serializer_timer() -> Iterator[None]:
+    """Adds the time spent in the block to the current request's serializer time, if a request is being timed.
+
+    Only the outermost block counts, so a serializer used inside another one is not counted twice.
+    """
+    timings:RequestTimings = _current.get()
+    if timings is None or timings.serializer_depth:
+        yield
+        return
+    timings.serializer_depth += 1
+    start:float = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer += time.perf_counter() - start
+        timings.serializer_depth -= 1
+
+
+class Histogram:
+    """Prometheus histogram with cumulative buckets, one series per label tuple."""
+
+    def __init__(self, name:str, documentation:str, buckets:tuple, labels:tuple) -> None:
+        self.name:str = name
+        self.documentation:str = documentation
+        self.buckets:tuple = buckets
+        self.labels:tuple = labels
+        self.series:dict = {}
+        self.lock:threading.Lock = threading.Lock()
+
+    def observe(self, label_values:tuple, value:float) -> None:
+        with self.lock:
+            series:list = self.series.setdefault(label_values, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> list:
+        """``[[*label_values, counts, total, observed], ...]``, JSON-safe."""
+        with self.lock:
+            return [[*label_values, list(counts), total, observed]
+                    for label_values, (counts, total, observed) in self.series.items()]
+
+    def exposition(self, series:dict) -> list:
+        """Text format lines of series, ``{label_values: (counts, total, observed)}`` as merged by aggregate()."""
+        lines:list = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, observed) in sorted(series.items()):
+            labels:str = ",".join(f'{key}="{escape(value)}"' for key, value in zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {observed}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {observed}")
+        return lines
+
+
+def escape(value:str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LABELS:tuple = ("view", "method")
+HISTOGRAMS:dict = {
+    "wall": Histogram("blogapi_request_duration_seconds", "Wall time of a request, per view and method.",
+                      DURATION_BUCKETS, REQUEST_LABELS),
+    "db": Histogram("blogapi_request_db_seconds", "Time a request spent running SQL.", DURATION_BUCKETS, REQUEST_LABELS),
+    "queries": Histogram("blogapi_request_queries", "SQL queries run by a request.", QUERY_BUCKETS, REQUEST_LABELS),
+    "serializer": Histogram("blogapi_request_serializer_seconds", "Time a request spent in serializers.",
+                            DURATION_BUCKETS, REQUEST_LABELS),
+}
+_responses_lock = threading.Lock()
+_responses:dict = {}
+
+
+def observe(view:str, method:str, status:int, timings:RequestTimings) -> None:
+    """Adds a finished request to the histograms and to the per status response counter."""
+    for name, histogram in HISTOGRAMS.items():
+        histogram.observe((view, method), getattr(timings, name))
+    with _responses_lock:
+        _responses[(view, method, str(status))] = _responses.get((view, method, str(status)), 0) + 1
+    flush()
+
+
+# Database connections of this process. With CONN_MAX_AGE each worker thread keeps its own connection open
+# between requests: "opened" growing as fast as the request count means connections aren't being reused.
+_connections_lock = threading.Lock()
+_connections:weakref.WeakSet = weakref.WeakSet()
+_connections_opened:dict = {}
+
+
+def connection_created(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver (connected in backend/apps.py) keeping track of opened connections."""
+    with _connections_lock:
+        _connections.add(connection)
+        _connections_opened[connection.alias] = _connections_opened.get(connection.alias, 0) + 1
+
+
+def snapshot() -> dict:
+    """Every metric of this process, JSON-safe: what a worker writes to METRICS_DIR."""
+    with _responses_lock:
+        responses:list = [[*key, count] for key, count in _responses.items()]
+    with _connections_lock:
+        opened:dict = dict(_connections_opened)
+        wrappers:list = list(_connections)
+    open_now:dict = dict.fromkeys(opened, 0)
+    for wrapper in wrappers:
+        if wrapper.connection is not None:
+            open_now[wrapper.alias] = open_now.get(wrapper.alias, 0) + 1
+    return {"responses": responses, "histograms": {name: histogram.snapshot() for name, histogram in HISTOGRAMS.items()},
+            "connections_opened": opened, "connections_open": open_now}
+
+
+def aggregate(snapshots:list) -> dict:
+    """Sums snapshots of several processes: counters and histograms add up, and so do the open connections."""
+    merged:dict = {"responses": {}, "histograms": {name: {} for name in HISTOGRAMS}, "connections_opened": {},
+                   "connections_open": {}}
+    for state in snapshots:
+        for *key, count in state.get("responses", ()):
+            merged["responses"][tuple(key)] = merged["responses"].get(tuple(key), 0) + count
+        for name, series in state.get("histograms", {}).items():
+            target:dict = merged["histograms"].setdefault(name, {})
+            for *label_values, counts, total, observed in series:
+                current = target.get(tuple(label_values), ([0] * len(counts), 0.0, 0))
+                target[tuple(label_values)] = ([a + b for a, b in zip(current[0], counts)], current[1] + total,
+                                               current[2] + observed)
+        for field in ("connections_opened", "connections_open"):
+            for alias, count in state.get(field, {}).items():
+                merged[field][alias] = merged[field].get(alias, 0) + count
+    return merged
+
+
+# Gunicorn runs several worker processes behind one port and a scrape reaches whichever worker accepts it. With
+# METRICS_DIR set (gunicorn.conf.py does) every worker writes its snapshot there, at most every
+# METRICS_FLUSH_SECONDS and when it exits, and /metrics adds up the files of all workers. The counters of exited
+# workers are folded into ARCHIVE_FILE by the master (mark_process_dead), so totals never go backwards when workers
+# are recycled; their open connections are dropped. Without METRICS_DIR the metrics are those of this process.
+
+ARCHIVE_FILE:str = "archive.json"
+_last_flush:list = [0.0]
+
+
+def worker_file(directory:str, pid:int) -> str:
+    return os.path.join(directory, f"worker-{pid}.json")
+
+
+def _write_json(path:str, data:dict) -> None:
+    # Written aside then renamed, so a reader never sees half a file
+    temporary:str = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output:
+        json.dump(data, output)
+    os.replace(temporary, path)
+
+
+def _read_json(path:str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return None
+
+
+def flush(force:bool = False) -> None:
+    """Writes this process's snapshot to METRICS_DIR, unless the last write is under METRICS_FLUSH_SECONDS old."""
+    directory:str = settings.METRICS_DIR
+    if not directory or (not force and time.monotonic() - _last_flush[0] < settings.METRICS_FLUSH_SECONDS):
+        return
+    _last_flush[0] = time.monotonic()
+    try:
+        _write_json(worker_file(directory, os.getpid()), snapshot())
+    except OSError:
+        logger.warning("Could not write the metrics of worker %s", os.getpid(), exc_info=True)
+
+
+def mark_process_dead(pid:int, directory:str = None) -> None:
+    """Folds the counters and histograms of an exited worker into the archive and drops its file (gunicorn's
+    ``child_exit`` hook, in the master).
+    """
+    directory = directory or settings.METRICS_DIR
+    state:dict = _read_json(worker_file(directory, pid)) if directory else None
+    if state is None:
+        return
+    archive:dict = _read_json(os.path.join(directory, ARCHIVE_FILE)) or {}
+    state["connections_open"] = {}
+    merged:dict = aggregate([archive, state])
+    # The pids folded in: a scrape between the two steps below must not count a worker twice. Pruned once their
+    # worker file is gone.
+    pids:list = [dead for dead in archive.get("pids", []) if os.path.exists(worker_file(directory, dead))] + [pid]
+    _write_json(os.path.join(directory, ARCHIVE_FILE), {
+        "pids": pids,
+        "responses": [[*key, count] for key, count in merged["responses"].items()],
+        "histograms": {name: [[*label_values, counts, total, observed]
+                              for label_values, (counts, total, observed) in series.items()]
+                       for name, series in merged["histograms"].items()},
+        "connections_opened": merged["connections_opened"],
+    })
+    os.remove(worker_file(directory, pid))
+
+
+def collect() -> dict:
+    """The metrics to expose: every worker's when METRICS_DIR is set, else this process's."""
+    directory:str = settings.METRICS_DIR
+    if not directory:
+        return aggregate([snapshot()])
+    flush(force=True)
+    archive:dict = _read_json(os.path.join(directory, ARCHIVE_FILE)) or {}
+    archived:set = set(archive.get("pids", ()))
+    states:list = [archive]
+    for name in os.listdir(directory):
+        if name.startswith("worker-") and name.endswith(".json") and int(name[7:-5]) not in archived:
+            state:dict = _read_json(os.path.join(directory, name))
+            if state is not None:
+                states.append(state)
+    return aggregate(states)
+
+
+def connection_exposition(state:dict) -> list:
+    lines:list = ["# HELP blogapi_db_connections_opened_total Database connections opened, per alias.",
+                  "# TYPE blogapi_db_connections_opened_total counter"]
+    lines.extend(f'blogapi_db_connections_opened_total{{alias="{alias}"}} {count}'
+                 for alias, count in sorted(state["connections_opened"].items()))
+    lines.extend(["# HELP blogapi_db_connections_open Database connections currently open, per alias.",
+                  "# TYPE blogapi_db_connections_open gauge"])
+    lines.extend(f'blogapi_db_connections_open{{alias="{alias}"}} {count}'
+                 for alias, count in sorted(state["connections_open"].items()))
+    return lines
+
+
+def exposition() -> str:
+    """Every metric in the Prometheus text format (version 0.0.4)."""
+    state:dict = collect()
+    lines:list = ["# HELP blogapi_responses_total Responses sent, per view, method and status code.",
+                  "# TYPE blogapi_responses_total counter"]
+    for (view, method, status), count in sorted(state["responses"].items()):
+        lines.append(f'blogapi_responses_total{{view="{escape(view)}",method="{method}",status="{status}"}} {count}')
+    for name, histogram in HISTOGRAMS.items():
+        lines.extend(histogram.exposition(state["histograms"][name]))
+    lines.extend(connection_exposition(state))
+    return "\n".join(lines) + "\n"
+
+
+def scrape_allowed(request:HttpRequest) -> bool:
+    """True for a client in METRICS_ALLOWED_IPS or sending the METRICS_TOKEN bearer token."""
+    if settings.METRICS_TOKEN and hmac.compare_digest(request.headers.get("Authorization", "").encode(),
+                                                      f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request:HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint (/metrics). nginx doesn't route it, but docker-compose publishes the backend ports:
+    only scrape_allowed clients get an answer.
+    """
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
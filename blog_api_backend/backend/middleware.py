@@ -0,0 +1,200 @@
+# pylint: disable=missing-module-docstring
+import contextvars
+import hashlib
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpRequest, HttpResponse, JsonResponse
+
+from backend import metrics, routers, throttling
+
+
+logger = logging.getLogger(__name__)
+
+
+class TimingMiddleware:
+    """Times every request: wall time, SQL time and query count, and time spent in serializers.
+
+    The totals are sent back in a ``Server-Timing`` header (visible in the browser's network panel), added to the
+    /metrics histograms, and requests slower than ``SLOW_REQUEST_MS`` are logged with their slowest queries.
+    Works in front of both the sync views and the async views of backend/async_views.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request:HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = metrics.start_request(settings.SLOW_REQUEST_LOGGED_QUERIES)
+        start:float = time.perf_counter()
+        try:
+            with self.instrumented_connections(timings):
+                response:HttpResponse = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request:HttpRequest) -> HttpResponse:
+        timings, token = metrics.start_request(settings.SLOW_REQUEST_LOGGED_QUERIES)
+        start:float = time.perf_counter()
+        # Connections are thread-local: the wrappers go on the ones of the thread running this request's async ORM calls
+        stack:ExitStack = await sync_to_async(self.instrumented_connections)(timings)
+        try:
+            response:HttpResponse = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            metrics.end_request(token)
+        return self.finish(request, response, timings, start)
+
+    @staticmethod
+    def instrumented_connections(timings:metrics.RequestTimings) -> ExitStack:
+        """Installs timings.record_query on every database connection of the calling thread, until closed."""
+        stack:ExitStack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings.record_query))
+        return stack
+
+    @staticmethod
+    def finish(request:HttpRequest, response:HttpResponse, timings:metrics.RequestTimings,
+               start:float) -> HttpResponse:
+        timings.wall = time.perf_counter() - start
+        # The route pattern, not the path, so ids don't turn every object into its own series
+        view:str = request.resolver_match.route if request.resolver_match is not None else "unmatched"
+        response["Server-Timing"] = timings.server_timing()
+        metrics.observe(view, request.method, response.status_code, timings)
+        if timings.wall * 1000 >= settings.SLOW_REQUEST_MS:
+            slowest:list = sorted(timings.sql, key=lambda query: query[0], reverse=True)
+            logger.warning("Slow request %s %s -> %s: %.1f ms, %d queries in %.1f ms, serializers %.1f ms%s",
+                           request.method, request.get_full_path(), response.status_code, timings.wall * 1000,
+                           timings.queries, timings.db * 1000, timings.serializer * 1000,
+                           "".join(f"\n  {duration * 1000:8.1f} ms  {sql}" for duration, sql in slowest))
+        return response
+
+
+STICKY_COOKIE:str = "blogapi_primary"
+
+
+def sticky_key(authorization:str) -> str:
+    """Cache key pinning the client sending this Authorization header to the primary (the header is hashed)."""
+    return "blogapi:primary:" + hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+
+class ReadYourWritesMiddleware:
+    """Pins to the primary every write request, and the reads of a client for READ_YOUR_WRITES_SECONDS after it
+    wrote, so ``create_new_post`` followed by ``GET /api/posts/<id>/`` never reads a replica that hasn't caught up.
+
+    Browsers are recognised by a cookie holding the end of their window; token clients, which usually drop
+    cookies, by a cache entry keyed by their Authorization header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request:HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        authorization:str = request.headers.get("Authorization")
+        pinned:bool = (self.writes(request) or self.cookie_window(request)
+                       or bool(authorization and cache.get(sticky_key(authorization))))
+        token:contextvars.Token = routers.pin(pinned)
+        try:
+            response:HttpResponse = self.get_response(request)
+        finally:
+            routers.unpin(token)
+        if self.writes(request):
+            if authorization:
+                cache.set(sticky_key(authorization), True, timeout=settings.READ_YOUR_WRITES_SECONDS)
+            self.set_cookie(response)
+        return response
+
+    async def __acall__(self, request:HttpRequest) -> HttpResponse:
+        authorization:str = request.headers.get("Authorization")
+        pinned:bool = (self.writes(request) or self.cookie_window(request)
+                       or bool(authorization and await cache.aget(sticky_key(authorization))))
+        token:contextvars.Token = routers.pin(pinned)
+        try:
+            response:HttpResponse = await self.get_response(request)
+        finally:
+            routers.unpin(token)
+        if self.writes(request):
+            if authorization:
+                await cache.aset(sticky_key(authorization), True, timeout=settings.READ_YOUR_WRITES_SECONDS)
+            self.set_cookie(response)
+        return response
+
+    @staticmethod
+    def writes(request:HttpRequest) -> bool:
+        return request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+
+    @staticmethod
+    def cookie_window(request:HttpRequest) -> bool:
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    @staticmethod
+    def set_cookie(response:HttpResponse) -> None:
+        window:int = settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(STICKY_COOKIE, f"{time.time() + window:.3f}", max_age=window, httponly=True,
+                            samesite="Lax")
+
+
+class LoadSheddingMiddleware:
+    """Answers writes with an immediate 503 while LOAD_SHEDDING_MAX_IN_FLIGHT writes are already running, counted
+    across every worker (backend/throttling.py).
+
+    Turning the excess away before it queues on database locks and connections keeps the admitted writes, and the
+    reads sharing the database with them, fast instead of slowing every request down together.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request:HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not ReadYourWritesMiddleware.writes(request):
+            return self.get_response(request)
+        slot:str = throttling.admit()
+        if slot is None:
+            return self.shed()
+        try:
+            return self.get_response(request)
+        finally:
+            throttling.release(slot)
+
+    async def __acall__(self, request:HttpRequest) -> HttpResponse:
+        if not ReadYourWritesMiddleware.writes(request):
+            return await self.get_response(request)
+        slot:str = await sync_to_async(throttling.admit)()
+        if slot is None:
+            return self.shed()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(throttling.release)(slot)
+
+    @staticmethod
+    def shed() -> HttpResponse:
+        response:HttpResponse = JsonResponse({"error": "Server busy, retry shortly"}, status=503)
+        response["Retry-After"] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+        return response
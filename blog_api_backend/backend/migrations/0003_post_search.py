@@ -0,0 +1,73 @@
+from django.db import migrations
+
+
+# PostgreSQL: a generated tsvector column (kept up to date by the database itself) with a GIN index
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE backend_post ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(post_content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX post_search_vector_idx ON backend_post USING gin (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS post_search_vector_idx",
+    "ALTER TABLE backend_post DROP COLUMN IF EXISTS search_vector",
+]
+
+# SQLite (tests): an external-content FTS5 table kept in sync with triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE backend_post_fts USING fts5(
+        title, post_content, content='backend_post', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER backend_post_fts_insert AFTER INSERT ON backend_post BEGIN
+        INSERT INTO backend_post_fts(rowid, title, post_content) VALUES (new.id, new.title, new.post_content);
+    END
+    """,
+    """
+    CREATE TRIGGER backend_post_fts_delete AFTER DELETE ON backend_post BEGIN
+        INSERT INTO backend_post_fts(backend_post_fts, rowid, title, post_content)
+        VALUES ('delete', old.id, old.title, old.post_content);
+    END
+    """,
+    """
+    CREATE TRIGGER backend_post_fts_update AFTER UPDATE OF title, post_content ON backend_post BEGIN
+        INSERT INTO backend_post_fts(backend_post_fts, rowid, title, post_content)
+        VALUES ('delete', old.id, old.title, old.post_content);
+        INSERT INTO backend_post_fts(rowid, title, post_content) VALUES (new.id, new.title, new.post_content);
+    END
+    """,
+    "INSERT INTO backend_post_fts(backend_post_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS backend_post_fts_update",
+    "DROP TRIGGER IF EXISTS backend_post_fts_delete",
+    "DROP TRIGGER IF EXISTS backend_post_fts_insert",
+    "DROP TABLE IF EXISTS backend_post_fts",
+]
+
+
+def run_for_vendor(postgres:list, sqlite:list):
+    def run(apps, schema_editor):
+        statements = {"postgresql": postgres, "sqlite": sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0002_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_REVERSE, SQLITE_REVERSE),
+        ),
+    ]
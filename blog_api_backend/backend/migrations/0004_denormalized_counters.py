@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-18 04:03
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+post_search = import_module("backend.migrations.0003_post_search")
+
+BACKFILL_COUNTERS = [
+    """
+    UPDATE backend_post SET comment_count = (
+        SELECT COUNT(*) FROM backend_comment WHERE backend_comment.post_id = backend_post.id
+    )
+    """,
+    """
+    UPDATE backend_user SET
+        post_count = (SELECT COUNT(*) FROM backend_post WHERE backend_post.author_id = backend_user.id),
+        comment_count = (SELECT COUNT(*) FROM backend_comment WHERE backend_comment.commenter_id = backend_user.id)
+    """,
+]
+
+# Adding a column makes SQLite rebuild backend_post, which drops the FTS5 sync triggers from 0003_post_search
+SQLITE_FTS_TRIGGERS = [statement for statement in post_search.SQLITE_FORWARD if "CREATE TRIGGER" in statement]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('backend', '0003_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_COUNTERS, migrations.RunSQL.noop),
+        migrations.RunPython(post_search.run_for_vendor([], SQLITE_FTS_TRIGGERS), migrations.RunPython.noop),
+        # The counter indexes are built concurrently by 0006_counter_indexes, outside this migration's transaction
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.3 on 2026-10-18 04:21
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+post_search = import_module("backend.migrations.0003_post_search")
+counters = import_module("backend.migrations.0004_denormalized_counters")
+
+
+def make_excerpt(content:str, length:int = 200) -> str:
+    """Frozen copy of backend.models.make_excerpt as of this migration, so later changes to the model helper don't
+    change what the backfill writes.
+    """
+    text:str = " ".join(content.split())
+    if len(text) <= length:
+        return text
+    cut:str = text[:length]
+    if cut.rfind(" ") > length // 2:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" .,;:!?-") + "\u2026"
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Computes the excerpt of existing posts, a few thousand rows per UPDATE round trip."""
+    Post = apps.get_model("backend", "Post")
+    batch:list = []
+    for post in Post.objects.only("id", "post_content").order_by("id").iterator(chunk_size=2000):
+        post.excerpt = make_excerpt(post.post_content)
+        batch.append(post)
+        if len(batch) == 2000:
+            Post.objects.bulk_update(batch, ["excerpt"])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ["excerpt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+        # The new column makes SQLite rebuild backend_post again, dropping the FTS5 sync triggers
+        migrations.RunPython(post_search.run_for_vendor([], counters.SQLITE_FTS_TRIGGERS), migrations.RunPython.noop),
+    ]
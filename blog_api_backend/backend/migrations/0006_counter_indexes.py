@@ -0,0 +1,31 @@
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+listing_indexes = import_module("backend.migrations.0002_listing_indexes")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('backend', '0005_post_excerpt'),
+    ]
+
+    operations = [
+        listing_indexes.AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['comment_count', 'id'], name='post_comment_count_idx'),
+        ),
+        listing_indexes.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['post_count', 'id'], name='user_post_count_idx'),
+        ),
+        listing_indexes.AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['comment_count', 'id'], name='user_comment_count_idx'),
+        ),
+    ]
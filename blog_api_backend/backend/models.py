@@ -6,6 +6,14 @@ from django.contrib.auth.models import AbstractUser
 class User(AbstractUser):
     # pylint: disable=too-few-public-methods
     """User Class, defines properties of User model in Django"""
+    class Meta(AbstractUser.Meta):
+        """Keeps AbstractUser's options, adds the index backing the keyset-paginated user listing"""
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="user_created_id_idx"),
+            models.Index(fields=["post_count", "id"], name="user_post_count_idx"),
+            models.Index(fields=["comment_count", "id"], name="user_comment_count_idx"),
+        ]
+
     first_name:models.CharField = models.CharField(max_length=50, blank=True)
     last_name:models.CharField = models.CharField(max_length=50, blank=True)
     email:models.EmailField = models.EmailField()
@@ -13,6 +21,10 @@ class User(AbstractUser):
     updated_at:models.DateTimeField = models.DateTimeField(auto_now=True)
     can_post:models.BooleanField = models.BooleanField(default=False)
     can_comment:models.BooleanField = models.BooleanField(default=True)
+    # Denormalized counters: post_count follows Post saves and deletes (backend/apps.py), comment_count the comment
+    # create/delete views (reconcile_counters repairs any drift)
+    post_count:models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    comment_count:models.PositiveIntegerField = models.PositiveIntegerField(default=0)
 
     def __str__(self) -> str:
         if self.first_name == "" and self.last_name == "":
@@ -21,12 +33,42 @@ class User(AbstractUser):
 
 
 
+# Characters kept in Post.excerpt, the short preview listings can ask for instead of the full post_content
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content:str, length:int = EXCERPT_LENGTH) -> str:
+    """Whitespace-collapsed start of content, cut on a word boundary and ellipsized when longer than length."""
+    text:str = " ".join(content.split())
+    if len(text) <= length:
+        return text
+    cut:str = text[:length]
+    if cut.rfind(" ") > length // 2:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip(" .,;:!?-") + "\u2026"
+
+
+class PostQuerySet(models.QuerySet):
+    """Fills in the excerpt of bulk-created posts, which bulk_create would otherwise leave empty (save() isn't called)."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for post in objs:
+            post.excerpt = make_excerpt(post.post_content)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Post(models.Model):
     # pylint: disable=too-few-public-methods
     """Post Class, defines properties of Post model in Django"""
     class Meta:
-        """Tells Django to label it as 'Posts' in Admin interface"""
+        """Tells Django to label it as 'Posts' in Admin interface, indexes back the keyset-paginated listings"""
         verbose_name_plural = "Posts"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="post_created_id_idx"),
+            models.Index(fields=["author", "created_at", "id"], name="post_author_created_idx"),
+            models.Index(fields=["comment_count", "id"], name="post_comment_count_idx"),
+        ]
 
     title:models.CharField = models.CharField(max_length=100)
     created_at:models.DateTimeField = models.DateTimeField(auto_now_add=True)
@@ -39,6 +81,31 @@ class Post(models.Model):
         related_name="posts",
     )
     post_content:models.CharField = models.CharField(max_length=20000)
+    # Derived from post_content on every save (and bulk_create), never edited directly
+    excerpt:models.CharField = models.CharField(max_length=EXCERPT_LENGTH + 1, blank=True, default="", editable=False)
+    # Denormalized number of comments, kept in step by the comment create/delete views
+    comment_count:models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The author the row was read with: a save moving the post to another author moves it between their
+        # post_count and feeds too (see BackendConfig.ready)
+        if "author_id" in instance.__dict__:
+            instance.loaded_author_id = instance.author_id
+        return instance
+
+    def save(self, *args, **kwargs) -> None:
+        self.excerpt = make_excerpt(self.post_content)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "post_content" in update_fields and "excerpt" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "excerpt"]
+        super().save(*args, **kwargs)
 
 
 
@@ -46,8 +113,13 @@ class Comment(models.Model):
     # pylint: disable=too-few-public-methods
     """Comment Class, defines properties of Comment model in Django"""
     class Meta:
-        """Tells Django to label it as 'Comments' in Admin interface"""
+        """Tells Django to label it as 'Comments' in Admin interface, indexes back the keyset-paginated listings"""
         verbose_name_plural = "Comments"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="comment_created_id_idx"),
+            models.Index(fields=["post", "created_at", "id"], name="comment_post_created_idx"),
+            models.Index(fields=["commenter", "created_at", "id"], name="comment_commenter_created_idx"),
+        ]
 
     commenter:models.ForeignKey = models.ForeignKey(
         "User",
@@ -0,0 +1,285 @@
+# pylint: disable=missing-module-docstring
+import base64
+import json
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def clamped_page_size(request:Request, param:str, default:int, maximum:int) -> int:
+    """Reads ``?page_size=`` from the request, clamped to ``[1, maximum]``."""
+    try:
+        page_size = int(request.query_params[param])
+    except (KeyError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+class KeysetPagination(BasePagination):
+    """Opaque-cursor keyset pagination over a fixed ordering (newest first by default).
+
+    Each page is fetched with a ``WHERE (created_at, id) < (cursor)`` style filter and a ``LIMIT page_size + 1``,
+    so the cost of a page does not grow with how deep the client has paged and no ``COUNT(*)`` is ever issued.
+    The cursor is a base64 encoded JSON list holding the ordering values of the boundary row and the direction.
+    """
+    ordering:tuple = ("-created_at", "-id")
+    cursor_query_param:str = "cursor"
+    page_size_query_param:str = "page_size"
+
+    def __init__(self, ordering:tuple = None) -> None:
+        if ordering is not None:
+            self.ordering = ordering
+        self.page_size:int = api_settings.PAGE_SIZE or 50
+        self.max_page_size:int = getattr(settings, "MAX_PAGE_SIZE", 200)
+        self.base_url:str = None
+        self.has_next:bool = False
+        self.has_previous:bool = False
+        self.next_position:list = None
+        self.previous_position:list = None
+
+    def get_page_size(self, request:Request) -> int:
+        return clamped_page_size(request, self.page_size_query_param, self.page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset:QuerySet, request:Request, view:Any = None) -> list:
+        """Returns the page of ``queryset`` selected by the request's cursor.
+
+        Args:
+            queryset (QuerySet): unordered queryset to paginate, may be a ``.values()`` queryset
+            request (rest_framework.request.Request): HTTP request carrying ``cursor`` / ``page_size``
+            view: unused, kept for DRF's pagination interface
+
+        Return:
+            list: the rows of the requested page, always in ``self.ordering`` order
+        """
+        queryset, page_size, position, reverse = self._page_query(queryset, request)
+        return self._page(list(queryset[:page_size + 1]), page_size, position, reverse)
+
+    def paginate_rows(self, rows:list, request:Request) -> list:
+        """paginate_queryset for rows that were fetched elsewhere (e.g. from a feed): ``rows`` must already be in
+        ``self.ordering`` order, start after the request's forward cursor and hold ``page_size + 1`` rows unless
+        the end of the list was reached.
+        """
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request)
+        return self._page(rows, self.get_page_size(request), position, reverse)
+
+    async def apaginate_queryset(self, queryset:QuerySet, request:Request) -> list:
+        """paginate_queryset for async views: the page is fetched with ``async for`` instead of blocking."""
+        queryset, page_size, position, reverse = self._page_query(queryset, request)
+        return self._page([row async for row in queryset[:page_size + 1]], page_size, position, reverse)
+
+    def _page_query(self, queryset:QuerySet, request:Request) -> tuple:
+        """Orders and filters queryset for the request's cursor, returns ``(queryset, page_size, position, reverse)``."""
+        self.base_url = request.build_absolute_uri()
+        page_size:int = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*(self._reversed(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._seek(self._to_python(queryset, position), reverse))
+        return queryset, page_size, position, reverse
+
+    def _page(self, rows:list, page_size:int, position:list, reverse:bool) -> list:
+        """Trims the ``page_size + 1`` fetched rows to the page and records the next/previous positions."""
+        has_more:bool = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.next_position = self._position(rows[-1]) if rows and self.has_next else None
+        self.previous_position = self._position(rows[0]) if rows and self.has_previous else None
+        return rows
+
+    def get_paginated_response(self, data:list) -> Response:
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema:dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self) -> str:
+        if self.next_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position, reverse=False))
+
+    def get_previous_link(self) -> str:
+        if self.previous_position is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   self.encode_cursor(self.previous_position, reverse=True))
+
+    def encode_cursor(self, position:list, reverse:bool) -> str:
+        payload:str = json.dumps([position, int(reverse)], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request:Request) -> tuple:
+        """Returns ``(position, reverse)`` from ``?cursor=``, or ``(None, False)`` for the first page."""
+        encoded:str = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(position)
+            return position, bool(reverse)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Invalid cursor")
+
+    def _position(self, row:Any) -> list:
+        """The ordering values of ``row`` (a model instance or a ``.values()`` dict), JSON-safe."""
+        position:list = []
+        for field in self.ordering:
+            name:str = field.lstrip("-")
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return position
+
+    def _to_python(self, queryset:QuerySet, position:list) -> list:
+        """Converts decoded cursor values back to the model field types, rejecting tampered cursors."""
+        try:
+            return [queryset.model._meta.get_field(field.lstrip("-")).to_python(value)
+                    for field, value in zip(self.ordering, position)]
+        except ValidationError:
+            raise NotFound("Invalid cursor")
+
+    def _seek(self, position:list, reverse:bool) -> Q:
+        """Builds the row-value comparison ``(f1, f2, ...) </> (v1, v2, ...)`` as an OR of equal prefixes."""
+        condition:Q = Q()
+        for index, field in enumerate(self.ordering):
+            name:str = field.lstrip("-")
+            descending:bool = field.startswith("-") != reverse
+            branch:Q = Q(**{f"{name}__{'lt' if descending else 'gt'}": position[index]})
+            for prev_field, prev_value in zip(self.ordering[:index], position[:index]):
+                branch &= Q(**{prev_field.lstrip("-"): prev_value})
+            condition |= branch
+        return condition
+
+    @staticmethod
+    def _reversed(ordering:tuple) -> tuple:
+        return tuple(field[1:] if field.startswith("-") else "-" + field for field in ordering)
+
+
+class RankedPagination(BasePagination):
+    """Page-number pagination for relevance-ordered results (search), which have no stable keyset.
+
+    Like KeysetPagination it never counts: it fetches ``page_size + 1`` rows to know whether there is a next page.
+    Depth is capped at ``SEARCH_MAX_RESULTS`` rows so a deep page can't turn into a huge OFFSET scan.
+    """
+    page_query_param:str = "page"
+    page_size_query_param:str = "page_size"
+
+    def __init__(self) -> None:
+        self.page_size:int = api_settings.PAGE_SIZE or 50
+        self.max_page_size:int = getattr(settings, "MAX_PAGE_SIZE", 200)
+        self.max_results:int = getattr(settings, "SEARCH_MAX_RESULTS", 1000)
+        self.base_url:str = None
+        self.page:int = 1
+        self.offset:int = 0
+        self.has_next:bool = False
+
+    def paginate_queryset(self, queryset:QuerySet, request:Request, view:Any = None) -> list:
+        queryset, limit = self._page_query(queryset, request)
+        return self._page(list(queryset[:limit + 1]), limit)
+
+    async def apaginate_queryset(self, queryset:QuerySet, request:Request) -> list:
+        queryset, limit = self._page_query(queryset, request)
+        return self._page([row async for row in queryset[:limit + 1]], limit)
+
+    def _page_query(self, queryset:QuerySet, request:Request) -> tuple:
+        """Slices queryset at the requested page's offset, returns ``(queryset, limit)``."""
+        self.base_url = request.build_absolute_uri()
+        page_size:int = clamped_page_size(request, self.page_size_query_param, self.page_size, self.max_page_size)
+        try:
+            self.page = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            raise NotFound("Invalid page")
+        offset:int = (self.page - 1) * page_size
+        if self.page < 1 or offset >= self.max_results:
+            raise NotFound("Invalid page")
+        limit:int = min(page_size, self.max_results - offset)
+        self.offset = offset
+        return queryset[offset:], limit
+
+    def _page(self, rows:list, limit:int) -> list:
+        self.has_next = len(rows) > limit and self.offset + limit < self.max_results
+        return rows[:limit]
+
+    def get_paginated_response(self, data:list) -> Response:
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self) -> str:
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.page_query_param, self.page + 1)
+
+    def get_previous_link(self) -> str:
+        if self.page <= 1:
+            return None
+        if self.page == 2:
+            return remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(self.base_url, self.page_query_param, self.page - 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin changelist paginator that uses PostgreSQL's row estimates instead of an exact ``COUNT(*)`` on big tables.
+
+    An unfiltered changelist reads ``pg_class.reltuples`` (kept current by autovacuum / ANALYZE), a filtered or
+    searched one the planner's estimate from ``EXPLAIN``. Estimates under ``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows,
+    and every count on other databases, are exact, so small tables and narrow filters still page precisely.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and connections[queryset.db].vendor == "postgresql":
+            estimate:int = self.estimate(queryset)
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate(queryset:QuerySet) -> int:
+        """Planner's idea of how many rows queryset returns, -1 when the table was never analyzed."""
+        with connections[queryset.db].cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                return row[0] if row is not None else -1
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
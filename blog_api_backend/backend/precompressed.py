@@ -0,0 +1,129 @@
+# pylint: disable=missing-module-docstring
+import functools
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_http_date
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from backend import cache, conditional, routers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+
+# Rendered list pages are cached once per content version with their gzip (and brotli) variants, so a popular page
+# is serialized and compressed once per write instead of on every request. The version of a list is the version of
+# every model label it depends on (backend.cache.list_versions), bumped by cache.invalidate() on each write. A page
+# read from a lagging replica can be served for up to LIST_CACHE_TIMEOUT, as eventually consistent as the replica.
+
+GZIP_LEVEL:int = 6
+BROTLI_QUALITY:int = 5
+
+
+def accepted_encoding(header:str) -> str:
+    """Best encoding the client accepts among what we store: ``br``, then ``gzip``, else ``identity``.
+
+    Args:
+        header (str): the ``Accept-Encoding`` request header, e.g. ``gzip, deflate, br;q=0.9``
+
+    Return:
+        str: the content coding to answer with
+    """
+    weights:dict = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality:float = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+    offered:list = (["br"] if brotli is not None else []) + ["gzip"]
+    for coding in offered:
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def response_key(request:Request, labels:tuple) -> str:
+    """Cache key of one rendered list page: its absolute URL (links in the page embed the host), the negotiated
+    media type and the current version of the lists it depends on.
+    """
+    versions:tuple = cache.list_versions(labels)
+    identity:str = f"{request.build_absolute_uri()}|{request.accepted_media_type}|{versions}"
+    return "blogapi:list-response:" + hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def compress(body:bytes) -> dict:
+    """The stored variants of a rendered body. Bodies under ``COMPRESS_MIN_BYTES`` are only kept as they are."""
+    variants:dict = {"identity": body}
+    if len(body) >= settings.COMPRESS_MIN_BYTES:
+        variants["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def cached_response(request:Request, entry:dict) -> HttpResponse:
+    coding:str = accepted_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if coding not in entry["variants"]:
+        coding = "identity"
+    response:HttpResponse = HttpResponse(entry["variants"][coding], content_type=entry["content_type"])
+    if coding != "identity":
+        response["Content-Encoding"] = coding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return conditional.set_validators(response, entry["etag"], entry["last_modified"])
+
+
+def precompressed_list(*labels:str) -> Callable:
+    """Caches the rendered 200 responses of a list view, per content version of ``labels``.
+
+    Goes under ``@api_view`` so authentication, permissions and content negotiation still run on every request.
+    Only JSON responses are cached (not the browsable API) and a conditional request is answered with a 304 from
+    the cached validators without touching the database. ``LIST_CACHE_TIMEOUT = 0`` turns the cache off.
+
+    Args:
+        *labels (str): cache labels ("user", "post", "comment") whose writes change the list
+    """
+    def decorator(view:Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(request:Request, *args, **kwargs):
+            # A client in its read-your-writes window must not get a page cached from a replica before its write
+            if (not settings.LIST_CACHE_TIMEOUT or request.accepted_renderer.format != "json"
+                    or routers.pinned()):
+                return view(request, *args, **kwargs)
+            key:str = response_key(request, labels)
+            entry:dict = django_cache.get(key)
+            if entry is not None:
+                not_modified = conditional.not_modified(request, entry["etag"], entry["last_modified"])
+                return not_modified if not_modified is not None else cached_response(request, entry)
+
+            response = view(request, *args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = {"request": request, "response": response, "view": None}
+            response.render()
+            entry = {
+                "variants": compress(response.content),
+                "content_type": response["Content-Type"],
+                "etag": response.get("ETag"),
+                "last_modified": (datetime.fromtimestamp(parse_http_date(response["Last-Modified"]), tz=timezone.utc)
+                                  if "Last-Modified" in response else None),
+            }
+            django_cache.set(key, entry, timeout=settings.LIST_CACHE_TIMEOUT)
+            return cached_response(request, entry)
+        return wrapper
+    return decorator
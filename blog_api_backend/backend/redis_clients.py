@@ -0,0 +1,160 @@
+# pylint: disable=missing-module-docstring
+import fnmatch
+import threading
+from typing import Callable
+
+import redis
+
+
+# The Redis clients of the modules keeping state in Redis (feeds, throttling), one per URL for the whole process.
+# A ``memory://`` URL gets an InProcessRedis instead, so the tests and a development setup run without a server.
+
+
+class InProcessRedis:
+    """Just enough of a Redis client (sorted sets, strings, pipelines, scripts) for the feeds and the throttles, kept
+    in this process.
+
+    Used when a Redis URL setting is ``memory://``: the tests, and development without a Redis server.
+    """
+
+    def __init__(self) -> None:
+        self.data:dict = {}
+        self.lock:threading.Lock = threading.Lock()
+
+    def register_script(self, script:str) -> Callable:
+        """Like redis-py's, returns a callable ``(keys, args)``; runs the Python equivalent atomically on the data."""
+        function:Callable = _emulations[script]
+
+        def run(keys:list = (), args:list = ()):
+            with self.lock:
+                return function(self.data, list(keys), list(args))
+        return run
+
+    def pipeline(self, transaction:bool = True) -> "InProcessPipeline":
+        return InProcessPipeline(self)
+
+    def flushall(self) -> None:
+        with self.lock:
+            self.data.clear()
+
+    def get(self, key:str):
+        return self.data.get(key)
+
+    def set(self, key:str, value) -> bool:
+        with self.lock:
+            self.data[key] = str(value)
+        return True
+
+    def delete(self, *keys:str) -> int:
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match:str = "*"):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+    def sadd(self, key:str, *values:str) -> int:
+        with self.lock:
+            members:set = self.data.setdefault(key, set())
+            added:int = sum(value not in members for value in values)
+            members.update(values)
+        return added
+
+    def sismember(self, key:str, value:str) -> bool:
+        return value in self.data.get(key, set())
+
+    def zadd(self, key:str, mapping:dict) -> int:
+        with self.lock:
+            zset:dict = self.data.setdefault(key, {})
+            added:int = sum(name not in zset for name in mapping)
+            zset.update({name: float(value) for name, value in mapping.items()})
+        return added
+
+    def zrem(self, key:str, *names:str) -> int:
+        with self.lock:
+            zset:dict = self.data.get(key, {})
+            return sum(zset.pop(name, None) is not None for name in names)
+
+    def zcard(self, key:str) -> int:
+        return len(self.data.get(key, {}))
+
+    def _descending(self, key:str) -> list:
+        with self.lock:
+            return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def zrevrange(self, key:str, start:int, end:int, withscores:bool = False) -> list:
+        entries:list = self._descending(key)
+        entries = entries[start:] if end == -1 else entries[start:end + 1]
+        return entries if withscores else [name for name, _ in entries]
+
+    def zrevrangebyscore(self, key:str, max:float, min:float, start:int = None, num:int = None,
+                         withscores:bool = False) -> list:
+        # pylint: disable=redefined-builtin
+        entries:list = [(name, value) for name, value in self._descending(key) if float(min) <= value <= float(max)]
+        if start is not None:
+            entries = entries[start:start + num]
+        return entries if withscores else [name for name, _ in entries]
+
+    def zremrangebyrank(self, key:str, start:int, end:int) -> int:
+        with self.lock:
+            ascending:list = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+            stop:int = len(ascending) + end + 1 if end < 0 else end + 1
+            removed:list = ascending[start:max(stop, 0)]
+            for name, _ in removed:
+                del self.data[key][name]
+        return len(removed)
+
+
+class InProcessPipeline:
+    """Queues calls and runs them on execute(), like redis-py's non-transactional pipeline."""
+
+    def __init__(self, client:InProcessRedis) -> None:
+        self.client:InProcessRedis = client
+        self.calls:list = []
+
+    def __getattr__(self, name:str):
+        def queue(*args, **kwargs):
+            self.calls.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        calls, self.calls = self.calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+_emulations:dict = {}
+_scripts:dict = {}
+_clients:dict = {}
+_clients_lock:threading.Lock = threading.Lock()
+
+
+def emulate(source:str, function:Callable) -> None:
+    """Registers the Python equivalent InProcessRedis runs for the Lua script source, there is no Lua here.
+
+    Args:
+        source (str): the script, as passed to register_script
+        function (Callable): ``(data, keys, args)`` doing what the script does to the InProcessRedis data
+    """
+    _emulations[source] = function
+
+
+def client_for(url:str):
+    """The Redis client of url, shared by the whole process; ``memory://`` is an InProcessRedis, empty is None."""
+    if not url:
+        return None
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = (InProcessRedis() if url == "memory://"
+                             else redis.Redis.from_url(url, decode_responses=True))
+        return _clients[url]
+
+
+def script(url:str, source:str):
+    """source registered on the client of url (once per client), None when url is empty."""
+    redis_client = client_for(url)
+    if redis_client is None:
+        return None
+    with _clients_lock:
+        if (url, source) not in _scripts:
+            _scripts[(url, source)] = redis_client.register_script(source)
+        return _scripts[(url, source)]
@@ -0,0 +1,35 @@
+# pylint: disable=missing-module-docstring
+from typing import Any
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what DRF's JSONRenderer produces with the default COMPACT_JSON / UNICODE_JSON
+    settings: datetimes and anything else orjson doesn't handle natively go through DRF's own JSONEncoder, and
+    U+2028/U+2029 are escaped the same way. Indented output (``; indent=N`` in Accept) and non-default JSON
+    settings fall back to the stdlib encoder.
+    """
+
+    def render(self, data:Any, accepted_media_type:str = None, renderer_context:dict = None) -> bytes:
+        if data is None:
+            return b''
+        if (orjson is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret:bytes = orjson.dumps(data, default=self.encoder_class().default,
+                                     option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
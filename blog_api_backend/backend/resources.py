@@ -0,0 +1,386 @@
+# pylint: disable=missing-module-docstring
+import csv
+import io
+import json
+import re
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Model
+from django.db.models.query import QuerySet
+from import_export import fields, resources, widgets
+
+from backend import cache, feeds
+from backend.bulk import existing_ids
+from backend.counters import adjust
+from backend.models import Comment, Post, User, make_excerpt
+
+
+# django-import-export resources of the admin. Small files keep the library's preview/confirm workflow (with
+# bulk inserts); CSV and JSON files of any size can also go through stream_import, which reads the file a row at a
+# time and validates and inserts IMPORT_CHUNK_SIZE rows per transaction (COPY on PostgreSQL, bulk_create elsewhere),
+# and stream_export, which writes rows as they come out of a server-side cursor. Memory stays bounded by one chunk.
+# Foreign keys are plain ids checked with one IN query per chunk, never a get() per row.
+
+STREAM_FORMATS:tuple = ("csv", "json", "ndjson")
+READ_SIZE:int = 1 << 16
+MAX_REPORTED_ERRORS:int = 100
+_SPACES = re.compile(r"[ \t\n\r]*")
+# COPY text format: backslash escapes, \N for NULL
+_COPY_ESCAPES:dict = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+
+def id_field(attribute:str, column_name:str) -> fields.Field:
+    """A foreign key imported and exported as the bare id (``author`` <-> ``author_id``), no query per row."""
+    return fields.Field(attribute=attribute, column_name=column_name, widget=widgets.IntegerWidget())
+
+
+class StreamingResource(resources.ModelResource):
+    """ModelResource that can also be imported and exported as a stream (stream_import / stream_export).
+
+    ``relations`` maps the id attribute of each foreign key to ``(related model, denormalized counter or None)``:
+    the ids are checked in bulk and the counters moved like the bulk endpoints do, on both import paths.
+    """
+    relations:dict = {}
+
+    created_at = fields.Field(attribute="created_at", column_name="created_at", readonly=True,
+                              widget=widgets.DateTimeWidget())
+    updated_at = fields.Field(attribute="updated_at", column_name="updated_at", readonly=True,
+                              widget=widgets.DateTimeWidget())
+
+    class Meta:
+        use_bulk = True
+        batch_size = 1000
+        force_init_instance = True
+        skip_diff = True
+        skip_html_diff = True
+
+    def prepare_instance(self, instance:Model) -> None:
+        """Anything save() or bulk_create would fill in that COPY would not (nothing by default)."""
+
+    def after_insert(self, instances:list) -> None:
+        """Moves the denormalized counters and drops the cached payloads the new rows make stale."""
+        for attribute, (related_model, counter) in self.relations.items():
+            ids:list = [getattr(instance, attribute) for instance in instances]
+            if counter is not None:
+                adjust(related_model, counter, ids)
+                cache.invalidate(related_model._meta.model_name, set(ids))
+
+    def finish_import(self) -> None:
+        cache.invalidate(self._meta.model._meta.model_name, [])
+
+    def bulk_create(self, using_transactions, dry_run, raise_errors, batch_size=None, result=None):
+        instances:list = list(self.create_instances)
+        super().bulk_create(using_transactions, dry_run, raise_errors, batch_size=batch_size, result=result)
+        # Rows bulk_create actually inserted are no longer "adding". A dry run is rolled back, feeds included
+        if not dry_run:
+            self.after_insert([instance for instance in instances if not instance._state.adding])
+
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        super().after_import(dataset, result, using_transactions, dry_run, **kwargs)
+        if not dry_run:
+            self.finish_import()
+
+
+class UserResource(StreamingResource):
+    class Meta(StreamingResource.Meta):
+        model = User
+        fields = ("id", "username", "first_name", "last_name", "email", "can_post", "can_comment", "is_active",
+                  "created_at", "updated_at", "post_count", "comment_count")
+        export_order = fields
+
+    def get_import_fields(self):
+        # Counters are derived from the imported posts and comments, never taken from the file
+        return [field for field in super().get_import_fields() if field.column_name not in ("post_count",
+                                                                                              "comment_count")]
+
+    def init_instance(self, row=None):
+        user:User = super().init_instance(row)
+        # Imported accounts log in after a password reset
+        user.set_unusable_password()
+        return user
+
+
+class PostResource(StreamingResource):
+    relations:dict = {"author_id": (User, "post_count")}
+    author = id_field("author_id", "author")
+
+    class Meta(StreamingResource.Meta):
+        model = Post
+        fields = ("id", "title", "author", "created_at", "updated_at", "post_content")
+        export_order = fields
+
+    def prepare_instance(self, instance:Post) -> None:
+        instance.excerpt = make_excerpt(instance.post_content)
+
+    def after_insert(self, instances:list) -> None:
+        super().after_insert(instances)
+        if all(instance.id is not None for instance in instances):
+            feeds.add_posts(instances)
+        else:
+            # COPY doesn't hand the new ids back
+            feeds.mark_stale()
+
+
+class CommentResource(StreamingResource):
+    relations:dict = {"post_id": (Post, "comment_count"), "commenter_id": (User, "comment_count")}
+    post = id_field("post_id", "post")
+    commenter = id_field("commenter_id", "commenter")
+
+    class Meta(StreamingResource.Meta):
+        model = Comment
+        fields = ("id", "post", "commenter", "created_at", "updated_at", "comment_content")
+        export_order = fields
+
+
+RESOURCES:dict = {"user": UserResource, "post": PostResource, "comment": CommentResource}
+
+
+# READING #####################################################################################################
+def iter_csv(stream) -> Iterator[dict]:
+    yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+
+
+def iter_ndjson(stream) -> Iterator[dict]:
+    for line in io.TextIOWrapper(stream, encoding="utf-8-sig"):
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_json(stream) -> Iterator[dict]:
+    """Objects of a top-level JSON array, decoded one at a time: at most one row plus READ_SIZE characters are held.
+
+    Raises:
+        ValueError: the file isn't a JSON array of objects
+    """
+    reader = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    decoder:json.JSONDecoder = json.JSONDecoder()
+    buffer:str = ""
+    position:int = 0
+    opened:bool = False
+    while True:
+        position = _SPACES.match(buffer, position).end()
+        if position == len(buffer):
+            buffer, position = reader.read(READ_SIZE), 0
+            if not buffer:
+                raise ValueError("Unexpected end of file, the JSON array is not closed")
+            continue
+        char:str = buffer[position]
+        if not opened:
+            if char != "[":
+                raise ValueError("Expected a JSON array of objects")
+            opened, position = True, position + 1
+        elif char == "]":
+            return
+        elif char == ",":
+            position += 1
+        else:
+            try:
+                row, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The row continues in the next read
+                more:str = reader.read(READ_SIZE)
+                if not more:
+                    raise
+                buffer, position = buffer[position:] + more, 0
+                continue
+            if not isinstance(row, dict):
+                raise ValueError("Expected a JSON array of objects")
+            yield row
+
+
+READERS:dict = {"csv": iter_csv, "json": iter_json, "ndjson": iter_ndjson}
+
+
+def iter_records(stream, file_format:str) -> Iterator[dict]:
+    """Rows of a binary file object in one of STREAM_FORMATS, as dicts keyed by column name."""
+    return READERS[file_format](stream)
+###############################################################################################################
+
+
+# IMPORT ######################################################################################################
+def _conflicts(model:type[Model], instances:list) -> dict:
+    """Row number -> errors for rows whose id or unique field is already taken, in the table or earlier in the chunk.
+    """
+    errors:dict = {}
+    unique_fields:list = [field for field in model._meta.concrete_fields if field.unique]
+    for field in unique_fields:
+        values:set = {getattr(instance, field.attname) for _, instance in instances} - {None}
+        if field.primary_key:
+            taken:set = existing_ids(model, values)
+        else:
+            taken = set(model.objects.filter(**{f"{field.attname}__in": values})
+                        .values_list(field.attname, flat=True)) if values else set()
+        for number, instance in instances:
+            value = getattr(instance, field.attname)
+            if value is None:
+                continue
+            if value in taken:
+                errors.setdefault(number, {})[field.name] = [f'"{value}" already exists.']
+            taken.add(value)
+    return errors
+
+
+def _missing_relations(resource:StreamingResource, instances:list) -> dict:
+    errors:dict = {}
+    for attribute, (related_model, _) in resource.relations.items():
+        found:set = existing_ids(related_model, {getattr(instance, attribute) for _, instance in instances} - {None})
+        for number, instance in instances:
+            value = getattr(instance, attribute)
+            if value is not None and value not in found:
+                errors.setdefault(number, {})[attribute.removesuffix("_id")] = [
+                    f'Invalid pk "{value}" - object does not exist.']
+    return errors
+
+
+def copy_value(value) -> str:
+    return "\\N" if value is None else str(value).translate(_COPY_ESCAPES)
+
+
+def copy_rows(model:type[Model], instances:list, using:str) -> None:
+    """Inserts instances with ``COPY ... FROM STDIN``: one statement per chunk, no parameter binding or RETURNING.
+
+    Rows that name their id and rows that don't are copied separately, the latter leaving it to the sequence.
+    """
+    connection = connections[using]
+    for with_pk in (True, False):
+        group:list = [instance for instance in instances if (instance.pk is not None) == with_pk]
+        if not group:
+            continue
+        copied:list = [field for field in model._meta.concrete_fields if with_pk or not field.primary_key]
+        buffer:io.StringIO = io.StringIO()
+        for instance in group:
+            buffer.write("\t".join(copy_value(field.get_db_prep_save(field.pre_save(instance, True), connection))
+                                   for field in copied) + "\n")
+        buffer.seek(0)
+        columns:str = ", ".join(connection.ops.quote_name(field.column) for field in copied)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN",
+                               buffer)
+    for instance in instances:
+        instance._state.adding = False
+        instance._state.db = using
+
+
+def insert_rows(model:type[Model], instances:list, using:str) -> None:
+    if connections[using].vendor == "postgresql":
+        copy_rows(model, instances, using)
+    else:
+        model.objects.using(using).bulk_create(instances, batch_size=settings.BULK_BATCH_SIZE)
+
+
+def stream_import(resource:StreamingResource, records:Iterable[dict], chunk_size:int = None,
+                  progress:Callable = None) -> dict:
+    """Imports rows chunk by chunk, each chunk validated together and inserted in its own transaction.
+
+    Invalid rows (bad values, unknown foreign keys, taken ids or usernames) are reported and skipped; the valid rows
+    of the chunk are still inserted, and a failure later in the file leaves the earlier chunks in place.
+
+    Args:
+        resource (StreamingResource): resource of the model to import
+        records (Iterable[dict]): rows keyed by column name, e.g. from iter_records
+        chunk_size (int): rows per transaction, IMPORT_CHUNK_SIZE by default
+        progress (Callable): called with the report after every chunk
+
+    Return:
+        dict: ``{"rows": ..., "created": ..., "failed": ..., "errors": [{"row": n, "errors": {...}}, ...]}`` with at
+        most MAX_REPORTED_ERRORS errors listed, rows numbered from 1
+    """
+    model:type[Model] = resource._meta.model
+    using:str = router.db_for_write(model)
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    # Foreign keys are checked per chunk, the full_clean() of each row would query them one by one
+    unchecked:list = [field.name for field in model._meta.concrete_fields if field.is_relation]
+    report:dict = {"rows": 0, "created": 0, "failed": 0, "errors": []}
+    explicit_ids:bool = False
+    records = iter(records)
+
+    def reject(number:int, errors:dict) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": number, "errors": errors})
+
+    while chunk := list(islice(records, chunk_size)):
+        instances:list = []
+        for row in chunk:
+            report["rows"] += 1
+            instance:Model = resource.init_instance(row)
+            try:
+                resource.import_obj(instance, row, dry_run=False)
+                instance.clean_fields(exclude=unchecked)
+            except ValidationError as exc:
+                reject(report["rows"], exc.message_dict)
+                continue
+            resource.prepare_instance(instance)
+            instances.append((report["rows"], instance))
+
+        errors:dict = _conflicts(model, instances)
+        for number, relation_errors in _missing_relations(resource, instances).items():
+            errors.setdefault(number, {}).update(relation_errors)
+        for number in sorted(errors):
+            reject(number, errors[number])
+        valid:list = [instance for number, instance in instances if number not in errors]
+        explicit_ids = explicit_ids or any(instance.pk is not None for instance in valid)
+        if valid:
+            with transaction.atomic(using=using):
+                insert_rows(model, valid, using)
+                resource.after_insert(valid)
+            report["created"] += len(valid)
+        if progress is not None:
+            progress(report)
+
+    if explicit_ids:
+        # Rows that brought their own ids left the sequence behind, the next insert would collide
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            for statement in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(statement)
+    resource.finish_import()
+    return report
+###############################################################################################################
+
+
+# EXPORT ######################################################################################################
+def stream_export(resource:StreamingResource, queryset:QuerySet, file_format:str) -> Iterator[str]:
+    """Rows of queryset in file_format, in id order, written as they are read from a server-side cursor.
+
+    Args:
+        resource (StreamingResource): resource whose export fields and widgets render each row
+        queryset (QuerySet): rows to export
+        file_format (str): one of STREAM_FORMATS; "json" is an array the stock JSON import reads back
+
+    Return:
+        Iterator[str]: the file, EXPORT_CHUNK_SIZE rows per piece
+    """
+    headers:list = resource.get_export_headers()
+    rows:Iterator = (resource.export_resource(instance)
+                     for instance in queryset.order_by("id").iterator(chunk_size=settings.EXPORT_CHUNK_SIZE))
+    buffer:io.StringIO = io.StringIO()
+    writer = csv.writer(buffer)
+    if file_format == "csv":
+        writer.writerow(headers)
+    elif file_format == "json":
+        buffer.write("[")
+    separator:str = ""
+    while chunk := list(islice(rows, settings.EXPORT_CHUNK_SIZE)):
+        if file_format == "csv":
+            writer.writerows(chunk)
+        else:
+            for row in chunk:
+                line:str = json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str)
+                if file_format == "json":
+                    buffer.write(separator + "\n" + line)
+                    separator = ","
+                else:
+                    buffer.write(line + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if file_format == "json":
+        buffer.write("\n]\n")
+    yield buffer.getvalue()
+###############################################################################################################
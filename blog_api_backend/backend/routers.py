@@ -0,0 +1,62 @@
+# pylint: disable=missing-module-docstring
+import contextvars
+import random
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.conf import settings
+
+
+# Reads go to one of the DATABASE_REPLICAS aliases, writes to "default". Replicas lag behind the primary, so a
+# client that just wrote is pinned to the primary for READ_YOUR_WRITES_SECONDS (ReadYourWritesMiddleware in
+# backend/middleware.py), and code that must see its own writes (write views, Celery tasks, cache fills) runs
+# inside primary().
+
+PRIMARY:str = "default"
+
+_pinned:contextvars.ContextVar = contextvars.ContextVar("blogapi_pinned_to_primary", default=False)
+
+
+def pin(pinned:bool) -> contextvars.Token:
+    """Sets whether the reads of the current context go to the primary, returns the token for unpin."""
+    return _pinned.set(pinned)
+
+
+def unpin(token:contextvars.Token) -> None:
+    _pinned.reset(token)
+
+
+def pinned() -> bool:
+    """True when replicas are configured and the reads of the current context skip them."""
+    return bool(settings.DATABASE_REPLICAS) and _pinned.get()
+
+
+@contextmanager
+def primary() -> Iterator[None]:
+    """Sends every read made inside the block (including from threads started with sync_to_async) to the primary."""
+    token:contextvars.Token = pin(True)
+    try:
+        yield
+    finally:
+        unpin(token)
+
+
+class ReplicaRouter:
+    """Database router: reads on a random replica unless pinned to the primary, writes and migrations on it."""
+
+    def db_for_read(self, model, **hints) -> str:
+        replicas:list = settings.DATABASE_REPLICAS
+        if not replicas or _pinned.get():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas are copies of the primary, an object read from one can reference an object read from another
+        return True
+
+    def allow_migrate(self, db:str, app_label:str, model_name:str = None, **hints) -> bool:
+        # Replicas get the schema through replication
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,72 @@
+# pylint: disable=missing-module-docstring
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+from backend.models import Post
+
+
+def _fts5_query(text:str, prefix:bool = False) -> str:
+    """Turns free text into an FTS5 query where every word must match, with FTS5 syntax characters neutralised.
+    With prefix, the last word matches any word starting with it (``"kitt"*``). The porter tokenizer stems that
+    prefix too, so a word whose stem changes as it is typed ("every", stemmed to everi) only matches once typed
+    further: SQLite only serves development and the tests, PostgreSQL doesn't have this gap (see search_posts).
+    """
+    words:list = ['"' + word + '"' for word in re.findall(r"\w+", text)]
+    if prefix and words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+def _no_results() -> QuerySet:
+    """Empty result that still has the ``rank`` annotation, so callers can order by it."""
+    return Post.objects.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_posts(text:str, prefix:bool = False) -> QuerySet:
+    """Posts matching ``text`` in their title or content, annotated with a ``rank`` (higher is better).
+
+    PostgreSQL matches ``websearch_to_tsquery`` against the GIN-indexed ``search_vector`` column and ranks with
+    ``ts_rank_cd`` (title words weigh more than content words). SQLite, used by the tests, goes through the
+    ``backend_post_fts`` FTS5 table and ranks with ``bm25``. Both are created by migration 0003_post_search.
+
+    Args:
+        text (str): the user's search string
+        prefix (bool): match the last word as the start of a word, for search-as-you-type (the admin
+            autocompletes) where it is usually still being typed
+
+    Return:
+        QuerySet: unordered Post queryset with a ``rank`` annotation
+    """
+    if not text.strip():
+        return _no_results()
+    if connection.vendor == "postgresql":
+        tsquery:str = "websearch_to_tsquery('english', %s)"
+        params:tuple = (text,)
+        words:list = re.findall(r"\w+", text)
+        if prefix and words:
+            # websearch_to_tsquery has no prefix syntax: the last word becomes a to_tsquery 'word:*' term, ANDed
+            # with the words before it (an empty side of && is ignored). The 'english' term matches a finished
+            # word ("kittens" stems to kitten), the 'simple' one an unfinished word whose stem isn't a prefix of
+            # the indexed one ("every" stems to everi, "everywhere" to everywher)
+            tsquery = ("(websearch_to_tsquery('english', %s) && "
+                       "(to_tsquery('english', %s) || to_tsquery('simple', %s)))")
+            params = (" ".join(words[:-1]), words[-1] + ":*", words[-1] + ":*")
+        return Post.objects.filter(
+            RawSQL(f"backend_post.search_vector @@ {tsquery}", params, output_field=BooleanField())
+        ).annotate(rank=RawSQL(f"ts_rank_cd(backend_post.search_vector, {tsquery})", params,
+                               output_field=FloatField()))
+
+    match:str = _fts5_query(text, prefix)
+    if not match:
+        return _no_results()
+    # bm25() is negative, lower meaning more relevant; title hits weigh 10x content hits
+    return Post.objects.filter(
+        id__in=RawSQL("SELECT rowid FROM backend_post_fts WHERE backend_post_fts MATCH %s", (match,))
+    ).annotate(rank=RawSQL(
+        "SELECT -bm25(backend_post_fts, 10.0, 1.0) FROM backend_post_fts "
+        "WHERE backend_post_fts MATCH %s AND backend_post_fts.rowid = backend_post.id",
+        (match,), output_field=FloatField()))
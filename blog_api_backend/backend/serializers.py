@@ -1,17 +1,171 @@
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from . import metrics
 from .models import User, Post, Comment
 
-class UserSerializer(serializers.ModelSerializer):
+
+class TimedSerializerMixin:
+    """Counts the time spent building ``.data`` as serializer time in the request's Server-Timing / metrics."""
+
+    @property
+    def data(self):
+        with metrics.serializer_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class SparseFieldsMixin:
+    """Sparse fieldsets: ``fields=`` keeps only the named fields, ``exclude=`` drops the named ones.
+
+    Both are plain keyword arguments (forwarded to the child serializer when ``many=True``), the views read them
+    from ``?fields=`` / ``?exclude=``, see ``views.parse_sparse_fields``.
+    """
+
+    def __init__(self, *args, fields:tuple = None, exclude:tuple = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude:
+            self.fields.pop(name, None)
+
+
+class UserSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = User
-        fields = ['id', 'first_name', 'last_name','username', 'email', 'created_at', 'updated_at', 'can_post', 'can_comment']
+        fields = ['id', 'first_name', 'last_name','username', 'email', 'created_at', 'updated_at', 'can_post', 'can_comment',
+                  'post_count', 'comment_count']
+        read_only_fields = ['post_count', 'comment_count']
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Post
-        fields = ['id', 'title', 'created_at','updated_at', 'author', 'post_content']
+        fields = ['id', 'title', 'created_at','updated_at', 'author', 'post_content', 'excerpt', 'comment_count']
+        read_only_fields = ['excerpt', 'comment_count']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Comment
-        fields = ['id', 'created_at', 'updated_at', 'post', 'commenter', 'comment_content']
\ No newline at end of file
+        fields = ['id', 'created_at', 'updated_at', 'post', 'commenter', 'comment_content']
+
+class CommentWithCommenterSerializer(CommentSerializer):
+    commenter = UserSerializer(read_only=True)
+
+
+class ExpandedPostSerializer(PostSerializer):
+    """Read-only Post representation with the requested relations embedded.
+
+    ``expand`` may contain "author" (nested User instead of its id) and "comments" (first page of comments,
+    each with its commenter nested). The queryset must carry the matching select_related / prefetch_related,
+    see ``views.expanded_post_queryset``.
+    """
+    EXPANDABLE = ("author", "comments")
+
+    def __init__(self, *args, expand:frozenset = frozenset(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if "author" in expand:
+            self.fields['author'] = UserSerializer(read_only=True)
+        if "comments" in expand:
+            self.fields['comments'] = CommentWithCommenterSerializer(source='page_comments', many=True, read_only=True)
+
+
+class SearchResultSerializer(PostSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['rank']
+
+
+class PostBulkItemSerializer(serializers.ModelSerializer):
+    """One item of a bulk post create. ``author`` is a plain id here, it is resolved for the whole batch at once."""
+    author = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = Post
+        fields = ['title', 'author', 'post_content']
+
+
+class CommentBulkItemSerializer(serializers.ModelSerializer):
+    """One item of a bulk comment create. ``post`` / ``commenter`` are plain ids resolved for the whole batch."""
+    post = serializers.IntegerField(allow_null=True, required=False)
+    commenter = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = Comment
+        fields = ['post', 'commenter', 'comment_content']
+
+
+class ValuesSerializer:
+    """Read-only fast path producing exactly what ``serializer_class(many=True).data`` would, from ``.values()`` rows.
+
+    The field list and the handful of per-field conversions (only datetimes need one for these models) are
+    worked out once, so serializing a row is a dict comprehension instead of DRF's per-field machinery.
+    """
+
+    def __init__(self, serializer_class:type[serializers.ModelSerializer], **selection):
+        self.names:list = []
+        self.columns:list = []
+        self.datetime_fields:dict = {}
+        for name, field in serializer_class(**selection).fields.items():
+            self.names.append(name)
+            self.columns.append(field.source)
+            if isinstance(field, serializers.DateTimeField):
+                self.datetime_fields[name] = field
+
+    def values(self, queryset, extra:tuple = ()):
+        """``queryset.values()`` restricted to the serializer's columns (plus extra ones needed by the caller, which
+        serialize() leaves out); FKs come back as their raw ids.
+        """
+        return queryset.values(*self.columns, *(column for column in extra if column not in self.columns))
+
+    def serialize(self, rows:list) -> list:
+        with metrics.serializer_timer():
+            return self._serialize(rows)
+
+    def _serialize(self, rows:list) -> list:
+        converters:list = []
+        for name, source in zip(self.names, self.columns):
+            field = self.datetime_fields.get(name)
+            converters.append((name, source, self.datetime_converter(field) if field is not None else None))
+        return [
+            {name: (convert(row[source]) if convert is not None and row[source] is not None else row[source])
+             for name, source, convert in converters}
+            for row in rows
+        ]
+
+    @staticmethod
+    def datetime_converter(field:serializers.DateTimeField):
+        """Same output as ``field.to_representation`` for the default ISO 8601 format, with the current timezone
+        looked up once per call instead of once per value.
+        """
+        if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601 or not settings.USE_TZ:
+            return field.to_representation
+        field_timezone = field.timezone if hasattr(field, 'timezone') else timezone.get_current_timezone()
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+
+_values_serializers:dict = {}
+
+
+def values_serializer_for(serializer_class:type[serializers.ModelSerializer], fields:tuple = None,
+                          exclude:tuple = ()) -> ValuesSerializer:
+    """Returns the (cached) ValuesSerializer mirroring serializer_class with the given sparse fieldset."""
+    key:tuple = (serializer_class, fields, exclude)
+    if key not in _values_serializers:
+        selection:dict = {"fields": fields, "exclude": exclude} if fields is not None or exclude else {}
+        _values_serializers[key] = ValuesSerializer(serializer_class, **selection)
+    return _values_serializers[key]
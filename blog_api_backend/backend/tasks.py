@@ -0,0 +1,285 @@
+# pylint: disable=missing-module-docstring
+import os
+import uuid
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from blogapi.celery import app
+from backend import cache, feeds, resources, routers
+from backend.bulk import bulk_create_items
+from backend.models import Comment, Post, User
+from backend.serializers import CommentBulkItemSerializer
+
+
+# COMMENT INGESTION ###########################################################################################
+# Write-behind path for create_new_comment_on: the request only validates and enqueues, a worker drains the
+# queue in batches with bulk_create. The queue lives on the Celery broker (a Redis list in production, kombu's
+# in-memory transport in the tests) and per-comment status is kept in the cache under the tracking id.
+INGEST_SCHEDULED_KEY = "blogapi:comment-ingest:scheduled"
+
+
+def ingest_status_key(tracking_id:str) -> str:
+    return f"blogapi:comment-ingest:{tracking_id}"
+
+
+def set_ingest_status(tracking_id:str, status:dict) -> None:
+    django_cache.set(ingest_status_key(tracking_id), status, timeout=settings.COMMENT_INGEST_STATUS_TIMEOUT)
+
+
+def get_ingest_status(tracking_id:str) -> dict:
+    """Status of a queued comment: ``{"status": "queued" | "created" | "failed", ...}``, None when unknown."""
+    return django_cache.get(ingest_status_key(tracking_id))
+
+
+def enqueue_comment(item:dict) -> str:
+    """Queues an already validated comment item for the next drain and returns its tracking id.
+
+    A drain is scheduled only if none is pending, so a burst of comments is inserted by a few batched tasks
+    instead of one task per comment.
+
+    Args:
+        item (dict): ``{"post": id, "commenter": id, "comment_content": str}``
+
+    Return:
+        str: tracking id to poll through comments/ingest/<tracking_id>/
+    """
+    tracking_id:str = uuid.uuid4().hex
+    set_ingest_status(tracking_id, {"status": "queued"})
+    with app.connection_for_write() as connection:
+        queue = connection.SimpleQueue(settings.COMMENT_INGEST_QUEUE)
+        queue.put({"tracking_id": tracking_id, "item": item}, serializer="json")
+        queue.close()
+    schedule_drain(settings.COMMENT_INGEST_DELAY)
+    return tracking_id
+
+
+def schedule_drain(countdown:int) -> None:
+    """Schedules drain_comment_queue in countdown seconds unless a drain is pending already.
+
+    The pending flag expires after COMMENT_INGEST_SCHEDULED_TIMEOUT, a few drain delays: if the scheduled task is
+    lost (worker killed, broker restarted) the next comment schedules a new one instead of queueing unnoticed.
+    """
+    if django_cache.add(INGEST_SCHEDULED_KEY, True, timeout=settings.COMMENT_INGEST_SCHEDULED_TIMEOUT):
+        drain_comment_queue.apply_async(countdown=countdown)
+
+
+@shared_task
+def drain_comment_queue() -> int:
+    """Inserts queued comments batch by batch until the queue is empty.
+
+    Each batch goes through bulk_create_items (one IN lookup per foreign key, one bulk_create, counters updated
+    in the same transaction); messages are acked only once their batch is committed.
+
+    Return:
+        int: number of comments created
+    """
+    # Cleared before draining: anything enqueued after our last empty read schedules a fresh drain
+    django_cache.delete(INGEST_SCHEDULED_KEY)
+    created_total:int = 0
+    with app.connection_for_write() as connection:
+        queue = connection.SimpleQueue(settings.COMMENT_INGEST_QUEUE)
+        try:
+            while True:
+                messages:list = []
+                while len(messages) < settings.COMMENT_INGEST_BATCH_SIZE:
+                    try:
+                        messages.append(queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not messages:
+                    return created_total
+                created_total += ingest_batch(messages)
+        finally:
+            queue.close()
+
+
+def ingest_batch(messages:list) -> int:
+    """Creates the comments of one drained batch, records each tracking id's outcome and acks the messages."""
+    payloads:list = [message.payload for message in messages]
+    try:
+        # A post created a moment ago may not have reached the replicas yet
+        with routers.primary():
+            results, created = bulk_create_items(
+                [payload["item"] for payload in payloads], CommentBulkItemSerializer, Comment,
+                {"post": Post, "commenter": User}, counters={"post": "comment_count", "commenter": "comment_count"})
+    except Exception:
+        for message in messages:
+            message.requeue()
+        # The requeued comments would otherwise wait for the next comment to schedule a drain
+        schedule_drain(settings.COMMENT_INGEST_RETRY_DELAY)
+        raise
+    for payload, result in zip(payloads, results):
+        if "id" in result:
+            set_ingest_status(payload["tracking_id"], {"status": "created", "comment_id": result["id"]})
+        else:
+            set_ingest_status(payload["tracking_id"], {"status": "failed", "errors": result["errors"]})
+    for message in messages:
+        message.ack()
+    cache.invalidate("comment", [comment.id for comment in created])
+    cache.invalidate("post", {comment.post_id for comment in created})
+    cache.invalidate("user", {comment.commenter_id for comment in created})
+    return len(created)
+###############################################################################################################
+
+
+
+# USER DELETION ###############################################################################################
+# delete_single_user only deactivates the account and queues delete_user: detaching a prolific user's posts and
+# comments (SET_NULL) in the request would lock thousands of rows for seconds. The task does it in short
+# transactions of USER_DELETION_CHUNK_SIZE rows, reporting progress under the job id, and deletes the user row last.
+DETACHED_FIELDS:tuple = (("post", Post, "author"), ("comment", Comment, "commenter"))
+
+
+def deletion_status_key(job_id:str) -> str:
+    return f"blogapi:user-deletion:{job_id}"
+
+
+def set_deletion_status(job_id:str, status:dict) -> None:
+    django_cache.set(deletion_status_key(job_id), status, timeout=settings.USER_DELETION_STATUS_TIMEOUT)
+
+
+def get_deletion_status(job_id:str) -> dict:
+    """Progress of a deletion: ``{"status": "queued" | "running" | "done" | "failed", "user_id": ..., ...}``."""
+    return django_cache.get(deletion_status_key(job_id))
+
+
+def start_user_deletion(user:User) -> str:
+    """Deactivates user and queues their deletion once the current transaction commits.
+
+    A second request for the same user while a job is pending gets the id of that job.
+
+    Args:
+        user (User): the user to delete
+
+    Return:
+        str: job id to poll through users/deletions/<job_id>/
+    """
+    job_id:str = uuid.uuid4().hex
+    if not django_cache.add(f"blogapi:user-deletion:user:{user.id}", job_id,
+                            timeout=settings.USER_DELETION_STATUS_TIMEOUT):
+        pending:str = django_cache.get(f"blogapi:user-deletion:user:{user.id}")
+        if pending is not None and get_deletion_status(pending) is not None:
+            return pending
+        django_cache.set(f"blogapi:user-deletion:user:{user.id}", job_id, timeout=settings.USER_DELETION_STATUS_TIMEOUT)
+    # Logged out and unable to authenticate from now on (the token cache is dropped by the save signal)
+    user.is_active = False
+    user.save(update_fields=["is_active", "updated_at"])
+    set_deletion_status(job_id, {"status": "queued", "user_id": user.id})
+    transaction.on_commit(lambda: delete_user.delay(job_id, user.id))
+    return job_id
+
+
+@shared_task(autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def delete_user(job_id:str, user_id:int) -> dict:
+    """Detaches the user's posts and comments chunk by chunk, then deletes the user.
+
+    Safe to run again after a failure: every chunk is committed on its own and the next run carries on with what
+    is still attached.
+
+    Return:
+        dict: the final status
+    """
+    status:dict = {"status": "running", "user_id": user_id}
+    # Reads must see the rows just detached, not a lagging replica
+    with routers.primary():
+        try:
+            for label, model, field in DETACHED_FIELDS:
+                status[f"{label}s_total"] = model.objects.filter(**{field: user_id}).count()
+                status[f"{label}s_detached"] = 0
+            set_deletion_status(job_id, status)
+            for label, model, field in DETACHED_FIELDS:
+                while True:
+                    with transaction.atomic():
+                        ids:list = list(model.objects.filter(**{field: user_id}).order_by("id")
+                                        .values_list("id", flat=True)[:settings.USER_DELETION_CHUNK_SIZE])
+                        if not ids:
+                            break
+                        # updated_at moves too, so cached ETags of the detached objects stop matching
+                        model.objects.filter(id__in=ids).update(**{field: None, "updated_at": timezone.now()})
+                    cache.invalidate(label, ids)
+                    status[f"{label}s_detached"] += len(ids)
+                    set_deletion_status(job_id, status)
+
+            username:str = User.objects.filter(id=user_id).values_list("username", flat=True).first()
+            with transaction.atomic():
+                User.objects.filter(id=user_id).delete()
+        except Exception as exc:
+            set_deletion_status(job_id, {**status, "status": "failed", "error": str(exc)})
+            raise
+    cache.invalidate("user", [user_id])
+    if username is not None:
+        feeds.remove_author(user_id, username)
+    status["status"] = "done"
+    set_deletion_status(job_id, status)
+    django_cache.delete(f"blogapi:user-deletion:user:{user_id}")
+    return status
+###############################################################################################################
+
+
+
+# ADMIN IMPORTS ###############################################################################################
+# CSV/JSON uploads too big for django-import-export's preview are saved to IMPORT_UPLOAD_DIR (shared by the web
+# and worker containers) and imported by import_file with resources.stream_import, progress kept under the job id.
+def import_status_key(job_id:str) -> str:
+    return f"blogapi:import:{job_id}"
+
+
+def set_import_status(job_id:str, status:dict) -> None:
+    django_cache.set(import_status_key(job_id), status, timeout=settings.IMPORT_STATUS_TIMEOUT)
+
+
+def get_import_status(job_id:str) -> dict:
+    """Progress of an import: ``{"status": "queued" | "running" | "done" | "failed", "rows": ..., ...}``."""
+    return django_cache.get(import_status_key(job_id))
+
+
+def start_import(upload, model_name:str, file_format:str) -> str:
+    """Saves an uploaded file and queues its import once the current transaction commits.
+
+    Args:
+        upload (UploadedFile): the CSV/JSON file, written out chunk by chunk
+        model_name (str): "user", "post" or "comment", a key of resources.RESOURCES
+        file_format (str): one of resources.STREAM_FORMATS
+
+    Return:
+        str: job id to poll through imports/<job_id>/
+    """
+    job_id:str = uuid.uuid4().hex
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    path:str = os.path.join(settings.IMPORT_UPLOAD_DIR, f"{job_id}.{file_format}")
+    with open(path, "wb") as destination:
+        for chunk in upload.chunks():
+            destination.write(chunk)
+    set_import_status(job_id, {"status": "queued", "model": model_name, "file": upload.name})
+    transaction.on_commit(lambda: import_file.delay(job_id, model_name, path, file_format))
+    return job_id
+
+
+@shared_task
+def import_file(job_id:str, model_name:str, path:str, file_format:str) -> dict:
+    """Imports a saved upload chunk by chunk and removes it.
+
+    Return:
+        dict: the stream_import report
+    """
+    def progress(report:dict) -> None:
+        set_import_status(job_id, {"status": "running", "model": model_name, **report})
+
+    resource = resources.RESOURCES[model_name]()
+    try:
+        # Relation and uniqueness checks must see the chunks this job already inserted
+        with routers.primary(), open(path, "rb") as stream:
+            report:dict = resources.stream_import(resource, resources.iter_records(stream, file_format),
+                                                  progress=progress)
+    except Exception as exc:
+        set_import_status(job_id, {"status": "failed", "model": model_name, "error": str(exc)})
+        raise
+    finally:
+        os.remove(path)
+    set_import_status(job_id, {"status": "done", "model": model_name, **report})
+    return report
+###############################################################################################################
@@ -1,3 +1,1248 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache as django_cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend import cache, feeds, metrics, redis_clients, tasks, throttling
+from backend.models import Comment, Post, User
+from backend.pagination import EstimatedCountPaginator, KeysetPagination
+from backend.precompressed import accepted_encoding, brotli
+from backend.resources import CommentResource, PostResource, iter_records, stream_export, stream_import
+from backend.renderers import ORJSONRenderer
+from backend.serializers import PostSerializer
+from backend.warmup import warm_up
+
+
+class KeysetPaginationTests(TestCase):
+    """Opaque keyset cursors (backend/pagination.py) walk a list both ways without skipping or repeating rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="pager")
+        for index in range(5):
+            Post.objects.create(title=f"p{index}", author=cls.user, post_content="c")
+        # Two posts sharing a timestamp are ordered by id
+        first, second = Post.objects.order_by("id")[:2]
+        Post.objects.filter(id=second.id).update(created_at=first.created_at)
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def test_next_and_previous_round_trip(self):
+        expected = list(Post.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        pages, url = [], "/api/posts/?page_size=2"
+        while url:
+            body = self.client.get(url).json()
+            pages.append([post["id"] for post in body["results"]])
+            url = body["next"]
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+        backwards, url = [], body["previous"]
+        while url:
+            body = self.client.get(url).json()
+            backwards.append([post["id"] for post in body["results"]])
+            url = body["previous"]
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_tampered_cursor_is_not_found(self):
+        pagination = KeysetPagination()
+        for cursor in ("not-a-cursor", pagination.encode_cursor(["2024-01-01T00:00:00+00:00"], reverse=False),
+                       pagination.encode_cursor(["yesterday", 1], reverse=False)):
+            self.assertEqual(self.client.get("/api/posts/", {"cursor": cursor}).status_code, 404, cursor)
+
+
+class NdjsonExportTests(TestCase):
+    """The export endpoints stream one JSON document per row, in id order (backend/export.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="exporter", first_name="Zoë")
+        for index in range(3):
+            Post.objects.create(title=f"exported {index}", author=cls.user, post_content="line\nbreak")
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def test_rows_are_streamed(self):
+        response = self.client.get("/api/posts/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("attachment", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         list(PostSerializer(Post.objects.order_by("id"), many=True).data))
+
+        users = b"".join(self.client.get("/api/users/export/").streaming_content).decode("utf-8")
+        self.assertEqual(json.loads(users.splitlines()[0])["first_name"], "Zoë")
+
+
+class ObjectCacheTests(TestCase):
+    """The read-through object cache (backend/cache.py) of the single-object endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="cached")
+        cls.post = Post.objects.create(title="cached", author=cls.user, post_content="c")
+
+    def setUp(self):
+        django_cache.clear()
+
+    def test_hit_miss_and_invalidation(self):
+        client = APIClient(HTTP_HOST="localhost")
+        client.force_authenticate(self.user)
+        url = f"/api/posts/{self.post.id}/"
+        before = cache.cache_stats()
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get(url).json()[0]["title"], "cached")
+        with self.assertNumQueries(0):
+            client.get(url)
+        after = cache.cache_stats()
+        self.assertEqual((after["misses"] - before["misses"], after["hits"] - before["hits"]), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.put(url, {"title": "renamed", "post_content": "c", "author": self.user.id}, format="json")
+        self.assertEqual(client.get(url).json()[0]["title"], "renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(url)
+        self.assertEqual(client.get(url).json(), [])
+
+    def test_load_racing_an_invalidation_is_not_served(self):
+        def stale_load() -> list:
+            # The row is read, then a writer commits and invalidates before the payload is stored
+            payload:list = [{"title": "before the write"}]
+            cache.invalidate("post", [self.post.id])
+            return payload
+
+        self.assertEqual(cache.get_or_load("post", self.post.id, stale_load), [{"title": "before the write"}])
+        self.assertIsNone(cache.peek("post", self.post.id))
+        self.assertEqual(cache.get_or_load("post", self.post.id, lambda: ["fresh"]), ["fresh"])
+        self.assertEqual(cache.get_or_load("post", self.post.id, lambda: ["unused"]), ["fresh"])
+
+        def stale_load_many(pks:list) -> dict:
+            cache.invalidate("post", pks)
+            return {pk: ["before the write"] for pk in pks}
+
+        cache.invalidate("post", [self.post.id])
+        cache.get_or_load_many("post", [self.post.id], stale_load_many)
+        self.assertEqual(cache.get_or_load_many("post", [self.post.id], lambda pks: {pk: ["fresh"] for pk in pks}),
+                         {self.post.id: ["fresh"]})
+
+
+class ConditionalResponseTests(TestCase):
+    """The single-object endpoints answer a matching If-None-Match / If-Modified-Since with a 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="conditional")
+        cls.post = Post.objects.create(title="t", author=cls.user, post_content="c")
+        cls.comment = Comment.objects.create(post=cls.post, commenter=cls.user, comment_content="c")
+
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified(self):
+        for url in (f"/api/posts/{self.post.id}/", f"/api/comments/{self.comment.id}/",
+                    f"/api/users/{self.user.id}/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            for headers in ({"HTTP_IF_NONE_MATCH": response["ETag"]},
+                            {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]}):
+                not_modified = self.client.get(url, **headers)
+                self.assertEqual(not_modified.status_code, 304, url)
+                self.assertEqual(not_modified["ETag"], response["ETag"])
+                self.assertEqual(not_modified.content, b"")
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='W/"other"').status_code, 200, url)
+
+    def test_changed_object_is_sent_again(self):
+        url = f"/api/comments/{self.comment.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.client.put(url, {"post": self.post.id, "commenter": self.user.id, "comment_content": "edited"},
+                        format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["comment_content"], "edited")
+
+
+class ListingQueryPlanTests(TestCase):
+    """Runs EXPLAIN on the SQL the list endpoints actually issue and checks it is served by the composite indexes.
+
+    Fails when an ordering or filter change makes a listing fall back to a full scan or an explicit sort.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="writer")
+        cls.post = Post.objects.create(title="title", author=cls.user, post_content="content")
+        Comment.objects.create(commenter=cls.user, post=cls.post, comment_content="comment")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def listing_plan(self, url:str, table:str) -> str:
+        """Calls url and returns the query plan of the ordered page query it ran against table."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        sql:str = next(query["sql"] for query in queries.captured_queries
+                       if f'FROM "{table}"' in query["sql"] and "ORDER BY" in query["sql"])
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Tiny test tables are always cheaper to seq scan, only check the index is usable at all
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN " + sql)
+            else:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return "\n".join(str(row) for row in cursor.fetchall())
+
+    def assertIndexScan(self, plan:str, index:str):
+        self.assertIn(index, plan)
+        self.assertNotIn("Seq Scan", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_posts_by_author_uses_author_index(self):
+        plan = self.listing_plan(f"/api/users/{self.user.username}/posts/", "backend_post")
+        self.assertIndexScan(plan, "post_author_created_idx")
+
+    def test_comments_on_post_uses_post_index(self):
+        plan = self.listing_plan(f"/api/posts/{self.post.id}/comments/", "backend_comment")
+        self.assertIndexScan(plan, "comment_post_created_idx")
+
+    def test_comments_by_commenter_uses_commenter_index(self):
+        plan = self.listing_plan(f"/api/users/{self.user.username}/comments/", "backend_comment")
+        self.assertIndexScan(plan, "comment_commenter_created_idx")
+
+    def test_post_listing_uses_created_index(self):
+        plan = self.listing_plan("/api/posts/", "backend_post")
+        self.assertIndexScan(plan, "post_created_id_idx")
+
+
+class ExpandedPostTests(TestCase):
+    """``?expand=comments,author`` on post_utils must not grow with the number of comments (no N+1)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="author")
+        cls.post = Post.objects.create(title="title", author=cls.author, post_content="content")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def add_comments(self, count:int):
+        for index in range(count):
+            commenter = User.objects.create(username=f"commenter{Comment.objects.count()}")
+            self.client.post(f"/api/comments/post={self.post.id}/new/",
+                             {"commenter": commenter.id, "comment_content": f"comment {index}"},
+                             format="json", HTTP_HOST="localhost")
+
+    def get_expanded(self):
+        return self.client.get(f"/api/posts/{self.post.id}/?expand=comments,author", HTTP_HOST="localhost")
+
+    def test_query_count_is_constant(self):
+        self.add_comments(3)
+        with self.assertNumQueries(2):
+            self.get_expanded()
+        self.add_comments(30)
+        with self.assertNumQueries(2):
+            response = self.get_expanded()
+        post = response.json()[0]
+        self.assertEqual(post["comment_count"], 33)
+        self.assertEqual(post["author"]["username"], "author")
+        self.assertEqual(len(post["comments"]), 33)
+        self.assertEqual(post["comments"][0]["comment_content"], "comment 29")
+        self.assertTrue(post["comments"][0]["commenter"]["username"].startswith("commenter"))
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get(f"/api/posts/{self.post.id}/?expand=likes", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 400)
+
+
+class FastReadPathTests(TestCase):
+    """The values() + orjson fast path must send exactly the bytes the ModelSerializers and JSONRenderer send."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="fast", first_name="Zoë", email="fast@example.com")
+        cls.post = Post.objects.create(title="line\u2028separator", author=cls.user, post_content="é" * 50)
+        Post.objects.create(title="orphan", author=None, post_content="")
+        Comment.objects.create(commenter=cls.user, post=cls.post, comment_content="first")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_output_is_identical(self):
+        for url in ("/api/users/", "/api/posts/", "/api/comments/", f"/api/posts/{self.post.id}/comments/"):
+            regular = self.client.get(url, HTTP_HOST="localhost").content
+            with override_settings(FAST_READ_PATH=True):
+                fast = self.client.get(url, HTTP_HOST="localhost").content
+            self.assertEqual(regular, fast, url)
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = self.client.get("/api/posts/", HTTP_HOST="localhost").data
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class BulkCreateTests(TestCase):
+    """POST posts/bulk/ and comments/bulk/ validate a whole batch, report each item and insert with bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="bulk")
+        cls.post = Post.objects.create(title="t", author=cls.user, post_content="c")
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def test_results_in_request_order(self):
+        response = self.client.post("/api/posts/bulk/", [
+            {"title": "first", "post_content": "c", "author": self.user.id},
+            {"post_content": "no title", "author": self.user.id},
+            {"title": "unknown author", "post_content": "c", "author": self.user.id + 1000},
+            {"title": "last", "post_content": "c", "author": self.user.id},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["success"], body["created"]), (True, 2))
+        self.assertEqual([result["index"] for result in body["results"]], [0, 1, 2, 3])
+        self.assertEqual(Post.objects.get(id=body["results"][0]["id"]).title, "first")
+        self.assertEqual(Post.objects.get(id=body["results"][3]["id"]).title, "last")
+        self.assertIn("title", body["results"][1]["errors"])
+        self.assertEqual(body["results"][2]["errors"],
+                         {"author": [f'Invalid pk "{self.user.id + 1000}" - object does not exist.']})
+
+        response = self.client.post("/api/comments/bulk/", [
+            {"post": self.post.id + 1000, "commenter": self.user.id, "comment_content": "c"},
+            {"post": self.post.id, "commenter": self.user.id, "comment_content": "c"},
+        ], format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([sorted(result) for result in response.json()["results"]],
+                         [["errors", "index"], ["id", "index"]])
+        self.assertIn("post", response.json()["results"][0]["errors"])
+
+    def test_nothing_created_is_a_bad_request(self):
+        response = self.client.post("/api/posts/bulk/", [{"title": "no author", "post_content": "c",
+                                                           "author": self.user.id + 1000}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.json()["success"], response.json()["created"]), (False, 0))
+        self.assertEqual(Post.objects.count(), 1)
+
+    @override_settings(BULK_MAX_ITEMS=3)
+    def test_body_must_be_a_bounded_list(self):
+        item = {"title": "t", "post_content": "c", "author": self.user.id}
+        for body in (item, [], [item] * 4):
+            response = self.client.post("/api/posts/bulk/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn("non_field_errors", response.json())
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        fields = [field for field in Comment._meta.concrete_fields if not field.primary_key]
+        statements:list = []
+        for size in (50, 500):
+            items = [{"post": self.post.id, "commenter": self.user.id, "comment_content": f"c{index}"}
+                     for index in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post("/api/comments/bulk/", items, format="json")
+            self.assertEqual(response.json()["created"], size)
+            sql = [query["sql"] for query in queries.captured_queries]
+            # One IN lookup per relation (post, commenter) and a single INSERT, unless the database caps the
+            # parameters of a statement (SQLite: 999, so 199 comments per INSERT)
+            inserts = -(-size // min(connection.ops.bulk_batch_size(fields, items), settings.BULK_BATCH_SIZE))
+            self.assertEqual(sum(query.startswith("SELECT") and " IN (" in query for query in sql), 2)
+            self.assertEqual(sum(query.startswith('INSERT INTO "backend_comment"') for query in sql), inserts)
+            statements.append(len(sql) - inserts)
+        self.assertEqual(statements[0], statements[1])
+
+
+class PostSearchTests(TestCase):
+    """posts/search/ against the FTS5 fallback under SQLite (tsvector + GIN on PostgreSQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="searcher")
+        cls.in_title = Post.objects.create(title="Tuning Postgres", author=cls.user, post_content="indexes")
+        cls.in_content = Post.objects.create(title="Weekly notes", author=cls.user,
+                                             post_content="we spent the week tuning postgres queries")
+        Post.objects.create(title="Unrelated", author=cls.user, post_content="gardening")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query:str, **params):
+        return self.client.get("/api/posts/search/", {"q": query, **params}, HTTP_HOST="localhost").json()
+
+    def test_title_matches_rank_first(self):
+        results = self.search("tuning postgres")["results"]
+        self.assertEqual([post["id"] for post in results], [self.in_title.id, self.in_content.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        Post.objects.filter(id=self.in_content.id).update(post_content="nothing to see")
+        self.in_title.delete()
+        self.assertEqual(self.search("postgres")["results"], [])
+
+    def test_results_are_paginated(self):
+        first = self.search("postgres", page_size=1)
+        self.assertEqual(len(first["results"]), 1)
+        second = self.client.get(first["next"], HTTP_HOST="localhost").json()
+        self.assertEqual(second["results"][0]["id"], self.in_content.id)
+        self.assertIsNone(second["next"])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"unbalanced AND (')["results"], [])
+        self.assertEqual(self.search("")["results"], [])
+        self.assertEqual(self.search("?!")["results"], [])
+
+
+class DenormalizedCounterTests(TestCase):
+    """comment_count / post_count follow the create and delete views, and reconcile_counters repairs drift."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="counted")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_counters_follow_writes(self):
+        post_id = self.client.post("/api/posts/new/", {"title": "t", "post_content": "c", "author": self.user.id},
+                                   format="json", HTTP_HOST="localhost").json()["post_id"]
+        comment_id = self.client.post(f"/api/comments/post={post_id}/new/",
+                                      {"commenter": self.user.id, "comment_content": "c"},
+                                      format="json", HTTP_HOST="localhost").json()["comment_id"]
+        self.client.post("/api/comments/bulk/", [{"post": post_id, "commenter": self.user.id, "comment_content": "b"}] * 3,
+                         format="json", HTTP_HOST="localhost")
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.post_count, self.user.comment_count), (1, 4))
+        self.assertEqual(Post.objects.get(id=post_id).comment_count, 4)
+
+        self.client.delete(f"/api/comments/{comment_id}/", HTTP_HOST="localhost")
+        self.client.delete(f"/api/posts/{post_id}/", HTTP_HOST="localhost")
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.post_count, self.user.comment_count), (0, 3))
+
+    def test_counter_change_moves_the_etag(self):
+        post = Post.objects.create(title="t", author=self.user, post_content="c")
+        for url in (f"/api/posts/{post.id}/", "/api/posts/?ordering=popular"):
+            etag = self.client.get(url, HTTP_HOST="localhost")["ETag"]
+            self.assertEqual(self.client.get(url, HTTP_HOST="localhost", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.client.post(f"/api/comments/post={post.id}/new/", {"commenter": self.user.id, "comment_content": "c"},
+                             format="json", HTTP_HOST="localhost")
+            response = self.client.get(url, HTTP_HOST="localhost", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["results"][0]["comment_count"], 2)
+        # A comment isn't an edit of its post
+        self.assertEqual(Post.objects.get(id=post.id).updated_at, post.updated_at)
+
+    def test_popular_ordering(self):
+        quiet = Post.objects.create(title="quiet", author=self.user, post_content="c")
+        busy = Post.objects.create(title="busy", author=self.user, post_content="c", comment_count=5)
+        response = self.client.get("/api/posts/?ordering=popular&min_comments=0", HTTP_HOST="localhost").json()
+        self.assertEqual([post["id"] for post in response["results"]], [busy.id, quiet.id])
+
+    def test_reconcile_repairs_drift(self):
+        post = Post.objects.create(title="t", author=self.user, post_content="c", comment_count=7)
+        Comment.objects.create(commenter=self.user, post=post, comment_content="c")
+        cached_count = lambda: self.client.get(f"/api/posts/{post.id}/", HTTP_HOST="localhost").json()[0][
+            "comment_count"]
+        self.assertEqual(cached_count(), 7)
+        call_command("reconcile_counters", chunk_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(cached_count(), 1)
+        self.assertEqual((self.user.post_count, self.user.comment_count), (1, 1))
+
+
+class BenchmarkCommandTests(TestCase):
+    """seed_data writes consistent counters and bench_routes gets an answer from every route."""
+
+    def test_seed_then_bench_every_route(self):
+        call_command("seed_data", users=5, posts=20, comments=200, stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 200)
+        busiest = Post.objects.order_by("-comment_count").first()
+        self.assertEqual(busiest.comment_count, busiest.comments.count())
+        self.assertEqual(sum(User.objects.values_list("post_count", flat=True)), 20)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command("bench_routes", iterations=2, warmup=0, output=output, stdout=StringIO())
+            with open(output, encoding="utf-8") as results:
+                routes = json.load(results)["routes"]
+        self.assertIn("GET posts/<int:pk>/", routes)
+        self.assertIn("DELETE users/<int:pk>/", routes)
+        self.assertEqual([name for name, result in routes.items() if result["status"] >= 500], [])
+        self.assertGreater(routes["GET posts/"]["queries"], 0)
+        self.assertEqual(Comment.objects.count(), 200)
+
+
+@override_settings(COMMENT_WRITE_BEHIND=True)
+class CommentWriteBehindTests(TestCase):
+    """create_new_comment_on queues instead of inserting, the eager drain_comment_queue task inserts in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="queued")
+        cls.post = Post.objects.create(title="viral", author=cls.user, post_content="c")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comment(self, commenter_id:int) -> str:
+        response = self.client.post(f"/api/comments/post={self.post.id}/new/",
+                                    {"commenter": commenter_id, "comment_content": "c"},
+                                    format="json", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 202)
+        return response.json()["tracking_id"]
+
+    def status_of(self, tracking_id:str) -> dict:
+        return self.client.get(f"/api/comments/ingest/{tracking_id}/", HTTP_HOST="localhost").json()
+
+    def test_queued_comment_is_created(self):
+        tracking_id = self.comment(self.user.id)
+        ingest_status = self.status_of(tracking_id)
+        self.assertEqual(ingest_status["status"], "created")
+        self.assertTrue(Comment.objects.filter(id=ingest_status["comment_id"], post=self.post).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_burst_is_drained_in_one_batch(self):
+        # A drain is already pending: the burst only queues, then one task run inserts everything
+        django_cache.add(tasks.INGEST_SCHEDULED_KEY, True)
+        tracking_ids = [self.comment(self.user.id) for _ in range(3)] + [self.comment(self.user.id + 1000)]
+        self.assertEqual(self.status_of(tracking_ids[0])["status"], "queued")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tasks.drain_comment_queue.delay().get(), 3)
+        self.assertEqual(sum('INSERT INTO "backend_comment"' in query["sql"] for query in queries.captured_queries), 1)
+        self.assertEqual([self.status_of(tracking_id)["status"] for tracking_id in tracking_ids],
+                         ["created"] * 3 + ["failed"])
+        self.assertEqual(self.client.get("/api/comments/ingest/unknown/", HTTP_HOST="localhost").status_code, 404)
+
+    @override_settings(COMMENT_INGEST_RETRY_DELAY=7)
+    def test_failed_batch_is_requeued_and_rescheduled(self):
+        django_cache.add(tasks.INGEST_SCHEDULED_KEY, True)
+        tracking_id = self.comment(self.user.id)
+        with mock.patch.object(tasks, "bulk_create_items", side_effect=RuntimeError("database down")), \
+                mock.patch.object(tasks.drain_comment_queue, "apply_async") as apply_async:
+            with self.assertRaises(RuntimeError):
+                tasks.drain_comment_queue()
+        apply_async.assert_called_once_with(countdown=7)
+        self.assertEqual(self.status_of(tracking_id)["status"], "queued")
+        # The rescheduled drain finds the requeued comment
+        self.assertEqual(tasks.drain_comment_queue(), 1)
+        self.assertEqual(self.status_of(tracking_id)["status"], "created")
+
+    def test_invalid_comment_is_rejected_before_queueing(self):
+        response = self.client.post(f"/api/comments/post={self.post.id}/new/", {"commenter": self.user.id},
+                                    format="json", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(USER_DELETION_CHUNK_SIZE=2)
+class UserDeletionTests(TestCase):
+    """DELETE /api/users/<pk>/ answers with a job id, the eager delete_user task detaches and deletes in chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin")
+        cls.prolific = User.objects.create(username="prolific")
+        posts = Post.objects.bulk_create(Post(title=f"p{i}", author=cls.prolific, post_content="c") for i in range(5))
+        Comment.objects.bulk_create(Comment(commenter=cls.prolific, post=post, comment_content="c") for post in posts)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_deletion_runs_in_chunks_after_the_response(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(f"/api/users/{self.prolific.id}/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/users/deletions/{response.json()['job_id']}/"
+        self.assertEqual(self.client.get(job_url, HTTP_HOST="localhost").json()["status"], "queued")
+        self.assertFalse(User.objects.get(id=self.prolific.id).is_active)
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        # 5 posts and 5 comments, 2 per UPDATE (the final user delete's own SET_NULL updates find nothing left)
+        chunks = [query for query in queries.captured_queries if query["sql"].startswith("UPDATE")
+                  and '"updated_at"' in query["sql"]]
+        self.assertEqual(len(chunks), 6)
+        job = self.client.get(job_url, HTTP_HOST="localhost").json()
+        self.assertEqual((job["status"], job["posts_detached"], job["comments_detached"]), ("done", 5, 5))
+        self.assertFalse(User.objects.filter(id=self.prolific.id).exists())
+        self.assertEqual(Post.objects.filter(author__isnull=True).count(), 5)
+        self.assertEqual(Comment.objects.filter(commenter__isnull=True).count(), 5)
+        self.assertEqual(self.client.get("/api/users/deletions/unknown/", HTTP_HOST="localhost").status_code, 404)
+
+    def test_repeated_delete_returns_the_pending_job(self):
+        first = self.client.delete(f"/api/users/{self.prolific.id}/", HTTP_HOST="localhost").json()["job_id"]
+        second = self.client.delete(f"/api/users/{self.prolific.id}/", HTTP_HOST="localhost").json()["job_id"]
+        self.assertEqual(first, second)
+
+
+class AsyncReadViewTests(TestCase):
+    """The /api/async/ read endpoints answer like their synchronous counterparts, authentication included."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="reader")
+        cls.post = Post.objects.create(title="async", author=cls.user, post_content="c")
+        Comment.objects.create(commenter=cls.user, post=cls.post, comment_content="c")
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    async def test_same_payload_as_sync_views(self):
+        await self.async_client.aforce_login(self.user)
+        for path in ("users/", "posts/?ordering=popular", "comments/", f"posts/{self.post.id}/",
+                     f"posts/{self.post.id}/?expand=author,comments", f"posts/{self.post.id}/comments/",
+                     f"users/{self.user.id}/", "users/reader/posts/", "posts/search/?q=async"):
+            response = await self.async_client.get(f"/api/async/{path}")
+            expected = await sync_to_async(self.client.get)(f"/api/{path}", HTTP_HOST="localhost")
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.json(), expected.json(), path)
+
+    async def test_token_and_anonymous_requests(self):
+        response = await self.async_client.get("/api/async/posts/", headers={"Authorization": f"Token {self.token.key}"})
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get("/api/async/posts/", headers={"Authorization": "Token wrong"})
+        self.assertEqual((response.status_code, response.json()), (403, {"detail": "Invalid token."}))
+        response = await self.async_client.get("/api/async/posts/")
+        self.assertEqual(response.status_code, 403)
+
+    async def test_errors(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/api/async/users/nobody/posts/")
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get("/api/async/posts/?cursor=broken")
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post("/api/async/posts/")
+        self.assertEqual(response.status_code, 405)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Token requests resolve their user from the cache until the token or the user changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="token-holder")
+        cls.other = User.objects.create(username="other")
+
+    def setUp(self):
+        django_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_steady_state_authentication_runs_no_query(self):
+        self.client.get(f"/api/users/{self.other.id}/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/users/{self.other.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_revoked_token_is_refused(self):
+        self.client.get("/api/posts/")
+        self.token.delete()
+        self.assertEqual(self.client.get("/api/posts/").status_code, 403)
+
+    def test_user_update_and_delete_invalidate(self):
+        self.client.get("/api/posts/")
+        body = {"username": "renamed", "first_name": "a", "last_name": "b", "email": "a@example.com",
+                "can_post": True, "can_comment": True}
+        self.client.put(f"/api/users/{self.user.id}/", body, format="json")
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.client.get("/api/posts/").status_code, 403)
+
+        User.objects.filter(id=self.user.id).update(is_active=True)
+        self.client.get("/api/posts/")
+        self.client.delete(f"/api/users/{self.user.id}/")
+        self.assertEqual(self.client.get("/api/posts/").status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    """GETs read the replica, writes and the reads that follow them for a while go to the primary.
+
+    The "replica" test database receives nothing written to "default", so a read that reaches it sees no post.
+    """
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="writer", can_post=True)
+        cls.token = Token.objects.create(user=cls.user)
+        # Already replicated: the account and its token
+        cls.user.save(using="replica")
+        cls.token.save(using="replica")
+
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def create_post(self, client:APIClient) -> int:
+        response = client.post("/api/posts/new/", {"title": "fresh", "post_content": "c", "author": self.user.id},
+                               format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["post_id"]
+
+    def listed(self, client:APIClient) -> list:
+        return [post["id"] for post in client.get("/api/posts/").json()["results"]]
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.assertEqual(self.listed(self.client), [])
+        post_id = self.create_post(self.client)
+        self.assertIn("blogapi_primary", self.client.cookies)
+        self.assertEqual(self.listed(self.client), [post_id])
+        self.assertEqual(self.client.get(f"/api/posts/{post_id}/").json()[0]["id"], post_id)
+
+        self.client.cookies.clear()
+        self.assertEqual(self.listed(self.client), [])
+
+    def test_token_clients_stick_without_cookies(self):
+        client = APIClient(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        post_id = self.create_post(client)
+        client.cookies.clear()
+        self.assertEqual(self.listed(client), [post_id])
+
+        with self.settings(READ_YOUR_WRITES_SECONDS=0):
+            other = APIClient(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+            self.create_post(other)
+            other.cookies.clear()
+            self.assertEqual(self.listed(other), [])
+
+
+@override_settings(LIST_CACHE_TIMEOUT=60, COMPRESS_MIN_BYTES=0)
+class PrecompressedListTests(TestCase):
+    """List pages are rendered and compressed once per content version and served per Accept-Encoding."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="lister")
+        cls.post = Post.objects.create(title="listed", author=cls.user, post_content="lorem ipsum " * 50)
+
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def test_gzip_variant_served_from_cache(self):
+        plain = self.client.get("/api/posts/")
+        self.assertNotIn("Content-Encoding", plain)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/posts/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/posts/", HTTP_IF_NONE_MATCH=plain["ETag"])
+        self.assertEqual((response.status_code, len(queries)), (304, 0))
+
+    def test_writes_move_lists_to_a_new_version(self):
+        self.assertEqual(self.client.get("/api/posts/").json()["results"][0]["comment_count"], 0)
+        self.client.post(f"/api/comments/post={self.post.id}/new/",
+                         {"commenter": self.user.id, "comment_content": "c"}, format="json")
+        self.assertEqual(self.client.get("/api/posts/").json()["results"][0]["comment_count"], 1)
+
+    def test_accepted_encoding(self):
+        self.assertEqual(accepted_encoding(""), "identity")
+        self.assertEqual(accepted_encoding("gzip;q=0, identity"), "identity")
+        self.assertEqual(accepted_encoding("*"), "br" if brotli is not None else "gzip")
+
+
+@override_settings(FEEDS_REDIS_URL="memory://", FEED_LENGTH=3)
+class PostFeedTests(TestCase):
+    """Latest posts pages read from the feeds match the SQL ones, and writes keep the feeds current."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username="feeder")
+        other = User.objects.create(username="other")
+        for index in range(4):
+            Post.objects.create(title=f"mine {index}", author=cls.author, post_content="c")
+        Post.objects.create(title="theirs", author=other, post_content="c")
+
+    def setUp(self):
+        django_cache.clear()
+        feeds.client().flushall()
+        call_command("rebuild_feeds", stdout=StringIO())
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.author)
+
+    def tearDown(self):
+        feeds.client().flushall()
+
+    def pages(self, path:str) -> list:
+        pages = []
+        while path:
+            body = self.client.get(path).json()
+            pages.append(body)
+            path = body["next"]
+        return pages
+
+    def test_pages_match_sql(self):
+        for path in ("http://localhost/api/posts/?page_size=2", "http://localhost/api/users/feeder/posts/?page_size=2"):
+            from_feeds = self.pages(path)
+            with self.settings(FEEDS_REDIS_URL=None):
+                self.assertEqual(from_feeds, self.pages(path), path)
+
+    def test_steady_state_runs_no_query(self):
+        self.client.get("/api/users/feeder/posts/?page_size=2")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/users/feeder/posts/?page_size=2")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([post["title"] for post in response.json()["results"]], ["mine 3", "mine 2"])
+        # Past the FEED_LENGTH newest posts the page comes from SQL
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/users/feeder/posts/?page_size=3")
+        self.assertEqual(len(queries), 1)
+
+    def test_writes_update_feeds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/posts/new/", {"title": "new", "post_content": "c",
+                                                            "author": self.author.id}, format="json")
+        post_id = response.json()["post_id"]
+        self.assertEqual(self.client.get("/api/posts/?page_size=2").json()["results"][0]["id"], post_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/posts/{post_id}/")
+        self.assertNotIn(post_id, [post["id"] for post in self.client.get("/api/posts/?page_size=2").json()["results"]])
+
+    def test_orm_writes_update_feeds(self):
+        # Admin saves, shell scripts, ... anything going through Post.save() / delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title="orm", author=self.author, post_content="c")
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get("/api/users/feeder/posts/?page_size=2").json()["results"]
+        self.assertEqual(page[0]["id"], post.id)
+        self.assertFalse(any('FROM "backend_post"' in query["sql"] and "ORDER BY" in query["sql"]
+                             for query in queries.captured_queries))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.post_count, 5)
+
+        post_id = post.id
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        page = self.client.get("/api/users/feeder/posts/?page_size=2").json()["results"]
+        self.assertEqual([item["title"] for item in page], ["mine 3", "mine 2"])
+        self.assertNotIn(post_id, [item["id"] for item in page])
+
+    def test_author_change_moves_the_post_between_feeds(self):
+        other = User.objects.get(username="other")
+        post = Post.objects.filter(author=self.author).order_by("-id").first()
+        # Cached before the move, the page has to be dropped with it
+        self.client.get("/api/users/other/posts/?page_size=2")
+        with self.captureOnCommitCallbacks(execute=True):
+            post.author = other
+            post.save()
+        with CaptureQueriesContext(connection) as queries:
+            # The feeder feed is trimmed to FEED_LENGTH=3, a page of one is the most it answers alone
+            mine = self.client.get("/api/users/feeder/posts/?page_size=1").json()["results"]
+            theirs = self.client.get("/api/users/other/posts/?page_size=2").json()["results"]
+        self.assertFalse(any('FROM "backend_post"' in query["sql"] and "ORDER BY" in query["sql"]
+                             for query in queries.captured_queries))
+        self.assertEqual([item["title"] for item in mine], ["mine 2"])
+        self.assertEqual([item["title"] for item in theirs], ["theirs", "mine 3"])
+        self.assertEqual(theirs[1]["author"], other.id)
+        self.assertEqual([User.objects.get(id=user.id).post_count for user in (self.author, other)], [3, 2])
+
+    def test_seed_data_marks_feeds_stale(self):
+        call_command("seed_data", users=2, posts=3, comments=0, prefix="feedseed", stdout=StringIO())
+        self.assertIsNone(feeds.latest_ids(feeds.FEED_KEY, None, 1))
+
+
+class ImportExportTests(TestCase):
+    """Streamed admin import/export: chunked inserts with per-row errors, incremental readers and writers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username="editor", is_staff=True, is_superuser=True)
+        cls.post = Post.objects.create(title="imported into", author=cls.staff, post_content="c")
+
+    def test_chunked_import_reports_bad_rows(self):
+        rows = [{"post": str(self.post.id), "commenter": str(self.staff.id), "comment_content": f"c{i}"}
+                for i in range(5)]
+        rows[1]["post"] = "999999"
+        rows[3]["comment_content"] = ""
+        with CaptureQueriesContext(connection) as queries:
+            report = stream_import(CommentResource(), rows, chunk_size=2)
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (5, 3, 2))
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 4])
+        self.assertIn("post", report["errors"][0]["errors"])
+        # One INSERT per chunk, never a query per row
+        self.assertEqual(sum(query["sql"].startswith("INSERT") for query in queries.captured_queries), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+
+    def test_json_rows_spanning_reads(self):
+        content = "x" * 15000
+        rows = [{"title": f"t{i}", "author": self.staff.id, "post_content": content} for i in range(6)]
+        # Each row is 15 KB, several of them straddle the 64 KB reads of iter_json
+        report = stream_import(PostResource(), iter_records(BytesIO(json.dumps(rows).encode("utf-8")), "json"))
+        self.assertEqual(report["created"], 6)
+        self.assertEqual(Post.objects.filter(post_content=content).count(), 6)
+        self.staff.refresh_from_db()
+        # Plus the post of setUpTestData, counted by the post_save signal
+        self.assertEqual(self.staff.post_count, 7)
+
+    def test_export_reads_back(self):
+        exported = "".join(stream_export(PostResource(), Post.objects.all(), "csv")).encode("utf-8")
+        Post.objects.all().delete()
+        report = stream_import(PostResource(), iter_records(BytesIO(exported), "csv"))
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(Post.objects.get().id, self.post.id)
+        self.assertEqual(json.loads("".join(stream_export(PostResource(), Post.objects.all(), "json")))[0]["title"],
+                         "imported into")
+
+    def test_admin_streams_big_files(self):
+        self.client.force_login(self.staff)
+        formats = [fmt().get_title() for fmt in admin.site._registry[Comment].get_import_formats()]
+        body = f"post,commenter,comment_content\n{self.post.id},{self.staff.id},hello\n".encode("utf-8")
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(IMPORT_PREVIEW_MAX_BYTES=0, IMPORT_UPLOAD_DIR=directory), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/backend/comment/import/", {
+                "input_format": formats.index("csv"),
+                "import_file": SimpleUploadedFile("comments.csv", body, content_type="text/csv")})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(Comment.objects.get().comment_content, "hello")
+
+        formats = [fmt().get_title() for fmt in admin.site._registry[Post].get_export_formats()]
+        response = self.client.post("/admin/backend/post/export/", {"file_format": formats.index("csv")})
+        self.assertTrue(response.streaming)
+        self.assertIn(b"imported into", b"".join(response.streaming_content))
+
+
+class AdminChangeListTests(TestCase):
+    """Post/Comment admin pages: no query per listed row, no <select> of every user or post."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username="editor", is_staff=True, is_superuser=True)
+        cls.post = Post.objects.create(title="kittens everywhere", author=cls.staff, post_content="c")
+        cls.comment = Comment.objects.create(commenter=cls.staff, post=cls.post, comment_content="c")
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get("/admin/backend/comment/").status_code, 200)
+        writers = User.objects.bulk_create(User(username=f"w{i}") for i in range(5))
+        Comment.objects.bulk_create(Comment(commenter=writer, post=self.post, comment_content="c") for writer in writers)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.get("/admin/backend/comment/").status_code, 200)
+        self.assertEqual(len(second), len(first))
+        # Estimates are PostgreSQL only, anywhere else the count is exact
+        self.assertEqual(EstimatedCountPaginator(Comment.objects.order_by("id"), 50).count, 6)
+
+    def test_change_form_uses_autocomplete(self):
+        User.objects.create(username="somebody-else")
+        content = self.client.get(f"/admin/backend/comment/{self.comment.id}/change/").content.decode("utf-8")
+        self.assertIn("admin-autocomplete", content)
+        self.assertNotIn("somebody-else", content)
+
+        # Typed so far: whole words, then a word still being typed
+        for term in ("kittens", "kitt", "kittens ever", "Kittens"):
+            response = self.client.get("/admin/autocomplete/", {"app_label": "backend", "model_name": "comment",
+                                                                "field_name": "post", "term": term})
+            self.assertEqual([result["text"] for result in response.json()["results"]], ["kittens everywhere"], term)
+        response = self.client.get("/admin/autocomplete/", {"app_label": "backend", "model_name": "comment",
+                                                            "field_name": "post", "term": "kitt dogs"})
+        self.assertEqual(response.json()["results"], [])
+        response = self.client.get("/admin/autocomplete/", {"app_label": "backend", "model_name": "comment",
+                                                            "field_name": "commenter", "term": "edi"})
+        self.assertEqual([result["id"] for result in response.json()["results"]], [str(self.staff.id)])
+
+
+@override_settings(THROTTLE_REDIS_URL="memory://", LOAD_SHEDDING_MAX_IN_FLIGHT=1,
+                   THROTTLE_BUCKETS={"write": {"capacity": 100, "rate": 1.0}, "post": {"capacity": 2, "rate": 0.5}})
+class ThrottlingTests(TestCase):
+    """Token buckets per client and endpoint class, and load shedding, against the in-process Redis stand-in."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="hammer")
+        cls.other = User.objects.create(username="polite")
+
+    def setUp(self):
+        redis_clients.client_for("memory://").flushall()
+        self.addCleanup(redis_clients.client_for("memory://").flushall)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_post(self, client:APIClient):
+        return client.post("/api/posts/new/", {"title": "t", "post_content": "c", "author": self.user.id},
+                           format="json")
+
+    def test_bucket_rejects_with_retry_after(self):
+        self.assertEqual([self.create_post(self.client).status_code for _ in range(2)], [200, 200])
+        response = self.create_post(self.client)
+        self.assertEqual(response.status_code, 429)
+        # 0.5 tokens a second: the next one is 2 seconds away
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertEqual(self.client.get("/api/posts/").status_code, 200)
+
+        other = APIClient()
+        other.force_authenticate(self.other)
+        self.assertEqual(self.create_post(other).status_code, 200)
+
+    def test_writes_are_shed_when_too_many_are_in_flight(self):
+        slot = throttling.admit()
+        response = self.create_post(self.client)
+        self.assertEqual((response.status_code, response["Retry-After"]), (503, "1"))
+        self.assertEqual(self.client.get("/api/posts/").status_code, 200)
+        throttling.release(slot)
+        self.assertEqual(self.create_post(self.client).status_code, 200)
+        # The request gave its slot back
+        self.assertEqual(self.create_post(self.client).status_code, 200)
+
+
+class TimingMiddlewareTests(TestCase):
+    """Server-Timing header, /metrics histograms and slow request logging."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="timed")
+        Post.objects.create(title="t", author=cls.user, post_content="c")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def server_timing(self, response) -> dict:
+        return {metric.split(";")[0]: metric for metric in response["Server-Timing"].split(", ")}
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get("/api/posts/", HTTP_HOST="localhost")
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {"app", "db", "serializer"})
+        self.assertIn('desc="1 queries"', timing["db"])
+
+        metrics_text = self.client.get("/metrics", HTTP_HOST="localhost").content.decode()
+        self.assertIn('blogapi_responses_total{view="api/posts/",method="GET",status="200"}', metrics_text)
+        self.assertIn('blogapi_request_queries_bucket{view="api/posts/",method="GET",le="1"}', metrics_text)
+        self.assertIn("# TYPE blogapi_request_duration_seconds histogram", metrics_text)
+        self.assertIn('blogapi_db_connections_open{alias="default"} 1', metrics_text)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1", "10.0.0.0/8"], METRICS_TOKEN="s3cret")
+    def test_metrics_scrapers_are_restricted(self):
+        for remote_addr, headers, expected in (("127.0.0.1", {}, 200), ("10.1.2.3", {}, 200),
+                                               ("203.0.113.5", {}, 403),
+                                               ("203.0.113.5", {"HTTP_AUTHORIZATION": "Bearer wrong"}, 403),
+                                               ("203.0.113.5", {"HTTP_AUTHORIZATION": "Bearer s3cret"}, 200)):
+            response = self.client.get("/metrics", HTTP_HOST="localhost", REMOTE_ADDR=remote_addr, **headers)
+            self.assertEqual(response.status_code, expected, (remote_addr, headers))
+
+    def test_metrics_add_up_across_workers(self):
+        def value(text:str, series:str) -> int:
+            return int(next(line for line in text.splitlines() if line.startswith(series + " ")).split()[-1])
+
+        posts_series = 'blogapi_responses_total{view="api/posts/",method="GET",status="200"}'
+        open_series = 'blogapi_db_connections_open{alias="default"}'
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.client.get("/api/posts/", HTTP_HOST="localhost")
+            own = metrics.snapshot()
+            # Two more workers with the same numbers, then one of them is recycled
+            for pid in (1, 2):
+                with open(metrics.worker_file(directory, pid), "w", encoding="utf-8") as output:
+                    json.dump(own, output)
+            metrics.mark_process_dead(2)
+            self.assertFalse(os.path.exists(metrics.worker_file(directory, 2)))
+            text = self.client.get("/metrics", HTTP_HOST="localhost").content.decode()
+        this_process = metrics.aggregate([own])
+        self.assertEqual(value(text, posts_series),
+                         3 * this_process["responses"][("api/posts/", "GET", "200")])
+        # The open connections of the recycled worker are gone, its counters are not
+        self.assertEqual(value(text, open_series), 2 * this_process["connections_open"]["default"])
+
+    def test_warm_up(self):
+        with self.assertLogs("backend.warmup", "INFO"):
+            report = warm_up()
+        self.assertGreater(report["url_patterns"], 20)
+        self.assertEqual(report["databases"], len(connections.all()))
+
+    async def test_async_views_are_timed(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get("/api/async/posts/")
+        # The session's user and the page, both run by the async ORM's worker thread
+        self.assertIn('desc="2 queries"', self.server_timing(response)["db"])
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs("backend.middleware", "WARNING") as logs:
+            self.client.get("/api/posts/", HTTP_HOST="localhost")
+        self.assertIn("Slow request GET /api/posts/", logs.output[0])
+        self.assertIn('FROM "backend_post"', logs.output[0])
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= / ?exclude= trim both the JSON and the SELECT, and Post.excerpt follows post_content."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="sparse")
+        cls.post = Post.objects.create(title="long", author=cls.user, post_content="word " * 4000)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def listing(self, query:str) -> tuple:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/posts/{query}", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"], [query["sql"] for query in queries.captured_queries]
+
+    def test_fields_reach_the_sql(self):
+        results, sql = self.listing("?fields=id,title,excerpt")
+        self.assertEqual(set(results[0]), {"id", "title", "excerpt"})
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn("post_content", sql[0])
+
+        results, sql = self.listing("?exclude=post_content")
+        self.assertNotIn("post_content", results[0])
+        self.assertIn("excerpt", results[0])
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn("post_content", sql[0])
+
+    def test_fast_path_matches(self):
+        for query in ("?fields=id,title,excerpt", "?exclude=post_content,author"):
+            regular, _ = self.listing(query)
+            with override_settings(FAST_READ_PATH=True):
+                fast, _ = self.listing(query)
+            self.assertEqual(fast, regular)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get("/api/posts/?fields=id,secret", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 400)
+
+    def test_excerpt_follows_writes(self):
+        self.assertLessEqual(len(self.post.excerpt), 201)
+        self.assertTrue(self.post.excerpt.startswith("word word") and self.post.excerpt.endswith("…"))
+        self.client.put(f"/api/posts/{self.post.id}/", {"title": "short", "post_content": "  now\n short ",
+                                                         "author": self.user.id}, format="json", HTTP_HOST="localhost")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.excerpt, "now short")
+        self.client.post("/api/posts/bulk/", [{"title": "b", "post_content": "bulk body", "author": self.user.id}],
+                         format="json", HTTP_HOST="localhost")
+        self.assertEqual(Post.objects.get(title="b").excerpt, "bulk body")
+
+
+class MultiGetTests(TestCase):
+    """?ids= answers from one cache multi-get and one IN query for the misses, in the order asked."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="multi")
+        cls.first = Post.objects.create(title="first", author=cls.user, post_content="a")
+        cls.second = Post.objects.create(title="second", author=cls.user, post_content="b")
+        cls.comment = Comment.objects.create(post=cls.first, commenter=cls.user, comment_content="c")
+
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient(HTTP_HOST="localhost")
+        self.client.force_authenticate(self.user)
+
+    def post_queries(self, url:str) -> tuple:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [query["sql"] for query in queries.captured_queries if 'FROM "backend_post"' in query["sql"]]
+
+    def test_posts_by_ids(self):
+        ids:str = f"{self.second.id},{self.first.id},999999,{self.second.id}"
+        response, sql = self.post_queries(f"/api/posts/?ids={ids}&fields=id,title")
+        self.assertEqual(response.json(), {"results": [{"id": self.second.id, "title": "second"},
+                                                       {"id": self.first.id, "title": "first"}],
+                                           "missing": [999999]})
+        self.assertEqual(len(sql), 1)
+        self.assertIn(" IN ", sql[0])
+
+        # Every payload is cached now, the single-object view reads the same entries
+        response, sql = self.post_queries(f"/api/posts/?ids={ids}")
+        self.assertEqual(sql, [])
+        self.assertEqual([response.json()["results"][1]], self.client.get(f"/api/posts/{self.first.id}/").json())
+        not_modified = self.client.get(f"/api/posts/?ids={ids}&exclude=post_content",
+                                       HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_users_and_comments_by_ids(self):
+        users = self.client.get(f"/api/users/?ids={self.user.id}").json()
+        self.assertEqual([user["username"] for user in users["results"]], ["multi"])
+        comments = self.client.get(f"/api/comments/?ids={self.comment.id},0").json()
+        self.assertEqual(comments["results"][0]["comment_content"], "c")
+        self.assertEqual(comments["missing"], [0])
+
+    @override_settings(MULTI_GET_MAX_IDS=2)
+    def test_bad_ids_are_rejected(self):
+        for ids in ("1,x", ",", "1,2,3"):
+            self.assertEqual(self.client.get(f"/api/posts/?ids={ids}").status_code, 400)
+
+
+class BatchTests(TestCase):
+    """api/batch/ runs read sub-requests in process with the caller's credentials."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="batcher")
+        cls.post = Post.objects.create(title="batched", author=cls.user, post_content="body")
+
+    def setUp(self):
+        django_cache.clear()
+        token:Token = Token.objects.create(user=self.user)
+        self.client = APIClient(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_sub_requests(self):
+        paths:list = [f"/api/posts/{self.post.id}/", f"/api/users/?ids={self.user.id}", "/api/nothing/",
+                      "/api/posts/export/", "/api/batch/?path=/api/posts/", "/api/async/posts/", "/admin/"]
+        response = self.client.get("/api/batch/", {"path": paths}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        entries:list = response.json()["responses"]
+        self.assertEqual([entry["path"] for entry in entries], paths)
+        self.assertEqual([entry["status"] for entry in entries], [200, 200, 404, 400, 400, 400, 400])
+        self.assertEqual(entries[0]["body"], self.client.get(f"/api/posts/{self.post.id}/").json())
+        self.assertEqual(entries[1]["body"]["results"][0]["username"], "batcher")
+
+    def test_session_credentials_and_limits(self):
+        client = APIClient(HTTP_HOST="localhost")
+        self.assertEqual(client.get("/api/batch/", {"path": "/api/posts/"}).status_code, 403)
+        client.force_login(self.user)
+        entries:list = client.get("/api/batch/", {"path": ["/api/posts/", "/api/comments/"]}).json()["responses"]
+        self.assertEqual([entry["status"] for entry in entries], [200, 200])
+        self.assertEqual(entries[0]["body"]["results"][0]["title"], "batched")
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            self.assertEqual(client.get("/api/batch/", {"path": ["/api/posts/", "/api/users/"]}).status_code, 400)
+        self.assertEqual(client.get("/api/batch/").status_code, 400)
@@ -0,0 +1,177 @@
+# pylint: disable=missing-module-docstring
+import hashlib
+import logging
+import math
+import time
+import uuid
+
+import redis
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.throttling import BaseThrottle
+
+from backend import redis_clients
+
+
+logger = logging.getLogger(__name__)
+
+
+# Write rate limits and load shedding, both kept in Redis (THROTTLE_REDIS_URL) so every worker process shares them.
+# Each limit is a token bucket per client and endpoint class: it holds up to "capacity" tokens, refills at "rate"
+# tokens per second, and a write spends one. The check-and-spend is a Lua script, atomic in Redis however many
+# workers hit the same bucket. InProcessRedis (``memory://``, the tests) runs the Python copy registered
+# for each script with redis_clients.emulate().
+# Redis being unreachable lets requests through: the limits protect the database, they must not take the API down.
+
+TOKEN_BUCKET_LUA:str = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+# Admits a request if fewer than the limit are in flight. Members are request ids scored by their start, so the
+# slot of a worker killed mid-request is reclaimed once it is older than the stale timeout
+ADMIT_LUA:str = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+IN_FLIGHT_KEY:str = "blogapi:in-flight"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _token_bucket(data:dict, keys:list, args:list) -> int:
+    capacity, rate = float(args[0]), float(args[1])
+    now:int = _now_ms()
+    bucket:dict = data.get(keys[0], {})
+    tokens:float = min(capacity, bucket.get("tokens", capacity) + max(0, now - bucket.get("ts", now)) * rate / 1000)
+    wait:int = 0
+    if tokens >= 1:
+        tokens -= 1
+    else:
+        wait = math.ceil((1 - tokens) * 1000 / rate)
+    data[keys[0]] = {"tokens": tokens, "ts": now}
+    return wait
+
+
+def _admit(data:dict, keys:list, args:list) -> int:
+    now:int = _now_ms()
+    in_flight:dict = {member: start for member, start in data.get(keys[0], {}).items() if start > now - int(args[1])}
+    data[keys[0]] = in_flight
+    if len(in_flight) >= int(args[0]):
+        return 0
+    in_flight[args[2]] = now
+    return 1
+
+
+redis_clients.emulate(TOKEN_BUCKET_LUA, _token_bucket)
+redis_clients.emulate(ADMIT_LUA, _admit)
+
+
+def script(source:str):
+    """source registered on the THROTTLE_REDIS_URL client, None when throttling is off."""
+    return redis_clients.script(settings.THROTTLE_REDIS_URL, source)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Limits the writes (non-safe methods) of each client with the THROTTLE_BUCKETS entry named by ``scope``.
+
+    Clients are told apart by their API token, else their user, else their address. A rejected request gets DRF's
+    429 with ``Retry-After`` set to when the bucket will hold a token again.
+    """
+    scope:str = "write"
+
+    def __init__(self) -> None:
+        self.retry_after:float = None
+
+    def allow_request(self, request:Request, view) -> bool:
+        if request.method in SAFE_METHODS:
+            return True
+        bucket_script = script(TOKEN_BUCKET_LUA)
+        bucket:dict = settings.THROTTLE_BUCKETS.get(self.scope)
+        if bucket_script is None or bucket is None:
+            return True
+        try:
+            wait_ms:int = bucket_script(keys=[self.bucket_key(request)], args=[bucket["capacity"], bucket["rate"]])
+        except redis.RedisError:
+            logger.warning("Throttle check failed, letting the request through", exc_info=True)
+            return True
+        if int(wait_ms) <= 0:
+            return True
+        self.retry_after = int(wait_ms) / 1000
+        return False
+
+    def bucket_key(self, request:Request) -> str:
+        token:str = getattr(request.auth, "key", None)
+        if token is not None:
+            client:str = "token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+        elif request.user is not None and request.user.is_authenticated:
+            client = f"user:{request.user.pk}"
+        else:
+            client = "ip:" + self.get_ident(request)
+        return f"blogapi:throttle:{self.scope}:{client}"
+
+    def wait(self) -> float:
+        return self.retry_after
+
+
+class PostWriteThrottle(TokenBucketThrottle):
+    scope = "post"
+
+
+class CommentWriteThrottle(TokenBucketThrottle):
+    scope = "comment"
+
+
+def admit() -> str:
+    """Takes an in-flight slot for a write when fewer than LOAD_SHEDDING_MAX_IN_FLIGHT are taken.
+
+    Return:
+        str: the slot to hand back to release(), "" when shedding is off or Redis is unreachable, None when full
+    """
+    admit_script = script(ADMIT_LUA)
+    if admit_script is None or not settings.LOAD_SHEDDING_MAX_IN_FLIGHT:
+        return ""
+    slot:str = uuid.uuid4().hex
+    try:
+        admitted:int = admit_script(keys=[IN_FLIGHT_KEY], args=[settings.LOAD_SHEDDING_MAX_IN_FLIGHT,
+                                                                settings.LOAD_SHEDDING_STALE_SECONDS * 1000, slot])
+    except redis.RedisError:
+        logger.warning("Load shedding check failed, letting the request through", exc_info=True)
+        return ""
+    return slot if int(admitted) else None
+
+
+def release(slot:str) -> None:
+    if not slot:
+        return
+    try:
+        redis_clients.client_for(settings.THROTTLE_REDIS_URL).zrem(IN_FLIGHT_KEY, slot)
+    except redis.RedisError:
+        # The slot goes stale and is reclaimed after LOAD_SHEDDING_STALE_SECONDS
+        logger.warning("Could not release an in-flight slot", exc_info=True)
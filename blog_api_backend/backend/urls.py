@@ -4,32 +4,55 @@ from .views import  (comment_utils,
                      create_new_comment_on,
                      create_new_post,
                      create_new_user,
+                     create_comments_bulk,
+                     create_posts_bulk,
+                     export_comments,
+                     export_posts,
+                     export_users,
+                     get_cache_stats,
+                     get_comment_ingest_status,
+                     get_import_status,
                      get_all_comments,
                      get_all_comments_by,
                      get_all_comments_on,
                      get_all_posts,
                      get_all_posts_by,
                      get_all_users,
+                     get_batch,
+                     get_user_deletion_status,
                      post_utils,
+                     search_posts,
                      user_utils)
                      
 
 urlpatterns = [
     path('users/', get_all_users),
+    path('users/export/', export_users),
     path('users/<str:username>/posts/', get_all_posts_by),
     path('users/<str:username>/comments/', get_all_comments_by),
     path('users/new/', create_new_user),
     path('users/<int:pk>/', user_utils),
+    path('users/deletions/<str:job_id>/', get_user_deletion_status),
 
     path('posts/', get_all_posts),
+    path('posts/export/', export_posts),
+    path('posts/search/', search_posts),
     path('posts/usr=<str:username>/', get_all_posts_by),
     path('posts/<int:pk>/comments/', get_all_comments_on),
     path('posts/new/', create_new_post),
+    path('posts/bulk/', create_posts_bulk),
     path('posts/<int:pk>/', post_utils),
     
     path('comments/', get_all_comments),
+    path('comments/export/', export_comments),
     path('comments/usr=<str:username>/', get_all_comments_by),
     path('comments/post=<int:pk>/', get_all_comments_on),
     path('comments/post=<int:pk>/new/', create_new_comment_on),
+    path('comments/bulk/', create_comments_bulk),
+    path('comments/ingest/<str:tracking_id>/', get_comment_ingest_status),
     path('comments/<int:pk>/', comment_utils),
+
+    path('cache/stats/', get_cache_stats),
+    path('imports/<str:job_id>/', get_import_status),
+    path('batch/', get_batch),
 ]
@@ -1,52 +1,221 @@
 # pylint: disable=missing-module-docstring
+import json
+import logging
+from asyncio import iscoroutinefunction
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 from django.db.models.query import QuerySet
+from django.http import HttpRequest, HttpResponse, QueryDict, StreamingHttpResponse
+from django.urls import Resolver404, resolve
 from rest_framework import permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from backend import cache, conditional, counters, feeds, search, tasks
+from backend.bulk import bulk_create_items
+from backend.export import ndjson_response
 from backend.models import User, Post, Comment
-from backend.serializers import UserSerializer, PostSerializer, CommentSerializer
+from backend.pagination import KeysetPagination, RankedPagination
+from backend.precompressed import precompressed_list
+from backend.throttling import CommentWriteThrottle, PostWriteThrottle, TokenBucketThrottle
+from backend.serializers import (UserSerializer, PostSerializer, CommentSerializer, ExpandedPostSerializer,
+                                 PostBulkItemSerializer, CommentBulkItemSerializer, SearchResultSerializer,
+                                 values_serializer_for)
+
+
+logger = logging.getLogger(__name__)
+
+
+def paginated_response(request:Request, queryset:QuerySet, serializer_class:type, ordering:tuple = None) -> Response:
+    """Serializes one keyset page of queryset instead of the whole table.
+
+    Conditional requests are first answered from a ``values()`` read of the ETag and keyset columns of the same
+    page, so an unchanged page costs one narrow query and no serialization. ``?fields=`` / ``?exclude=`` pick the
+    serialized fields and the columns read. With ``settings.FAST_READ_PATH`` the page is read with ``.values()`` and
+    serialized by ValuesSerializer instead of the ModelSerializer.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request carrying the optional ``cursor`` / ``page_size`` /
+            ``fields`` / ``exclude``
+        queryset (QuerySet): the (unordered) rows to list
+        serializer_class (type): ModelSerializer used for each row
+        ordering (tuple): keyset ordering, newest first (``("-created_at", "-id")``) when None
+
+    Return:
+        Response: ``{"next": ..., "previous": ..., "results": [...]}``
+    """
+    label:str = queryset.model._meta.model_name + "s"
+    if conditional.is_conditional(request):
+        paginator:KeysetPagination = KeysetPagination(ordering)
+        columns:set = set(required_columns(queryset.model, paginator.ordering))
+        stamps:list = paginator.paginate_queryset(queryset.values(*columns), request)
+        not_modified = conditional.not_modified(
+            request, *conditional.validators(label, conditional.row_stamps(queryset.model, stamps)))
+        if not_modified is not None:
+            return not_modified
+    paginator = KeysetPagination(ordering)
+    selection:dict = parse_sparse_fields(request, serializer_class)
+    if settings.FAST_READ_PATH:
+        values_serializer = values_serializer_for(serializer_class, **selection)
+        page:list = paginator.paginate_queryset(
+            values_serializer.values(queryset, extra=required_columns(queryset.model, paginator.ordering)), request)
+        data:list = values_serializer.serialize(page)
+        stamps = conditional.row_stamps(queryset.model, page)
+    else:
+        page = paginator.paginate_queryset(sparse_queryset(queryset, serializer_class, selection, paginator.ordering),
+                                           request)
+        data = serializer_class(page, many=True, **selection).data
+        stamps = conditional.row_stamps(queryset.model, page)
+    return conditional.set_validators(paginator.get_paginated_response(data), *conditional.validators(label, stamps))
+
+
+def multi_get_response(request:Request, model:type, serializer_class:type) -> Response:
+    """Answers ``?ids=1,2,3`` on a list endpoint from the object cache: one multi-get, then one ``IN`` query for
+    the misses (cache.get_or_load_many), instead of a request per object.
+
+    ``?fields=`` / ``?exclude=`` trim the cached payloads. The ETag and Last-Modified cover the objects found.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request carrying ``ids`` and the optional ``fields`` /
+            ``exclude``
+        model (type): the listed model
+        serializer_class (type): ModelSerializer of the single-object views, whose payloads share the cache
+
+    Return:
+        Response: ``{"results": [...], "missing": [...]}``, results in the order of ``ids``, None without ``ids``
+    """
+    if 'ids' not in request.query_params:
+        return None
+    try:
+        pks:list = list(dict.fromkeys(int(pk) for pk in request.query_params['ids'].split(',') if pk.strip()))
+    except ValueError:
+        raise ValidationError({"ids": "Expected comma-separated integers"})
+    if not pks or len(pks) > settings.MULTI_GET_MAX_IDS:
+        raise ValidationError({"ids": f"Expected between 1 and {settings.MULTI_GET_MAX_IDS} ids"})
+    selection:dict = parse_sparse_fields(request, serializer_class)
+
+    label:str = model._meta.model_name
+    payloads:dict = cache.get_or_load_many(label, pks, cache.payload_loader(model, serializer_class))
+    found:list = [payloads[pk][0] for pk in pks if payloads[pk]]
+    etag, last_modified = conditional.validators(label + "s", conditional.payload_rows(found))
+    not_modified = conditional.not_modified(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    if selection:
+        kept:set = set(selection['fields'] or serializer_class().fields) - set(selection['exclude'])
+        found = [{name: value for name, value in item.items() if name in kept} for item in found]
+    data:dict = {"results": found, "missing": [pk for pk in pks if not payloads[pk]]}
+    return conditional.set_validators(Response(data), etag, last_modified)
+
+
+def parse_sparse_fields(request:Request, serializer_class:type) -> dict:
+    """Reads ``?fields=a,b`` / ``?exclude=c`` into SparseFieldsMixin keyword arguments (``{}`` when neither is
+    given), rejecting names serializer_class doesn't have.
+    """
+    selection:dict = {}
+    for param in ('fields', 'exclude'):
+        if param in request.query_params:
+            selection[param] = tuple(name.strip() for name in request.query_params[param].split(',') if name.strip())
+    if selection:
+        unknown:set = set(selection.get('fields', ())) | set(selection.get('exclude', ()))
+        unknown -= set(serializer_class().fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s) {', '.join(sorted(unknown))}"})
+        selection.setdefault('fields', None)
+        selection.setdefault('exclude', ())
+    return selection
+
+
+def required_columns(model:type, ordering:tuple) -> tuple:
+    """Columns a list page reads whatever the fieldset: the ETag's (conditional.stamp_columns) and the keyset
+    columns.
+    """
+    return (*conditional.stamp_columns(model), *(field.lstrip('-') for field in ordering))
 
 
+def sparse_queryset(queryset:QuerySet, serializer_class:type, selection:dict, ordering:tuple) -> QuerySet:
+    """Restricts the SELECT to the columns of the requested fieldset: ``.only()`` for ``?fields=``, ``.defer()``
+    for ``?exclude=``, so e.g. ``?exclude=post_content`` never reads the post bodies.
+    """
+    if not selection:
+        return queryset
+    required:set = set(required_columns(queryset.model, ordering))
+    if selection['fields'] is not None:
+        kept:set = {field.source for field in serializer_class(**selection).fields.values()}
+        return queryset.only(*(kept | required))
+    fields:dict = serializer_class().fields
+    return queryset.defer(*({fields[name].source for name in selection['exclude']} - required))
+
 
 # USER ########################################################################################################
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@precompressed_list("user")
 def get_all_users(request:Request) -> Response:
-    """Queries all User objects in Django's db and returns a JSON response containing them all.
+    """Queries all User objects in Django's db and returns a JSON response containing one page of them
+    (``?cursor=`` / ``?page_size=``).
+
+    ``?ordering=posts`` / ``?ordering=comments`` list the most prolific users first, using the denormalized
+    counters instead of a GROUP BY. ``?ids=1,2,3`` returns those users (multi_get_response).
 
     Args:
         request (rest_framework.request.Request): HTTP request method (GET)
     
     Return:
-        Response: JSON data for all Users in Django's db
+        Response: JSON data for one page of Users in Django's db
     """
+    response:Response = multi_get_response(request, User, UserSerializer)
+    if response is not None:
+        return response
+    ordering:tuple = list_ordering(request, {"posts": ("-post_count", "-id"), "comments": ("-comment_count", "-id")})
     queryset:QuerySet = User.objects.all()
-    serializer:UserSerializer = UserSerializer(queryset, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, queryset, UserSerializer, ordering)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+def export_users(request:Request) -> StreamingHttpResponse:
+    """Streams every User object in Django's db as newline-delimited JSON, ordered by id.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+    
+    Return:
+        StreamingHttpResponse: one JSON User per line, sent while the table is being read
+    """
+    return ndjson_response(User.objects.all(), UserSerializer, "users.ndjson")
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@precompressed_list("post", "user")
 def get_all_posts_by(request:Request, username: str) -> Response:
     """Queries all Post objects in Django's db provided a username (lists all blog posts done by a user)
 
+    The latest posts are answered from the author's feed (backend/feeds.py) when it can.
+
     Args:
         request (rest_framework.request.Request): HTTP request method
         username (str): the username of the user we want to get all the posts for 
     
     Return:
-        Response: JSON data for all Blog Posts in Django's db done by user
+        Response: JSON data for one page of Blog Posts in Django's db done by user
     """
-    queryset_user:QuerySet = User.objects.get(username=username)
-    queryset_posts:QuerySet = Post.objects.filter(author=queryset_user.id)
-    serializer:PostSerializer = PostSerializer(queryset_posts, many=True)
-    return Response(serializer.data)
+    author_id:int = feeds.author_id_for(username)
+    response:Response = feeds.feed_response(request, author_id)
+    if response is not None:
+        return response
+    queryset_posts:QuerySet = Post.objects.filter(author=author_id)
+    return paginated_response(request, queryset_posts, PostSerializer)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@precompressed_list("comment", "user")
 def get_all_comments_by(request:Request, username: str) -> Response:
     """Queries all Comment objects in Django's db provided a username (lists all comments done by a user)
 
@@ -55,13 +224,11 @@ def get_all_comments_by(request:Request, username: str) -> Response:
         username (str): the username of the user we want to get all the comments for 
     
     Return:
-        Response: JSON data for all Comments in Django's db done by user
+        Response: JSON data for one page of Comments in Django's db done by user
     """
     queryset_user:QuerySet = User.objects.get(username=username)
     queryset_comments:QuerySet = Comment.objects.filter(commenter=queryset_user.id)
-    print(queryset_comments)
-    serializer:CommentSerializer = CommentSerializer(queryset_comments, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, queryset_comments, CommentSerializer)
 
 
 @api_view(['POST'])
@@ -78,6 +245,7 @@ def create_new_user(request:Request) -> Response:
     serializer:UserSerializer = UserSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
+        cache.invalidate("user", [serializer.data['id']])
         return Response(serializer.data, status = status.HTTP_201_CREATED)
     return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
 
@@ -93,9 +261,11 @@ def get_single_user(request:Request, pk:int):
     Return:
         Response: JSON data for User in Django's db, specified by pk/id
     """
-    queryset:QuerySet = User.objects.filter(id=pk)
-    serializer:UserSerializer = UserSerializer(queryset, many=True)
-    return Response(serializer.data)
+    def load() -> list:
+        queryset:QuerySet = User.objects.filter(id=pk)
+        serializer:UserSerializer = UserSerializer(queryset, many=True)
+        return [dict(item) for item in serializer.data]
+    return conditional.object_response(request, User, "user", pk, load)
 
 
 def put_single_user(request:Request, pk:int) -> Response:
@@ -112,38 +282,80 @@ def put_single_user(request:Request, pk:int) -> Response:
         serializer:UserSerializer = UserSerializer(data=request.data)
         if serializer.is_valid():
             user = User.objects.get(id=pk)
+            previous_username:str = user.username
             user.username = serializer.data['username']
             user.first_name = serializer.data['first_name']
             user.last_name = serializer.data['last_name']
             user.can_post = serializer.data['can_post']
             user.can_comment = serializer.data['can_comment']
-            user.save(force_update=True)
+            # update_fields keeps this read-modify-write from clobbering concurrent counter updates
+            user.save(update_fields=['username', 'first_name', 'last_name', 'can_post', 'can_comment', 'updated_at'])
+            cache.invalidate("user", [user.id])
+            feeds.forget_username(previous_username)
             return Response({"success": True, "user_id": user.id})
-    except Exception as e:
-        print (e)
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
 def delete_single_user(request:Request, pk:int) -> Response:
     """Deletes User object given the User's id.
 
+    The account is deactivated right away; detaching everything the user wrote and deleting the row is left to
+    the tasks.delete_user background job, whose progress is served by get_user_deletion_status.
+
     Args:
         request (rest_framework.request.Request): HTTP request methods (DELETE)
         pk (int): The id of the User to delete in Django
     
     Return:
-        Response: JSON data confirming that HTTP Delete was successful for the User
+        Response: JSON data with the id of the deletion job (HTTP 202)
     """
     try:
         user = User.objects.get(id=pk)
-        deleted_id:int = user.id
-        user.delete()
-        return Response({"success": True, "comment_id": deleted_id})
-    except Exception as e:
-        print (e)
+        job_id:str = tasks.start_user_deletion(user)
+        return Response({"success": True, "user_id": user.id, "job_id": job_id}, status = status.HTTP_202_ACCEPTED)
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_user_deletion_status(request:Request, job_id:str) -> Response:
+    """Returns how far a user deletion job is: queued, running (with posts/comments detached so far), done or failed
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+        job_id (str): The job id returned by delete_single_user
+    
+    Return:
+        Response: JSON data with the status and progress counts of the job
+    """
+    deletion_status:dict = tasks.get_deletion_status(job_id)
+    if deletion_status is None:
+        return Response({"error": "Unknown or expired job id"}, status = status.HTTP_404_NOT_FOUND)
+    return Response({"job_id": job_id, **deletion_status})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_import_status(request:Request, job_id:str) -> Response:
+    """Returns how far a background admin import is: queued, running (rows read, created, failed), done or failed
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+        job_id (str): The job id shown by the admin when the import was queued
+    
+    Return:
+        Response: JSON data with the status, counts and the first row errors of the import
+    """
+    import_status:dict = tasks.get_import_status(job_id)
+    if import_status is None:
+        return Response({"error": "Unknown or expired job id"}, status = status.HTTP_404_NOT_FOUND)
+    return Response({"job_id": job_id, **import_status})
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def user_utils(request:Request, pk: int) -> None:
@@ -162,7 +374,7 @@ def user_utils(request:Request, pk: int) -> None:
         case 'DELETE':
             return delete_single_user(request, pk)
         case _ :
-            print('mmmmmm whoops something didnt go right')
+            logger.error("Unhandled method %s on %s", request.method, request.path)
 ###############################################################################################################
 
 
@@ -170,22 +382,72 @@ def user_utils(request:Request, pk: int) -> None:
 # POST ########################################################################################################
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@precompressed_list("post")
 def get_all_posts(request:Request) -> Response:
-    """Queries all Post objects in Django's db and returns a JSON response containing them all.
+    """Queries all Post objects in Django's db and returns a JSON response containing one page of them
+    (``?cursor=`` / ``?page_size=``).
+
+    ``?ordering=popular`` lists the most commented posts first and ``?min_comments=N`` keeps posts with at least
+    N comments, both served by the denormalized ``comment_count`` and its index. Newest-first pages come from the
+    global feed (backend/feeds.py) when it can answer them. ``?ids=1,2,3`` returns those posts
+    (multi_get_response).
 
     Args:
         request (rest_framework.request.Request): HTTP request method
     
     Return:
-        Response: JSON data for all Blog Posts in Django's db
+        Response: JSON data for one page of Blog Posts in Django's db
     """
+    response:Response = multi_get_response(request, Post, PostSerializer)
+    if response is None:
+        response = feeds.feed_response(request)
+    if response is not None:
+        return response
+    ordering:tuple = list_ordering(request, {"popular": ("-comment_count", "-id")})
     queryset:QuerySet = Post.objects.all()
-    serializer:PostSerializer = PostSerializer(queryset, many=True)
-    return Response(serializer.data)
+    if 'min_comments' in request.query_params:
+        try:
+            queryset = queryset.filter(comment_count__gte=int(request.query_params['min_comments']))
+        except ValueError:
+            raise ValidationError({"min_comments": "Expected an integer"})
+    return paginated_response(request, queryset, PostSerializer, ordering)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_posts(request:Request) -> StreamingHttpResponse:
+    """Streams every Post object in Django's db as newline-delimited JSON, ordered by id.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+    
+    Return:
+        StreamingHttpResponse: one JSON Blog Post per line, sent while the table is being read
+    """
+    return ndjson_response(Post.objects.all(), PostSerializer, "posts.ndjson")
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+def search_posts(request:Request) -> Response:
+    """Full-text search over Post titles and content, most relevant first.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET) with ``?q=`` and optional ``?page=``
+    
+    Return:
+        Response: JSON data for one page of matching Blog Posts, each with its relevance ``rank``
+    """
+    queryset:QuerySet = search.search_posts(request.query_params.get('q', '')).order_by('-rank', '-id')
+    paginator:RankedPagination = RankedPagination()
+    page:list = paginator.paginate_queryset(queryset, request)
+    serializer:SearchResultSerializer = SearchResultSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@precompressed_list("comment", "post")
 def get_all_comments_on(request:Request, pk:int) -> Response:
     """Queries all Comment objects in Django's db provided a post id (gets all comments on a particular post)
 
@@ -194,17 +456,16 @@ def get_all_comments_on(request:Request, pk:int) -> Response:
         pk (int): the id of the Post we want to get all the comments for 
     
     Return:
-        Response: JSON data for all Comments in Django's db on a given Post
+        Response: JSON data for one page of Comments in Django's db on a given Post
     """
-    print(pk)
     queryset_post:QuerySet = Post.objects.get(id=pk)
     queryset_comments:QuerySet = Comment.objects.filter(post=queryset_post.id)
-    serializer:CommentSerializer = CommentSerializer(queryset_comments, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, queryset_comments, CommentSerializer)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([TokenBucketThrottle, PostWriteThrottle])
 def create_new_post(request:Request) -> Response:
     """Creates new Post object and saves it to Django's db
 
@@ -216,15 +477,89 @@ def create_new_post(request:Request) -> Response:
     """
     serializer:PostSerializer = PostSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        # The post_count, cache and feed upkeep hangs off Post's post_save signal (backend/apps.py), the atomic
+        # block keeps the insert and the post_count update in one transaction
+        with transaction.atomic():
+            serializer.save()
         return Response({"success": True, "post_id": serializer.data['id']})
     return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([TokenBucketThrottle, PostWriteThrottle])
+def create_posts_bulk(request:Request) -> Response:
+    """Creates many Post objects from a JSON array in one transaction.
+
+    Authors are resolved for the whole batch with a single IN query and rows are inserted with bulk_create.
+    Invalid items are reported and skipped, the valid ones are still created.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request methods (POST)
+    
+    Return:
+        Response: JSON data with the number created and, per item and in order, its post id or its errors
+    """
+    results, created = bulk_create_items(bulk_items(request), PostBulkItemSerializer, Post, {"author": User},
+                                         counters={"author": "post_count"})
+    cache.invalidate("post", [post.id for post in created])
+    cache.invalidate("user", {post.author_id for post in created})
+    feeds.add_posts(created)
+    return Response({"success": bool(created), "created": len(created), "results": results},
+                    status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+def list_ordering(request:Request, choices:dict) -> tuple:
+    """Maps ``?ordering=`` to one of the keyset orderings a list endpoint offers (None for newest first)."""
+    name:str = request.query_params.get('ordering')
+    if name is None:
+        return None
+    if name not in choices:
+        raise ValidationError({"ordering": f"Expected one of {', '.join(sorted(choices))}"})
+    return choices[name]
+
+
+def bulk_items(request:Request) -> list:
+    """The JSON array body of a bulk create, rejected unless it holds 1 to BULK_MAX_ITEMS items."""
+    items = request.data
+    max_items:int = getattr(settings, "BULK_MAX_ITEMS", 10000)
+    if not isinstance(items, list) or not items:
+        raise ValidationError({"non_field_errors": ["Expected a non-empty list of items."]})
+    if len(items) > max_items:
+        raise ValidationError({"non_field_errors": [f"At most {max_items} items per request."]})
+    return items
+
+
+def parse_expand(request:Request) -> frozenset:
+    """Reads ``?expand=comments,author`` into a set, rejecting relations ExpandedPostSerializer can't embed."""
+    expand:frozenset = frozenset(item.strip() for item in request.query_params.get('expand', '').split(',') if item.strip())
+    unknown:frozenset = expand - frozenset(ExpandedPostSerializer.EXPANDABLE)
+    if unknown:
+        raise ValidationError({"expand": f"Cannot expand {', '.join(sorted(unknown))}"})
+    return expand
+
+
+def expanded_post_queryset(pk:int, expand:frozenset) -> QuerySet:
+    """Post queryset for ExpandedPostSerializer: one query for the post (+ author) and, when comments are
+    expanded, one more for their first page with every commenter joined in.
+    """
+    queryset:QuerySet = Post.objects.filter(id=pk)
+    if "author" in expand:
+        queryset = queryset.select_related('author')
+    if "comments" in expand:
+        page_size:int = KeysetPagination().page_size
+        comments:QuerySet = Comment.objects.select_related('commenter').order_by(*KeysetPagination.ordering)
+        queryset = queryset.prefetch_related(Prefetch('comments', queryset=comments[:page_size], to_attr='page_comments'))
+    return queryset
+
+
 def get_single_blogpost(request:Request, pk:int):
     """Queries Post objects in Django's db where the Post's id = the passed pk, Returns a JSON response containing
     data of that blogpost.
 
+    With ``?expand=author`` and/or ``?expand=comments`` the author and the first page of comments (with their
+    commenters) are embedded along with a ``comment_count``, in a constant number of queries.
+
     Args:
         request (rest_framework.request.Request): HTTP request methods
         pk (int): The id of the Blog Post in Django
@@ -232,9 +567,16 @@ def get_single_blogpost(request:Request, pk:int):
     Return:
         Response: JSON data for Blog Post in Django's db, specified by pk/id
     """
-    queryset:QuerySet = Post.objects.filter(id=pk)
-    serializer:PostSerializer = PostSerializer(queryset, many=True)
-    return Response(serializer.data)
+    if 'expand' in request.query_params:
+        expand:frozenset = parse_expand(request)
+        serializer:ExpandedPostSerializer = ExpandedPostSerializer(expanded_post_queryset(pk, expand),
+                                                                   many=True, expand=expand)
+        return Response(serializer.data)
+    def load() -> list:
+        queryset:QuerySet = Post.objects.filter(id=pk)
+        serializer:PostSerializer = PostSerializer(queryset, many=True)
+        return [dict(item) for item in serializer.data]
+    return conditional.object_response(request, Post, "post", pk, load)
 
 
 def put_single_blogpost(request:Request, pk:int) -> Response:
@@ -253,10 +595,10 @@ def put_single_blogpost(request:Request, pk:int) -> Response:
             blog_post = Post.objects.get(id=pk)
             blog_post.title = serializer.data['title']
             blog_post.post_content = serializer.data['post_content']
-            blog_post.save(force_update=True)
+            blog_post.save(update_fields=['title', 'post_content', 'updated_at'])
             return Response({"success": True, "post_id": blog_post.id})
-    except Exception as e:
-        print (e)
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
@@ -272,10 +614,14 @@ def delete_single_blogpost(request:Request, pk:int) -> Response:
     """
     try:
         blog_post = Post.objects.get(id=pk)
-        blog_post.delete()
-        return Response({"success": True, "post_id": blog_post.id})
-    except Exception as e:
-        print (e)
+        comment_ids:list = list(Comment.objects.filter(post=blog_post.id).values_list('id', flat=True))
+        # post_count, the post's cache entry and the feeds follow through Post's post_delete signal (backend/apps.py)
+        with transaction.atomic():
+            blog_post.delete()
+        cache.invalidate("comment", comment_ids)
+        return Response({"success": True, "post_id": pk})
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
@@ -297,7 +643,7 @@ def post_utils(request:Request, pk: int) -> None:
         case 'DELETE':
             return delete_single_blogpost(request, pk)
         case _ :
-            print('mmmmmm whoops something didnt go right')
+            logger.error("Unhandled method %s on %s", request.method, request.path)
 ###############################################################################################################
 
 
@@ -305,22 +651,41 @@ def post_utils(request:Request, pk: int) -> None:
 # COMMENT ########################################################################################################
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@precompressed_list("comment")
 def get_all_comments(request:Request) -> Response:
-    """Queries all Comment objects in Django's db and returns a JSON response containing them all.
+    """Queries all Comment objects in Django's db and returns a JSON response containing one page of them
+    (``?cursor=`` / ``?page_size=``). ``?ids=1,2,3`` returns those comments (multi_get_response).
 
     Args:
         request (rest_framework.request.Request): HTTP request method (GET)
     
     Return:
-        Response: JSON data for all Comments in Django's db
+        Response: JSON data for one page of Comments in Django's db
     """
+    response:Response = multi_get_response(request, Comment, CommentSerializer)
+    if response is not None:
+        return response
     queryset:QuerySet = Comment.objects.all()
-    serializer:CommentSerializer = CommentSerializer(queryset, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, queryset, CommentSerializer)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_comments(request:Request) -> StreamingHttpResponse:
+    """Streams every Comment object in Django's db as newline-delimited JSON, ordered by id.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+    
+    Return:
+        StreamingHttpResponse: one JSON Comment per line, sent while the table is being read
+    """
+    return ndjson_response(Comment.objects.all(), CommentSerializer, "comments.ndjson")
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([TokenBucketThrottle, CommentWriteThrottle])
 def create_new_comment_on(request:Request, pk:int) -> Response:
     """Creates new Comment on Post with given id
 
@@ -328,24 +693,83 @@ def create_new_comment_on(request:Request, pk:int) -> Response:
         request (rest_framework.request.Request): HTTP request methods (POST)
         pk (int): The id of the Blog Post to comment on
     
+    With ``settings.COMMENT_WRITE_BEHIND`` the comment is only validated and queued: the response is a 202 with a
+    tracking id (see get_comment_ingest_status) and a Celery worker inserts queued comments in batches.
+
     Return:
         Response: JSON data confirming that HTTP POST was successful for the Blog Post
     """
-    print(pk)
-    print (request.data)
+    if settings.COMMENT_WRITE_BEHIND:
+        # Post and commenter ids are resolved by the worker for the whole batch, unknown ids end up "failed"
+        item_serializer = CommentBulkItemSerializer(data={
+            "post": pk, "commenter": request.data.get('commenter'), "comment_content": request.data.get('comment_content')
+        })
+        if not item_serializer.is_valid():
+            return Response(item_serializer.errors, status = status.HTTP_400_BAD_REQUEST)
+        tracking_id:str = tasks.enqueue_comment(item_serializer.validated_data)
+        return Response({"success": True, "tracking_id": tracking_id}, status = status.HTTP_202_ACCEPTED)
+
     serializer:CommentSerializer = CommentSerializer(data=request.data)
-    print (serializer)
     if serializer.is_valid():
-        comment = Comment.objects.create(
-            post = Post.objects.get(id=pk),
-            commenter = User.objects.get(id=serializer.data['commenter']),
-            comment_content = serializer.data['comment_content']
-        )
-        comment.save()
+        # validated_data['commenter'] is already the User fetched by the serializer, create() saves the row
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post = Post.objects.get(id=pk),
+                commenter = serializer.validated_data.get('commenter'),
+                comment_content = serializer.validated_data['comment_content']
+            )
+            counters.adjust(Post, 'comment_count', [comment.post_id])
+            counters.adjust(User, 'comment_count', [comment.commenter_id])
+        cache.invalidate("comment", [comment.id])
+        cache.invalidate("post", [comment.post_id])
+        cache.invalidate("user", [comment.commenter_id])
         return Response({"success": True, "comment_id": comment.id})
     return Response(serializer.errors, status = status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_comment_ingest_status(request:Request, tracking_id:str) -> Response:
+    """Returns where a comment queued by the write-behind path is: queued, created (with its id) or failed
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+        tracking_id (str): The tracking id returned by create_new_comment_on
+    
+    Return:
+        Response: JSON data with the status, plus comment_id once created or errors if it failed
+    """
+    ingest_status:dict = tasks.get_ingest_status(tracking_id)
+    if ingest_status is None:
+        return Response({"error": "Unknown or expired tracking id"}, status = status.HTTP_404_NOT_FOUND)
+    return Response({"tracking_id": tracking_id, **ingest_status})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([TokenBucketThrottle, CommentWriteThrottle])
+def create_comments_bulk(request:Request) -> Response:
+    """Creates many Comment objects (each naming its post and commenter) from a JSON array in one transaction.
+
+    Posts and commenters are resolved for the whole batch with one IN query each and rows are inserted with
+    bulk_create. Invalid items are reported and skipped, the valid ones are still created.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request methods (POST)
+    
+    Return:
+        Response: JSON data with the number created and, per item and in order, its comment id or its errors
+    """
+    results, created = bulk_create_items(bulk_items(request), CommentBulkItemSerializer, Comment,
+                                         {"post": Post, "commenter": User},
+                                         counters={"post": "comment_count", "commenter": "comment_count"})
+    cache.invalidate("comment", [comment.id for comment in created])
+    cache.invalidate("post", {comment.post_id for comment in created})
+    cache.invalidate("user", {comment.commenter_id for comment in created})
+    return Response({"success": bool(created), "created": len(created), "results": results},
+                    status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
 def get_single_comment(request:Request, pk:int):
     """Queries Comment objects in Django's db where the Comment's id = the passed pk, Returns a JSON response containing
     data of that comment.
@@ -357,9 +781,11 @@ def get_single_comment(request:Request, pk:int):
     Return:
         Response: JSON data for Comment in Django's db, specified by pk/id
     """
-    queryset:QuerySet = Comment.objects.filter(id=pk)
-    serializer:CommentSerializer = CommentSerializer(queryset, many=True)
-    return Response(serializer.data)
+    def load() -> list:
+        queryset:QuerySet = Comment.objects.filter(id=pk)
+        serializer:CommentSerializer = CommentSerializer(queryset, many=True)
+        return [dict(item) for item in serializer.data]
+    return conditional.object_response(request, Comment, "comment", pk, load)
 
 
 def put_single_comment(request:Request, pk:int) -> Response:
@@ -377,10 +803,11 @@ def put_single_comment(request:Request, pk:int) -> Response:
         if serializer.is_valid():
             comment = Comment.objects.get(id=pk)
             comment.comment_content = serializer.data['comment_content']
-            comment.save(force_update=True)
+            comment.save(update_fields=['comment_content', 'updated_at'])
+            cache.invalidate("comment", [comment.id])
             return Response({"success": True, "comment_id": comment.id})
-    except Exception as e:
-        print (e)
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
@@ -397,10 +824,16 @@ def delete_single_comment(request:Request, pk:int) -> Response:
     try:
         comment = Comment.objects.get(id=pk)
         deleted_id:int = comment.id
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            counters.adjust(Post, 'comment_count', [comment.post_id], sign=-1)
+            counters.adjust(User, 'comment_count', [comment.commenter_id], sign=-1)
+        cache.invalidate("comment", [deleted_id])
+        cache.invalidate("post", [comment.post_id])
+        cache.invalidate("user", [comment.commenter_id])
         return Response({"success": True, "comment_id": deleted_id})
-    except Exception as e:
-        print (e)
+    except Exception:
+        logger.warning("%s %s failed", request.method, request.path, exc_info=True)
         return Response({"success": False }, status = status.HTTP_400_BAD_REQUEST)
 
 
@@ -422,5 +855,95 @@ def comment_utils(request:Request, pk: int) -> None:
         case 'DELETE':
             return delete_single_comment(request, pk)
         case _ :
-            print('mmmmmm whoops something didnt go right')
+            logger.error("Unhandled method %s on %s", request.method, request.path)
+###############################################################################################################
+
+
+
+# BATCH ########################################################################################################
+# Headers of a batch that don't carry over to its sub-requests: validators are the batch's own and sub-responses are
+# embedded uncompressed
+BATCH_DROPPED_HEADERS:tuple = ("CONTENT_LENGTH", "CONTENT_TYPE", "HTTP_ACCEPT_ENCODING", "HTTP_IF_MATCH",
+                               "HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_batch(request:Request) -> Response:
+    """Runs up to BATCH_MAX_REQUESTS read requests against the API in one call: each ``?path=`` (URL encoded, with
+    its own query string) is resolved and its view called in process, with the caller's credentials, in order.
+
+    Only GETs of synchronous, non-streaming ``/api/`` views can be batched. A failing sub-request only fails its
+    own entry.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request carrying the repeated ``path`` parameter, e.g.
+            ``?path=/api/posts/1/&path=/api/users/%3Fids%3D1%2C2``
+
+    Return:
+        Response: ``{"responses": [{"path": ..., "status": ..., "body": ...}, ...]}`` in the order of the paths
+    """
+    urls:list = request.query_params.getlist('path')
+    if not urls or len(urls) > settings.BATCH_MAX_REQUESTS:
+        raise ValidationError({"path": f"Expected between 1 and {settings.BATCH_MAX_REQUESTS} paths"})
+    return Response({"responses": [batch_entry(request, url) for url in urls]})
+
+
+def batch_entry(request:Request, url:str) -> dict:
+    """Calls the view url resolves to and returns its status and decoded body."""
+    path, _, query = url.partition('?')
+    if not path.startswith('/api/'):
+        return {"path": url, "status": 400, "body": {"detail": "Only /api/ paths can be batched"}}
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {"path": url, "status": 404, "body": {"detail": "Not found."}}
+    if match.func is get_batch or iscoroutinefunction(match.func):
+        return {"path": url, "status": 400, "body": {"detail": "This endpoint can't be batched"}}
+
+    subrequest:HttpRequest = HttpRequest()
+    subrequest.method = "GET"
+    subrequest.path = subrequest.path_info = path
+    subrequest.META = {key: value for key, value in request.META.items() if key not in BATCH_DROPPED_HEADERS}
+    subrequest.META.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query, HTTP_ACCEPT="application/json")
+    subrequest.GET = QueryDict(query)
+    subrequest.COOKIES = request.COOKIES
+    subrequest.resolver_match = match
+    # Session authentication reads the user AuthenticationMiddleware put on the request, tokens are re-checked
+    for attribute in ("user", "session"):
+        if hasattr(request._request, attribute):  # pylint: disable=protected-access
+            setattr(subrequest, attribute, getattr(request._request, attribute))  # pylint: disable=protected-access
+    try:
+        response:HttpResponse = match.func(subrequest, *match.args, **match.kwargs)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception("Batched request to %s failed", url)
+        return {"path": url, "status": 500, "body": {"detail": "Internal server error"}}
+    if response.streaming:
+        response.close()
+        return {"path": url, "status": 400, "body": {"detail": "Streaming endpoints can't be batched"}}
+    if isinstance(response, Response):
+        body = response.data
+    else:
+        try:
+            body = json.loads(response.content) if response.content else None
+        except ValueError:
+            body = response.content.decode(response.charset, errors="replace")
+    return {"path": url, "status": response.status_code, "body": body}
+###############################################################################################################
+
+
+
+# CACHE ########################################################################################################
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def get_cache_stats(request:Request) -> Response:
+    """Returns the hit/miss counters of the single-object read-through cache for this worker.
+
+    Args:
+        request (rest_framework.request.Request): HTTP request method (GET)
+    
+    Return:
+        Response: JSON data with hits, misses, invalidations and hit_ratio
+    """
+    return Response(cache.cache_stats())
 ###############################################################################################################
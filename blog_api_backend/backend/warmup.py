@@ -0,0 +1,69 @@
+# pylint: disable=missing-module-docstring
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework.settings import api_settings
+
+from backend.serializers import (UserSerializer, PostSerializer, CommentSerializer, ExpandedPostSerializer,
+                                 SearchResultSerializer, values_serializer_for)
+
+
+logger = logging.getLogger(__name__)
+
+
+# Called by the gunicorn hooks in gunicorn.conf.py so the first requests a worker serves don't pay for lazy setup:
+# warm_up_code() in the master after the app is preloaded (forked workers inherit the result), warm_up() again in
+# each worker before it accepts connections, since sockets can't be shared across a fork.
+
+def _compile_patterns(resolver:URLResolver) -> int:
+    """Compiles the regex of every URL pattern (Django does it on the first match), returns how many there are."""
+    count:int = 0
+    for pattern in resolver.url_patterns:
+        _ = pattern.pattern.regex
+        count += 1
+        if isinstance(pattern, URLResolver):
+            count += _compile_patterns(pattern)
+    return count
+
+
+def warm_up_code() -> dict:
+    """URL resolver, DRF settings and serializers: everything that is fork safe.
+
+    Return:
+        dict: the number of URL patterns and serializers warmed up
+    """
+    resolver:URLResolver = get_resolver()
+    patterns:int = _compile_patterns(resolver)
+    _ = resolver.reverse_dict
+    # DRF imports the classes named in REST_FRAMEWORK on first access
+    for setting in ("DEFAULT_RENDERER_CLASSES", "DEFAULT_PARSER_CLASSES", "DEFAULT_AUTHENTICATION_CLASSES",
+                    "DEFAULT_PERMISSION_CLASSES", "DEFAULT_THROTTLE_CLASSES"):
+        getattr(api_settings, setting)
+    serializer_classes:tuple = (UserSerializer, PostSerializer, CommentSerializer, ExpandedPostSerializer,
+                                SearchResultSerializer)
+    for serializer_class in serializer_classes:
+        _ = serializer_class().fields
+    for serializer_class in (UserSerializer, PostSerializer, CommentSerializer):
+        values_serializer_for(serializer_class)
+    return {"url_patterns": patterns, "serializers": len(serializer_classes)}
+
+
+def warm_up() -> dict:
+    """warm_up_code() plus a database connection per alias and a round trip to the cache.
+
+    Return:
+        dict: what was warmed up and how long it took in milliseconds
+    """
+    start:float = time.perf_counter()
+    report:dict = warm_up_code()
+    for connection in connections.all():
+        connection.ensure_connection()
+    cache.get("blogapi:warm-up")
+    report["databases"] = len(connections.all())
+    report["ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("Warmed up in %.1f ms: %d URL patterns, %d serializers, %d database connections", report["ms"],
+                report["url_patterns"], report["serializers"], report["databases"])
+    return report
@@ -32,6 +32,23 @@ CACHES = {
     }
 }
 
+# Seconds a serialized User/Post/Comment stays in the read-through cache (writes invalidate it earlier)
+OBJECT_CACHE_TIMEOUT = 300
+
+# Seconds a rendered, precompressed list page stays cached (any write to what it lists moves it to a new key), 0 to
+# disable
+LIST_CACHE_TIMEOUT = 60
+# List pages smaller than this are cached uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+# Redis holding the post feeds (backend/feeds.py), "memory://" for an in-process stand-in, empty to disable them
+FEEDS_REDIS_URL = REDIS_HOST
+# Post ids kept per feed; older pages are read from SQL
+FEED_LENGTH = 1000
+
+# Seconds CachedTokenAuthentication remembers which user a token belongs to (token/user writes invalidate it earlier)
+TOKEN_CACHE_TIMEOUT = 60
+
 SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 
 # Quick-start development settings - unsuitable for production
@@ -42,7 +59,7 @@ SECRET_KEY = "(5(f@%8zy)y9wdidx3lr-h3#(d#u=t_qdjzgcs1%9^$lghdi8*"
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get("DEBUG") == "True"
-ALLOWED_HOSTS = ["backend", "localhost"]
+ALLOWED_HOSTS = ["backend", "backend_asgi", "localhost"]
 
 
 # Application definition
@@ -55,11 +72,16 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "backend",
     "rest_framework",
+    "rest_framework.authtoken",
+    "import_export",
 ]
 
 AUTH_USER_MODEL = "backend.User"
 
 MIDDLEWARE = [
+    "backend.middleware.TimingMiddleware",
+    "backend.middleware.LoadSheddingMiddleware",
+    "backend.middleware.ReadYourWritesMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -101,9 +123,21 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("POSTGRES_HOST"),
         "PORT": os.environ.get("POSTGRES_PORT"),
+        # Persistent connections, one per worker thread, checked before reuse. Keep 0 under an ASGI server,
+        # where sync code doesn't run on a fixed set of threads.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Streaming replicas of "default", comma-separated hosts. GET requests read from them (backend.routers.ReplicaRouter)
+# except for READ_YOUR_WRITES_SECONDS after the same client wrote (backend.middleware.ReadYourWritesMiddleware)
+for index, host in enumerate(filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(","))):
+    DATABASES[f"replica_{index}"] = {**DATABASES["default"], "HOST": host.strip(), "TEST": {"MIRROR": "default"}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["backend.routers.ReplicaRouter"]
+READ_YOUR_WRITES_SECONDS = int(os.environ.get("READ_YOUR_WRITES_SECONDS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -154,12 +188,115 @@ STORAGES = {
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# Opt-in read fast path: list endpoints serialize straight from QuerySet.values() and render with orjson.
+# The JSON sent is byte-for-byte the same as with the regular ModelSerializers and JSONRenderer.
+FAST_READ_PATH = os.environ.get("FAST_READ_PATH") == "True"
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'backend.authentication.CachedTokenAuthentication',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'backend.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+if FAST_READ_PATH:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+
+# Upper bound for ?page_size= on the keyset-paginated list endpoints
+MAX_PAGE_SIZE = 200
+
+# Most ids one ?ids=1,2,3 multi-get may ask for, and most sub-requests one api/batch/ call may run
+MULTI_GET_MAX_IDS = 200
+BATCH_MAX_REQUESTS = 20
+
+# Bulk create endpoints: max items per request and rows per INSERT / IN lookup
+BULK_MAX_ITEMS = 10000
+BULK_BATCH_SIZE = 1000
+
+# Deepest result reachable by paging through posts/search/
+SEARCH_MAX_RESULTS = 1000
+
+# Rows fetched per server-side cursor round trip by the NDJSON export endpoints
+EXPORT_CHUNK_SIZE = 2000
+
+# Write-behind comment creation: create_new_comment_on validates, queues on the Celery broker and answers 202;
+# a drain_comment_queue task inserts up to COMMENT_INGEST_BATCH_SIZE queued comments per bulk_create
+COMMENT_WRITE_BEHIND = os.environ.get("COMMENT_WRITE_BEHIND") == "True"
+COMMENT_INGEST_QUEUE = "comment-ingest"
+COMMENT_INGEST_BATCH_SIZE = 500
+# Seconds a drain waits after the first queued comment so a burst shares batches
+COMMENT_INGEST_DELAY = 1
+# Seconds the "drain pending" flag lives, a few drain delays so a lost drain task is rescheduled by the next comment
+COMMENT_INGEST_SCHEDULED_TIMEOUT = 10
+# Seconds before a drain whose batch failed (and was requeued) is retried
+COMMENT_INGEST_RETRY_DELAY = 5
+# Seconds a tracking id's status stays queryable
+COMMENT_INGEST_STATUS_TIMEOUT = 3600
+
+# Background user deletion (tasks.delete_user): posts and comments detached per transaction, and seconds a job's
+# progress stays queryable
+USER_DELETION_CHUNK_SIZE = int(os.environ.get("USER_DELETION_CHUNK_SIZE", 1000))
+USER_DELETION_STATUS_TIMEOUT = 86400
+
+# Admin import/export (backend/resources.py): rows validated and inserted per transaction (COPY on PostgreSQL).
+# CSV/JSON uploads over IMPORT_PREVIEW_MAX_BYTES skip the preview and are imported by a Celery task from
+# IMPORT_UPLOAD_DIR, which the web and worker containers share
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_PREVIEW_MAX_BYTES = int(os.environ.get("IMPORT_PREVIEW_MAX_BYTES", 2 * 1024 * 1024))
+IMPORT_UPLOAD_DIR = os.environ.get("IMPORT_UPLOAD_DIR", os.path.join(BASE_DIR, "host", "imports"))
+IMPORT_STATUS_TIMEOUT = 86400
+IMPORT_EXPORT_USE_TRANSACTIONS = True
+
+# Write rate limits and load shedding (backend/throttling.py), shared by every worker through this Redis
+THROTTLE_REDIS_URL = REDIS_HOST
+# Token buckets per client: "capacity" writes in a burst, then "rate" per second. "write" applies to every write
+# endpoint, "post" and "comment" to the post and comment create endpoints on top of it
+THROTTLE_BUCKETS = {
+    "write": {"capacity": 60, "rate": 1.0},
+    "post": {"capacity": 10, "rate": 0.1},
+    "comment": {"capacity": 30, "rate": 0.5},
+}
+# Writes beyond this many in flight across all workers get a 503 (0 turns shedding off). The slot of a request
+# still running after LOAD_SHEDDING_STALE_SECONDS (a killed worker) is reclaimed
+LOAD_SHEDDING_MAX_IN_FLIGHT = int(os.environ.get("LOAD_SHEDDING_MAX_IN_FLIGHT", 0))
+LOAD_SHEDDING_STALE_SECONDS = 60
+LOAD_SHEDDING_RETRY_AFTER = 1
+
+# Admin changelists past this many rows (PostgreSQL's estimate) show the estimate instead of an exact COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.environ.get("ADMIN_ESTIMATED_COUNT_THRESHOLD", 100000))
+
+# Requests slower than this (wall time, ms) are logged by TimingMiddleware with up to SLOW_REQUEST_LOGGED_QUERIES of
+# their queries, slowest first
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+SLOW_REQUEST_LOGGED_QUERIES = 50
+
+# Directory where each gunicorn worker writes its metrics (at most every METRICS_FLUSH_SECONDS) so /metrics can add
+# up every worker's, set by gunicorn.conf.py. Unset, /metrics reports the process that answers
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_SECONDS = 5
+# docker-compose publishes the backend ports, so /metrics only answers clients from METRICS_ALLOWED_IPS (addresses or
+# networks, comma-separated) or sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ALLOWED_IPS = [network.strip() for network in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+                       if network.strip()]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "backend": {"handlers": ["console"], "level": os.environ.get("BACKEND_LOG_LEVEL", "INFO")},
+    },
 }
@@ -0,0 +1,41 @@
+"""
+Settings for running the test suite without the docker-compose services.
+
+Usage: python manage.py test --settings=blogapi.test_settings
+"""
+from .settings import *  # pylint: disable=wildcard-import,unused-wildcard-import
+
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test_db.sqlite3",
+    },
+    # Only used by the routing tests, which list it with override_settings(DATABASE_REPLICAS=["replica"]). It is
+    # not a mirror, so what a test wrote to "default" is missing there, like on a replica that hasn't caught up.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test_replica.sqlite3",
+    },
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Tests count the queries of list requests: the precompressed list cache is off except in its own tests
+LIST_CACHE_TIMEOUT = 0
+
+# Feeds outlive the per-test rollback, so they are only switched on (in process) by their own tests
+FEEDS_REDIS_URL = None
+# Same for the write throttles and load shedding
+THROTTLE_REDIS_URL = None
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Write-behind comments: kombu's in-memory transport as the broker and tasks run inline
+CELERY_BROKER_URL = "memory://"
+CELERY_TASK_ALWAYS_EAGER = True
@@ -17,10 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from backend.metrics import metrics_view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path('api/', include('backend.urls'))
+    path('api/async/', include('backend.async_urls')),
+    path('api/', include('backend.urls')),
+    path('metrics', metrics_view),
 ]
 
 # Change Admin site title and header
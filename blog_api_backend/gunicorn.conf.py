@@ -0,0 +1,69 @@
+"""
+Gunicorn configuration, the production entry point: gunicorn -c gunicorn.conf.py
+
+Serves blogapi/wsgi.py with sync workers by default. Set GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker to
+serve blogapi/asgi.py (and the /api/async/ views) instead, with DB_CONN_MAX_AGE=0.
+
+The app is loaded once in the master and forked, workers are recycled after GUNICORN_MAX_REQUESTS requests to
+bound memory growth, and each worker warms up (backend/warmup.py) before it accepts connections. Workers write
+their metrics to METRICS_DIR so /metrics adds up all of them (backend/metrics.py).
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+wsgi_app = "blogapi.asgi:application" if "uvicorn" in worker_class.lower() else "blogapi.wsgi:application"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+preload_app = True
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Set before the app is preloaded: read by backend.metrics through settings.METRICS_DIR
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "blogapi-metrics"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    """Master, before any worker: the metrics of a previous run must not be added to this one's."""
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRICS_DIR"])
+
+
+def when_ready(server):
+    """Master, app preloaded: fork safe warm-up, inherited by every worker."""
+    # pylint: disable=import-outside-toplevel
+    from django.db import connections
+    from backend.warmup import warm_up_code
+    warm_up_code()
+    # A connection opened while loading the app must not end up shared by the forked workers
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    """Worker, before its accept loop: database connections, cache client, anything not done in the master."""
+    from backend.warmup import warm_up  # pylint: disable=import-outside-toplevel
+    warm_up()
+
+
+def worker_exit(server, worker):
+    """Worker, on its way out (recycled, reloaded or stopped): its last requests reach METRICS_DIR."""
+    from backend import metrics  # pylint: disable=import-outside-toplevel
+    metrics.flush(force=True)
+
+
+def child_exit(server, worker):
+    """Master, once a worker has exited: its counters move to the archive, its open connections are gone."""
+    from backend import metrics  # pylint: disable=import-outside-toplevel
+    metrics.mark_process_dead(worker.pid)
@@ -3,11 +3,7 @@
 CONTAINER_NAME="blog_api_backend"
 # Django project directory in the container
 DJANGO_DIR="/code"
-# Remove existing migrations if they exist
-docker exec $CONTAINER_NAME find $DJANGO_DIR -path "*/migrations/*.py" -not -name "__init__.py" -delete
-docker exec $CONTAINER_NAME find $DJANGO_DIR -path "*/migrations/*.pyc"  -delete
-# Do migrations stuff
-docker exec $CONTAINER_NAME python manage.py makemigrations
+# Apply the committed migrations (they carry hand-tuned indexes, so never regenerate them here)
 docker exec $CONTAINER_NAME python manage.py migrate
 # Collect static files
 docker exec $CONTAINER_NAME python manage.py collectstatic --noinput